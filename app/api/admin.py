@@ -0,0 +1,45 @@
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.core.config import settings
+from app.core.profiling import profile_store
+
+router = APIRouter(prefix="/admin", include_in_schema=False)
+
+
+def check_admin_token(token: Optional[str]) -> None:
+    """
+    Reject the request unless it carries the configured admin token.
+
+    Fails closed: without a configured ADMIN_TOKEN the admin endpoints do not exist.
+    """
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if token is None or not hmac.compare_digest(token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.get("/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """
+    List saved request profiles, newest first.
+    """
+    check_admin_token(x_admin_token)
+    return {
+        "profiling_enabled": settings.profiling_enabled,
+        "profiles": profile_store.list()
+    }
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    """
+    Get a profile as folded stacks, ready for flamegraph.pl or speedscope.
+    """
+    check_admin_token(x_admin_token)
+    folded = profile_store.get_folded(profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    return PlainTextResponse(folded)
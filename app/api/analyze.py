@@ -1,22 +1,42 @@
-from fastapi import APIRouter, HTTPException
-from app.models.requests import AnalyzeResultsRequest
+import asyncio
+from fastapi import APIRouter, Header, HTTPException
+from app.models.requests import AnalyzeResultsRequest, GenerationMode, ResponseFormat
 from app.models.responses import (
+    STATISTICAL_SUMMARY_EXPLANATIONS,
+    AnalysisJobResponse,
     AnalyzeResultsResponse,
-    StatisticalSummaryModel,
-    SegmentAnalysisItem,
+    CompactAnalyzeResultsResponse,
     GenerativeAnalysisModel,
     NextStepModel
 )
-from app.statistics.calculations import calculate_conversion_metrics, analyze_segments
+from app.statistics.calculations import (
+    calculate_conversion_metrics,
+    calculate_conversion_metrics_batch,
+    analyze_segments
+)
+from app.statistics.multiple_metrics import analyze_metric_family, metric_family_entry
+from app.statistics.stratified import stratified_analysis
+from app.statistics.bootstrap import bootstrap_lift_intervals
+from app.statistics.ratio import MOMENT_FIELDS, analyze_ratio_metrics
+from app.statistics.segment_tree import scan_segment_tree
 from app.llm.manager import llm_manager
+from app.llm.budget import fit_prompt, get_output_token_limit
+from app.jobs.runner import job_runner, JobQueueFullError
+from app.core.serialization import ARROW_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, encode_response
+from app.core.timing import record_fallback, track_stage, timed_endpoint
 from app.llm.prompts import (
+    format_metrics_context,
     get_interpretation_prompt,
     get_recommendations_prompt,
-    get_followup_questions_prompt
+    get_followup_questions_prompt,
+    get_combined_analysis_prompt
 )
 from app.core.config import settings
+import logging
 import re
-from typing import List
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -86,122 +106,550 @@ def parse_questions(llm_response: str) -> List[str]:
     ]
 
 
-@router.post("/analyze/results", response_model=AnalyzeResultsResponse)
-async def analyze_results(request: AnalyzeResultsRequest):
-    """
-    Interpret raw experiment results with statistical analysis and LLM insights.
-    """
-    try:
-        # Get primary variants (assume first two are control and treatment)
-        variants = request.results_data.variants
-        if len(variants) < 2:
-            raise HTTPException(status_code=400, detail="At least 2 variants required")
-        
-        control = variants[0]
-        treatment = variants[1]
-        
-        # Calculate statistical metrics
+def split_combined_response(llm_response: str) -> Dict[str, str]:
+    """Split a single-shot LLM response into interpretation, recommendations and questions."""
+    sections = {"interpretation": "", "recommendations": "", "questions": ""}
+    
+    pattern = r'^[#*=\s]*(INTERPRETATION|RECOMMENDATIONS|QUESTIONS)[*=:\s]*$'
+    headers = list(re.finditer(pattern, llm_response, re.IGNORECASE | re.MULTILINE))
+    
+    if not headers:
+        # No section markers: treat the whole response as the narrative
+        sections["interpretation"] = llm_response.strip()
+        return sections
+    
+    for index, header in enumerate(headers):
+        end = headers[index + 1].start() if index + 1 < len(headers) else len(llm_response)
+        sections[header.group(1).lower()] = llm_response[header.end():end].strip()
+    
+    return sections
+
+
+async def run_statistical_analysis(
+    request: AnalyzeResultsRequest
+) -> Tuple[Dict, Optional[List[Dict]], Optional[Dict]]:
+    """Compute overall, per-segment and stratified conversion metrics for a results request."""
+    # Get primary variants (assume first two are control and treatment)
+    variants = request.results_data.variants
+    if len(variants) < 2:
+        raise HTTPException(status_code=400, detail="At least 2 variants required")
+    
+    control = variants[0]
+    treatment = variants[1]
+    
+    # Calculate statistical metrics
+    with track_stage("statistics"):
         metrics = calculate_conversion_metrics(
             control_users=control.users,
             control_conversions=control.conversions,
             treatment_users=treatment.users,
-            treatment_conversions=treatment.conversions
+            treatment_conversions=treatment.conversions,
+            exact_test=settings.small_sample_test,
+            min_expected_count=settings.small_sample_min_expected_count
         )
+    
+    # Analyze segments if provided
+    segment_results = None
+    stratified_results = None
+    if request.results_data.segments:
+        # Only the counts are needed, so skip dumping every segment model
+        segment_data = [
+            {
+                "segment_name": seg.segment_name,
+                "variants": [
+                    {"users": variant.users, "conversions": variant.conversions}
+                    for variant in seg.variants
+                ]
+            }
+            for seg in request.results_data.segments
+        ]
         
-        # Create statistical summary
-        statistical_summary = StatisticalSummaryModel(**metrics)
-        
-        # Analyze segments if provided
-        segment_analysis = None
-        if request.results_data.segments:
+        with track_stage("segments"):
             segment_results = analyze_segments(
-                [seg.dict() for seg in request.results_data.segments]
+                segment_data,
+                exact_test=settings.small_sample_test,
+                min_expected_count=settings.small_sample_min_expected_count
             )
-            segment_analysis = [
-                SegmentAnalysisItem(
-                    segment_name=seg["segment_name"],
-                    metrics=StatisticalSummaryModel(**seg["metrics"])
-                )
-                for seg in segment_results
-            ]
         
-        # Generate LLM insights
-        interpretation_narrative = "Statistical analysis completed. LLM interpretation unavailable."
-        recommendations = [
-            NextStepModel(
-                action="REVIEW RESULTS",
-                confidence="Medium",
-                rationale="Analyze the statistical significance and business impact."
+        # Pool the effect across segments, treating each as a stratum
+        with track_stage("stratified"):
+            stratified_results = stratified_analysis(segment_data)
+    
+    if request.bootstrap_interval is not None:
+        with track_stage("bootstrap"):
+            # CPU-bound, so run it off the event loop
+            await asyncio.to_thread(add_bootstrap_intervals, request, metrics, segment_results)
+    
+    return metrics, segment_results, stratified_results
+
+
+def add_bootstrap_intervals(
+    request: AnalyzeResultsRequest,
+    metrics: Dict,
+    segment_results: Optional[List[Dict]]
+) -> None:
+    """Attach bootstrap lift intervals to the overall and per-segment metrics, resampled in one batch."""
+    # analyze_segments keeps segments with at least 2 variants, in request order
+    segments = [seg for seg in (request.results_data.segments or []) if len(seg.variants) >= 2]
+    pairs = [request.results_data.variants[:2]] + [seg.variants[:2] for seg in segments]
+    
+    intervals = bootstrap_lift_intervals(
+        control_users=[control.users for control, _ in pairs],
+        control_conversions=[control.conversions for control, _ in pairs],
+        treatment_users=[treatment.users for _, treatment in pairs],
+        treatment_conversions=[treatment.conversions for _, treatment in pairs],
+        method=request.bootstrap_interval.value,
+        replicates=settings.bootstrap_replicates,
+        chunk_size=settings.bootstrap_chunk_size,
+        workers=settings.bootstrap_workers,
+        seed=settings.bootstrap_seed
+    )
+    
+    metrics["bootstrap"] = intervals[0]
+    for seg, interval in zip(segment_results or [], intervals[1:]):
+        seg["metrics"]["bootstrap"] = interval
+
+
+def run_segment_tree_analysis(request: AnalyzeResultsRequest) -> Optional[Dict]:
+    """Scan the segment hierarchy for divergent effects when segments carry a path."""
+    # Assume first variant is control, second is treatment
+    leaves = [
+        seg for seg in request.results_data.segments or []
+        if seg.path and len(seg.variants) >= 2
+    ]
+    if not leaves:
+        return None
+    
+    with track_stage("segment_tree"):
+        return scan_segment_tree(
+            paths=[seg.path for seg in leaves],
+            control_users=[seg.variants[0].users for seg in leaves],
+            control_conversions=[seg.variants[0].conversions for seg in leaves],
+            treatment_users=[seg.variants[1].users for seg in leaves],
+            treatment_conversions=[seg.variants[1].conversions for seg in leaves],
+            false_discovery_rate=request.false_discovery_rate,
+            max_results=settings.segment_tree_max_results
+        )
+
+
+def run_ratio_analysis(request: AnalyzeResultsRequest) -> Optional[List[Dict]]:
+    """Compute delta-method comparisons for the request's ratio metrics, overall and per segment."""
+    if not request.results_data.ratio_metrics:
+        return None
+    
+    def moments(variants) -> List[Dict]:
+        return [{field: getattr(variant, field) for field in MOMENT_FIELDS} for variant in variants]
+    
+    metric_data = [
+        {
+            "metric_name": metric.metric_name,
+            "variants": moments(metric.variants),
+            "segments": [
+                {"segment_name": seg.segment_name, "variants": moments(seg.variants)}
+                for seg in metric.segments or []
+            ]
+        }
+        for metric in request.results_data.ratio_metrics
+    ]
+    
+    with track_stage("ratio_metrics"):
+        return analyze_ratio_metrics(metric_data)
+
+
+def run_metric_analysis(
+    request: AnalyzeResultsRequest,
+    metrics: Dict,
+    ratio_results: Optional[List[Dict]]
+) -> Optional[List[Dict]]:
+    """
+    Evaluate the primary, secondary and guardrail metrics as one family.
+    
+    Secondary and guardrail conversion metrics are computed in one batch; ratio
+    metrics reuse their delta-method results. P-values are then adjusted for
+    the false discovery rate across all of them.
+    """
+    extra_metrics = request.results_data.metrics or []
+    ratio_metrics = request.results_data.ratio_metrics or []
+    if not extra_metrics and not ratio_metrics:
+        return None
+    
+    with track_stage("metric_family"):
+        conversion_results = []
+        if extra_metrics:
+            # Assume first variant is control, second is treatment
+            conversion_results = calculate_conversion_metrics_batch(
+                control_users=[metric.variants[0].users for metric in extra_metrics],
+                control_conversions=[metric.variants[0].conversions for metric in extra_metrics],
+                treatment_users=[metric.variants[1].users for metric in extra_metrics],
+                treatment_conversions=[metric.variants[1].conversions for metric in extra_metrics],
+                exact_test=settings.small_sample_test,
+                min_expected_count=settings.small_sample_min_expected_count
             )
+        
+        entries = [metric_family_entry(request.context.primary_metric_name, "primary", "conversion", True, metrics)]
+        entries += [
+            metric_family_entry(metric.metric_name, metric.role.value, "conversion", metric.higher_is_better, result)
+            for metric, result in zip(extra_metrics, conversion_results)
         ]
-        questions = [
-            "What business factors might explain these results?",
-            "How should these results influence the product roadmap?",
-            "What additional validation is needed?"
+        entries += [
+            metric_family_entry(
+                metric.metric_name, metric.role.value, "ratio", metric.higher_is_better, result["statistical_summary"]
+            )
+            for metric, result in zip(ratio_metrics, ratio_results or [])
         ]
-        
-        try:
-            # Get interpretation
-            interpretation_prompt = get_interpretation_prompt(
-                hypothesis=request.context.hypothesis,
-                metric_name=request.context.primary_metric_name,
-                statistical_results=metrics,
-                pm_notes=request.context.pm_notes
+        return analyze_metric_family(entries, request.false_discovery_rate)
+
+
+def build_summary_payload(metrics: Dict, explanations: Optional[Dict[str, str]]) -> Dict:
+    """Build a statistical summary payload in the StatisticalSummaryModel layout."""
+    payload = dict(metrics)
+    payload["explanations"] = explanations
+    return payload
+
+
+def build_segment_analysis(
+    segment_results: Optional[List[Dict]],
+    include_explanations: bool = True
+) -> Optional[List[Dict]]:
+    """Build per-segment payloads in the SegmentAnalysisItem layout."""
+    if segment_results is None:
+        return None
+    
+    # Every segment shares one explanations dict; it is only read when serialized
+    explanations = STATISTICAL_SUMMARY_EXPLANATIONS if include_explanations else None
+    return [
+        {
+            "segment_name": seg["segment_name"],
+            "metrics": build_summary_payload(seg["metrics"], explanations)
+        }
+        for seg in segment_results
+    ]
+
+
+def build_segment_records(
+    segment_results: Optional[List[Dict]]
+) -> Optional[List[Dict]]:
+    """Build flat per-segment records in the SegmentMetricsRecord layout."""
+    if segment_results is None:
+        return None
+    
+    records = []
+    for seg in segment_results:
+        record = {"segment_name": seg["segment_name"]}
+        record.update(seg["metrics"])
+        confidence_interval = record.pop("confidence_interval")
+        record["ci_lower"] = confidence_interval["lower"]
+        record["ci_upper"] = confidence_interval["upper"]
+        records.append(record)
+    return records
+
+
+def build_results_response(
+    metrics: Dict,
+    segment_results: Optional[List[Dict]],
+    generative_analysis: GenerativeAnalysisModel,
+    response_format: ResponseFormat = ResponseFormat.FULL,
+    include_explanations: bool = True,
+    stratified_results: Optional[Dict] = None,
+    ratio_results: Optional[List[Dict]] = None,
+    metric_results: Optional[List[Dict]] = None,
+    segment_tree_results: Optional[Dict] = None
+) -> Dict:
+    """
+    Build the analysis response payload in the requested format.
+    
+    The full format repeats field explanations on every statistical summary. The
+    compact format lists them once at the top level and flattens segment metrics
+    into lean records; include_explanations=False omits them altogether. The
+    stratified analysis, segment tree scan, ratio metrics and metric family are
+    the same in both formats.
+    
+    The payload is built from plain dicts matching AnalyzeResultsResponse or
+    CompactAnalyzeResultsResponse, so large segment lists are not validated into
+    models only to be dumped again for serialization.
+    """
+    explanations = STATISTICAL_SUMMARY_EXPLANATIONS if include_explanations else None
+    
+    if response_format == ResponseFormat.COMPACT:
+        return {
+            "statistical_summary": dict(metrics),
+            "segment_analysis": build_segment_records(segment_results),
+            "stratified_analysis": stratified_results,
+            "segment_tree": segment_tree_results,
+            "ratio_metrics": ratio_results,
+            "metric_analysis": metric_results,
+            "generative_analysis": generative_analysis.model_dump(),
+            "explanations": explanations
+        }
+    
+    return {
+        "statistical_summary": build_summary_payload(metrics, explanations),
+        "segment_analysis": build_segment_analysis(segment_results, include_explanations),
+        "stratified_analysis": stratified_results,
+        "segment_tree": segment_tree_results,
+        "ratio_metrics": ratio_results,
+        "metric_analysis": metric_results,
+        "generative_analysis": generative_analysis.model_dump()
+    }
+
+
+async def generate_insights(
+    request: AnalyzeResultsRequest,
+    metrics: Dict,
+    segment_results: Optional[List[Dict]],
+    metric_results: Optional[List[Dict]] = None
+) -> GenerativeAnalysisModel:
+    """
+    Generate the LLM interpretation, recommendations and questions, with fallbacks.
+    
+    With several metrics, every prompt carries the whole metric family so one
+    narrative covers them all.
+    """
+    interpretation_narrative = "Statistical analysis completed. LLM interpretation unavailable."
+    recommendations = [
+        NextStepModel(
+            action="REVIEW RESULTS",
+            confidence="Medium",
+            rationale="Analyze the statistical significance and business impact."
+        )
+    ]
+    questions = [
+        "What business factors might explain these results?",
+        "How should these results influence the product roadmap?",
+        "What additional validation is needed?"
+    ]
+    
+    metrics_context = format_metrics_context(metric_results)
+    
+    if request.generation_mode is not None:
+        single_shot = request.generation_mode == GenerationMode.SINGLE_SHOT
+    else:
+        single_shot = settings.llm_single_shot
+    
+    try:
+        if single_shot:
+            # One combined prompt, split server-side
+            combined_prompt = fit_prompt(
+                lambda segment_context: get_combined_analysis_prompt(
+                    hypothesis=request.context.hypothesis,
+                    metric_name=request.context.primary_metric_name,
+                    statistical_results=metrics,
+                    pm_notes=request.context.pm_notes,
+                    segment_context=segment_context,
+                    metrics_context=metrics_context
+                ),
+                segment_results=segment_results
             )
             
-            interpretation_response = await llm_manager.generate_text(
-                prompt=interpretation_prompt,
-                preferred_provider=settings.default_llm_provider,
-                use_fallback=settings.llm_fallback_enabled
+            with track_stage("llm_combined"):
+                combined_response = await llm_manager.generate_text(
+                    prompt=combined_prompt,
+                    preferred_provider=settings.default_llm_provider,
+                    use_fallback=settings.llm_fallback_enabled,
+                    max_tokens=get_output_token_limit("combined")
+                )
+            with track_stage("parsing"):
+                sections = split_combined_response(combined_response)
+                
+                if sections["interpretation"]:
+                    interpretation_narrative = sections["interpretation"]
+                if sections["recommendations"]:
+                    recommendations = parse_recommendations(sections["recommendations"])
+                if sections["questions"]:
+                    questions = parse_questions(sections["questions"])
+        else:
+            # Get interpretation
+            interpretation_prompt = fit_prompt(
+                lambda segment_context: get_interpretation_prompt(
+                    hypothesis=request.context.hypothesis,
+                    metric_name=request.context.primary_metric_name,
+                    statistical_results=metrics,
+                    pm_notes=request.context.pm_notes,
+                    segment_context=segment_context,
+                    metrics_context=metrics_context
+                ),
+                segment_results=segment_results
             )
+            
+            with track_stage("llm_interpretation"):
+                interpretation_response = await llm_manager.generate_text(
+                    prompt=interpretation_prompt,
+                    preferred_provider=settings.default_llm_provider,
+                    use_fallback=settings.llm_fallback_enabled,
+                    max_tokens=get_output_token_limit("interpretation")
+                )
             interpretation_narrative = interpretation_response.strip()
             
             # Get recommendations
             recommendations_prompt = get_recommendations_prompt(
                 hypothesis=request.context.hypothesis,
                 statistical_results=metrics,
-                pm_notes=request.context.pm_notes
+                pm_notes=request.context.pm_notes,
+                metrics_context=metrics_context
             )
             
-            recommendations_response = await llm_manager.generate_text(
-                prompt=recommendations_prompt,
-                preferred_provider=settings.default_llm_provider,
-                use_fallback=settings.llm_fallback_enabled
-            )
-            recommendations = parse_recommendations(recommendations_response)
+            with track_stage("llm_recommendations"):
+                recommendations_response = await llm_manager.generate_text(
+                    prompt=recommendations_prompt,
+                    preferred_provider=settings.default_llm_provider,
+                    use_fallback=settings.llm_fallback_enabled,
+                    max_tokens=get_output_token_limit("recommendations")
+                )
+            with track_stage("parsing"):
+                recommendations = parse_recommendations(recommendations_response)
             
             # Get follow-up questions
             questions_prompt = get_followup_questions_prompt(
                 hypothesis=request.context.hypothesis,
                 statistical_results=metrics,
-                pm_notes=request.context.pm_notes
+                pm_notes=request.context.pm_notes,
+                metrics_context=metrics_context
             )
             
-            questions_response = await llm_manager.generate_text(
-                prompt=questions_prompt,
-                preferred_provider=settings.default_llm_provider,
-                use_fallback=settings.llm_fallback_enabled
-            )
-            questions = parse_questions(questions_response)
+            with track_stage("llm_questions"):
+                questions_response = await llm_manager.generate_text(
+                    prompt=questions_prompt,
+                    preferred_provider=settings.default_llm_provider,
+                    use_fallback=settings.llm_fallback_enabled,
+                    max_tokens=get_output_token_limit("questions")
+                )
+            with track_stage("parsing"):
+                questions = parse_questions(questions_response)
             
-        except Exception:
-            # Use fallback values if LLM fails
-            pass
+    except Exception as e:
+        # Use fallback values if LLM fails
+        logger.warning("LLM insight generation failed: %s", e)
+        record_fallback("generative_analysis")
+    
+    return GenerativeAnalysisModel(
+        interpretation_narrative=interpretation_narrative,
+        recommended_next_steps=recommendations,
+        generated_questions=questions
+    )
+
+
+@router.post(
+    "/analyze/results",
+    response_model=AnalyzeResultsResponse,
+    responses={200: {
+        "description": "Full or compact analysis",
+        "model": CompactAnalyzeResultsResponse,
+        "content": {MSGPACK_MEDIA_TYPE: {}, ARROW_MEDIA_TYPE: {}}
+    }}
+)
+@timed_endpoint
+async def analyze_results(
+    request: AnalyzeResultsRequest,
+    response_format: ResponseFormat = ResponseFormat.FULL,
+    include_explanations: bool = True,
+    accept: Optional[str] = Header(None)
+):
+    """
+    Interpret raw experiment results with statistical analysis and LLM insights.
+    
+    Use response_format=compact for segment-heavy results: explanations are listed
+    once instead of per summary, and segments are returned as flat records.
+    
+    Bulk consumers can request MessagePack (Accept: application/msgpack) or an
+    Arrow IPC stream (Accept: application/vnd.apache.arrow.stream) with one row
+    per segment and the remaining fields as JSON schema metadata.
+    """
+    try:
+        metrics, segment_results, stratified_results = await run_statistical_analysis(request)
+        segment_tree_results = run_segment_tree_analysis(request)
+        ratio_results = run_ratio_analysis(request)
+        metric_results = run_metric_analysis(request, metrics, ratio_results)
+        generative_analysis = await generate_insights(request, metrics, segment_results, metric_results)
         
-        # Build generative analysis
-        generative_analysis = GenerativeAnalysisModel(
-            interpretation_narrative=interpretation_narrative,
-            recommended_next_steps=recommendations,
-            generated_questions=questions
+        payload = build_results_response(
+            metrics,
+            segment_results,
+            generative_analysis,
+            response_format=response_format,
+            include_explanations=include_explanations,
+            stratified_results=stratified_results,
+            ratio_results=ratio_results,
+            metric_results=metric_results,
+            segment_tree_results=segment_tree_results
         )
+        # Serialize the payload directly; response_model only documents the full format
+        return encode_response(payload, accept=accept, records_key="segment_analysis")
         
-        return AnalyzeResultsResponse(
-            statistical_summary=statistical_summary,
-            segment_analysis=segment_analysis,
-            generative_analysis=generative_analysis
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analyzing results: {str(e)}")
+
+
+def build_job_response(record: Dict) -> Dict:
+    """Build the job status payload, in the AnalysisJobResponse layout, from a stored job record."""
+    partial_result = record["partial_result"] or {}
+    return {
+        "job_id": record["job_id"],
+        "status": record["status"],
+        "created_at": record["created_at"],
+        "updated_at": record["updated_at"],
+        "statistical_summary": partial_result.get("statistical_summary"),
+        "segment_analysis": partial_result.get("segment_analysis"),
+        "stratified_analysis": partial_result.get("stratified_analysis"),
+        "segment_tree": partial_result.get("segment_tree"),
+        "ratio_metrics": partial_result.get("ratio_metrics"),
+        "metric_analysis": partial_result.get("metric_analysis"),
+        "result": record["result"],
+        "error": record["error"]
+    }
+
+
+@router.post("/analyze/results/jobs", response_model=AnalysisJobResponse, status_code=202)
+@timed_endpoint
+async def submit_analysis_job(request: AnalyzeResultsRequest, accept: Optional[str] = Header(None)):
+    """
+    Compute statistics immediately and queue the LLM insights as a background job.
+    
+    Poll GET /analyze/results/jobs/{job_id} for the full result.
+    """
+    try:
+        metrics, segment_results, stratified_results = await run_statistical_analysis(request)
+        segment_tree_results = run_segment_tree_analysis(request)
+        ratio_results = run_ratio_analysis(request)
+        metric_results = run_metric_analysis(request, metrics, ratio_results)
+        
+        async def run_job() -> Dict:
+            generative_analysis = await generate_insights(request, metrics, segment_results, metric_results)
+            return build_results_response(
+                metrics, segment_results, generative_analysis,
+                stratified_results=stratified_results, ratio_results=ratio_results,
+                metric_results=metric_results, segment_tree_results=segment_tree_results
+            )
+        
+        record = await job_runner.submit(
+            run_job,
+            partial_result={
+                "statistical_summary": build_summary_payload(metrics, STATISTICAL_SUMMARY_EXPLANATIONS),
+                "segment_analysis": build_segment_analysis(segment_results),
+                "stratified_analysis": stratified_results,
+                "segment_tree": segment_tree_results,
+                "ratio_metrics": ratio_results,
+                "metric_analysis": metric_results
+            }
         )
+        return encode_response(build_job_response(record), accept=accept, status_code=202)
         
     except HTTPException:
         raise
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error analyzing results: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error submitting analysis job: {str(e)}")
+
+
+@router.get("/analyze/results/jobs/{job_id}", response_model=AnalysisJobResponse)
+async def get_analysis_job(job_id: str, accept: Optional[str] = Header(None)):
+    """
+    Get the status of a background analysis job, including its result once completed.
+    """
+    record = await job_runner.get(job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    
+    return encode_response(build_job_response(record), accept=accept)
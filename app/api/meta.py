@@ -0,0 +1,66 @@
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException
+from app.models.requests import MetaAnalysisRequest
+from app.models.responses import MetaAnalysisResponse
+from app.statistics.meta_analysis import meta_analysis, standard_errors_from_intervals
+from app.core.serialization import ARROW_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, encode_response
+from app.core.timing import track_stage, timed_endpoint
+
+router = APIRouter()
+
+
+@router.post(
+    "/analyze/meta",
+    response_model=MetaAnalysisResponse,
+    responses={200: {"content": {MSGPACK_MEDIA_TYPE: {}, ARROW_MEDIA_TYPE: {}}}}
+)
+@timed_endpoint
+async def analyze_meta(request: MetaAnalysisRequest, accept: Optional[str] = Header(None)):
+    """
+    Pool many experiments' results with fixed- and random-effects meta-analysis.
+
+    Takes the statistical summaries returned by /analyze/results (absolute lift
+    and confidence interval) or explicit standard errors. Experiments sharing a
+    group are pooled together, so a portfolio of changes, each run in several
+    markets, is reviewed in one call. The Arrow format has one row per experiment.
+    """
+    try:
+        experiments = request.experiments
+
+        with track_stage("meta_analysis"):
+            # Standard errors implied by the intervals, unless given explicitly
+            interval_se = standard_errors_from_intervals(
+                [e.confidence_interval["lower"] if e.standard_error is None else 0.0 for e in experiments],
+                [e.confidence_interval["upper"] if e.standard_error is None else 0.0 for e in experiments],
+                request.confidence_level
+            )
+            standard_errors = [
+                e.standard_error if e.standard_error is not None else float(se)
+                for e, se in zip(experiments, interval_se)
+            ]
+
+            result = meta_analysis(
+                effects=[e.absolute_lift for e in experiments],
+                standard_errors=standard_errors,
+                groups=[e.group for e in experiments],
+                confidence_level=request.confidence_level
+            )
+
+        payload = {
+            "pooled": result["groups"],
+            "experiments": [
+                {
+                    "experiment_name": e.experiment_name,
+                    "group": e.group,
+                    "absolute_lift": e.absolute_lift,
+                    "standard_error": round(se, 6),
+                    "fixed_weight": weights["fixed_weight"],
+                    "random_weight": weights["random_weight"]
+                }
+                for e, se, weights in zip(experiments, standard_errors, result["experiments"])
+            ]
+        }
+        return encode_response(payload, accept=accept, records_key="experiments")
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error running meta-analysis: {str(e)}")
@@ -1,18 +1,29 @@
 from fastapi import APIRouter, HTTPException
-from app.models.requests import ValidateSetupRequest
+from app.models.requests import PowerMethod, ValidateSetupRequest
 from app.models.responses import (
     ValidateSetupResponse, 
     InputsSummaryModel,
+    AllocationPlanModel,
+    TrafficForecastModel,
     FeasibilityAnalysisModel,
     RecommendedPlanModel,
     HypothesisAssessmentModel
 )
-from app.statistics.calculations import calculate_sample_size, calculate_test_duration, generate_tradeoff_matrix
+from app.statistics.calculations import calculate_test_duration
+from app.statistics.planning import find_optimal_allocations, plan_sample_sizes, plan_tradeoff_matrix
+from app.statistics.forecasting import forecast_completion_days
+from app.statistics.simulation import find_sample_size_by_simulation
 from app.llm.manager import llm_manager
 from app.llm.prompts import get_hypothesis_assessment_prompt
+from app.llm.budget import get_output_token_limit
 from app.core.config import settings
+from app.core.timing import record_fallback, track_stage, timed_endpoint
+import asyncio
+import logging
 import re
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
@@ -46,7 +57,8 @@ def parse_hypothesis_assessment(llm_response: str) -> HypothesisAssessmentModel:
 
 
 @router.post("/validate/setup", response_model=ValidateSetupResponse)
-async def validate_setup(request: ValidateSetupRequest):
+@timed_endpoint
+async def validate_setup(request: ValidateSetupRequest, include_explanations: bool = True):
     """
     Analyze a proposed experiment's setup for statistical feasibility.
     """
@@ -61,37 +73,98 @@ async def validate_setup(request: ValidateSetupRequest):
             is_relative_mde = False
             mde_type = "absolute"
         
-        # Calculate sample size
-        sample_size = calculate_sample_size(
-            baseline_conversion_rate=request.metric.baseline_conversion_rate,
-            minimum_detectable_effect=mde,
-            statistical_power=request.parameters.statistical_power,
-            significance_level=request.parameters.significance_level,
-            is_relative_mde=is_relative_mde
-        )
+        parameters = request.parameters
+        correction = parameters.multiple_comparison_correction.value
+        
+        with track_stage("statistics"):
+            # Calculate per-arm sample sizes for the allocation, correcting alpha for multiple arms
+            plan = plan_sample_sizes(
+                baseline_conversion_rate=request.metric.baseline_conversion_rate,
+                minimum_detectable_effect=mde,
+                num_variants=parameters.variants,
+                allocation=parameters.allocation,
+                statistical_power=parameters.statistical_power,
+                significance_level=parameters.significance_level,
+                is_relative_mde=is_relative_mde,
+                correction=correction
+            )
+            sample_sizes = plan["sample_sizes"]
+        
+        simulated_power = None
+        if parameters.power_method == PowerMethod.SIMULATION:
+            baseline = request.metric.baseline_conversion_rate
+            treatment_rate = baseline * (1 + mde) if is_relative_mde else baseline + mde
+            treatment_rate = max(0, min(1, treatment_rate))
+            
+            with track_stage("power_simulation"):
+                # CPU-bound, so run it off the event loop
+                simulation = await asyncio.to_thread(
+                    find_sample_size_by_simulation,
+                    arm_rates=[baseline] + [treatment_rate] * (parameters.variants - 1),
+                    statistical_power=parameters.statistical_power,
+                    significance_level=plan["adjusted_significance_level"],
+                    allocation=plan["allocation"],
+                    initial_total=plan["total_sample_size"],
+                    simulations=settings.power_simulation_runs,
+                    chunk_size=settings.power_simulation_chunk_size,
+                    time_budget_ms=settings.power_simulation_budget_ms,
+                    seed=settings.power_simulation_seed
+                )
+            sample_sizes = simulation["sample_sizes"]
+            simulated_power = simulation["power"]
         
         # Calculate test duration
         duration = calculate_test_duration(
-            sample_size_per_variant=sample_size,
+            sample_size_per_variant=max(sample_sizes),
             estimated_daily_users=request.traffic.estimated_daily_users,
-            num_variants=request.parameters.variants
+            num_variants=parameters.variants,
+            sample_sizes=sample_sizes
         )
         
         # Generate trade-off matrix with different MDEs
-        if is_relative_mde:
-            mde_values = [mde * 0.5, mde * 0.75, mde, mde * 1.25, mde * 1.5]
-        else:
-            mde_values = [mde * 0.5, mde * 0.75, mde, mde * 1.25, mde * 1.5]
+        mde_values = [mde * 0.5, mde * 0.75, mde, mde * 1.25, mde * 1.5]
         
-        tradeoff_matrix = generate_tradeoff_matrix(
-            baseline_conversion_rate=request.metric.baseline_conversion_rate,
-            estimated_daily_users=request.traffic.estimated_daily_users,
-            mde_values=mde_values,
-            statistical_power=request.parameters.statistical_power,
-            significance_level=request.parameters.significance_level,
-            is_relative_mde=is_relative_mde,
-            num_variants=request.parameters.variants
-        )
+        with track_stage("tradeoff_matrix"):
+            # One allocation search covers every row and the requested MDE
+            optimal_allocations = find_optimal_allocations(
+                baseline_conversion_rate=request.metric.baseline_conversion_rate,
+                minimum_detectable_effects=mde_values,
+                num_variants=parameters.variants,
+                statistical_power=parameters.statistical_power,
+                significance_level=parameters.significance_level,
+                is_relative_mde=is_relative_mde,
+                correction=correction
+            )
+            optimal = optimal_allocations[mde_values.index(mde)]
+            tradeoff_matrix = plan_tradeoff_matrix(
+                baseline_conversion_rate=request.metric.baseline_conversion_rate,
+                estimated_daily_users=request.traffic.estimated_daily_users,
+                mde_values=mde_values,
+                num_variants=parameters.variants,
+                allocation=parameters.allocation,
+                statistical_power=parameters.statistical_power,
+                significance_level=parameters.significance_level,
+                is_relative_mde=is_relative_mde,
+                correction=correction,
+                optimal_allocations=optimal_allocations
+            )
+        
+        # Forecast completion days under the traffic shape and ramp, for the plan and every trade-off row at once
+        traffic = request.traffic
+        forecast = None
+        if traffic.daily_traffic or traffic.weekday_profile or traffic.ramp_schedule:
+            with track_stage("duration_forecast"):
+                forecast = forecast_completion_days(
+                    total_sample_sizes=[sum(sample_sizes)] + [row["total_sample_size"] for row in tradeoff_matrix],
+                    estimated_daily_users=traffic.estimated_daily_users,
+                    daily_traffic=traffic.daily_traffic,
+                    weekday_profile=traffic.weekday_profile,
+                    start_weekday=traffic.start_weekday,
+                    ramp_schedule=[step.model_dump() for step in traffic.ramp_schedule] if traffic.ramp_schedule else None,
+                    max_days=settings.duration_forecast_max_days
+                )
+            for row, days in zip(tradeoff_matrix, forecast["completion_days"][1:]):
+                row["forecast_duration_days"] = days
         
         # Get hypothesis assessment from LLM
         hypothesis_assessment = HypothesisAssessmentModel(
@@ -102,15 +175,19 @@ async def validate_setup(request: ValidateSetupRequest):
         
         try:
             prompt = get_hypothesis_assessment_prompt(request.hypothesis)
-            llm_response = await llm_manager.generate_text(
-                prompt=prompt,
-                preferred_provider=settings.default_llm_provider,
-                use_fallback=settings.llm_fallback_enabled
-            )
-            hypothesis_assessment = parse_hypothesis_assessment(llm_response)
+            with track_stage("llm_hypothesis"):
+                llm_response = await llm_manager.generate_text(
+                    prompt=prompt,
+                    preferred_provider=settings.default_llm_provider,
+                    use_fallback=settings.llm_fallback_enabled,
+                    max_tokens=get_output_token_limit("hypothesis")
+                )
+            with track_stage("parsing"):
+                hypothesis_assessment = parse_hypothesis_assessment(llm_response)
         except Exception as e:
             # Use fallback assessment if LLM fails
-            print(f"LLM assessment failed: {e}")
+            logger.warning("LLM assessment failed: %s", e)
+            record_fallback("hypothesis_assessment")
             hypothesis_assessment = HypothesisAssessmentModel(
                 score=5,
                 assessment=f"LLM assessment failed: {str(e)}. Using fallback assessment.",
@@ -128,16 +205,35 @@ async def validate_setup(request: ValidateSetupRequest):
             variants=request.parameters.variants,
             estimated_daily_users=request.traffic.estimated_daily_users
         )
+        if not include_explanations:
+            inputs_summary.explanations = None
         
         recommended_plan = RecommendedPlanModel(
-            sample_size_per_variant=sample_size,
-            total_sample_size=sample_size * request.parameters.variants,
-            estimated_duration_days=round(duration, 1)
+            sample_size_per_variant=max(sample_sizes),
+            total_sample_size=sum(sample_sizes),
+            estimated_duration_days=round(duration, 1),
+            sample_sizes_per_variant=sample_sizes,
+            allocation=plan["allocation"],
+            adjusted_significance_level=plan["adjusted_significance_level"],
+            power_method=parameters.power_method.value,
+            simulated_power=simulated_power,
+            forecast_duration_days=forecast["completion_days"][0] if forecast else None
         )
         
         feasibility_analysis = FeasibilityAnalysisModel(
             recommended_plan=recommended_plan,
-            tradeoff_matrix=tradeoff_matrix
+            tradeoff_matrix=tradeoff_matrix,
+            optimal_allocation=AllocationPlanModel(
+                allocation=optimal["allocation"],
+                sample_sizes_per_variant=optimal["sample_sizes"],
+                total_sample_size=optimal["total_sample_size"],
+                estimated_duration_days=round(optimal["total_sample_size"] / request.traffic.estimated_daily_users, 1)
+            ),
+            traffic_forecast=TrafficForecastModel(
+                daily_users=forecast["daily_users"],
+                cumulative_users=forecast["cumulative_users"],
+                horizon_days=forecast["horizon_days"]
+            ) if forecast else None
         )
         
         return ValidateSetupResponse(
@@ -0,0 +1,168 @@
+import gzip
+import time
+from typing import Any, Callable, Dict, List, Optional
+from app.core.metrics import observe_stage
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional "compression" extra
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional "compression" extra
+    zstandard = None
+
+Compressor = Callable[[bytes], bytes]
+
+# Content types worth compressing; everything else is passed through untouched
+COMPRESSIBLE_TYPES = (
+    b"application/json",
+    b"application/msgpack",
+    b"application/vnd.apache.arrow.stream",
+    b"text/",
+)
+
+
+def create_compressors(settings: Any) -> Dict[str, Compressor]:
+    """
+    Create compressors for the configured encodings, in server preference order.
+
+    Encodings whose library is not installed are skipped.
+    """
+    available: Dict[str, Optional[Compressor]] = {
+        "gzip": lambda body: gzip.compress(body, compresslevel=settings.compression_gzip_level, mtime=0),
+        "br": (
+            (lambda body: brotli.compress(body, quality=settings.compression_brotli_quality))
+            if brotli is not None else None
+        ),
+        "zstd": (
+            zstandard.ZstdCompressor(level=settings.compression_zstd_level).compress
+            if zstandard is not None else None
+        ),
+    }
+
+    compressors = {}
+    for encoding in settings.compression_encodings.split(","):
+        encoding = encoding.strip().lower()
+        if encoding not in available:
+            raise ValueError(f"Unknown compression encoding: {encoding}")
+        if available[encoding] is not None:
+            compressors[encoding] = available[encoding]
+    return compressors
+
+
+def parse_quality_list(header: str) -> List[tuple]:
+    """
+    Parse an Accept or Accept-Encoding header into (value, q) pairs.
+
+    Pairs are sorted by descending q; equal q values keep the client's order.
+    """
+    entries = []
+    for item in header.split(","):
+        parts = [part.strip() for part in item.split(";")]
+        if not parts[0]:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        entries.append((parts[0].lower(), quality))
+    return sorted(entries, key=lambda entry: -entry[1])
+
+
+def negotiate_encoding(accept_encoding: str, preferences: List[str]) -> Optional[str]:
+    """
+    Choose a content encoding acceptable to the client.
+
+    Args:
+        accept_encoding: The request's Accept-Encoding header
+        preferences: Encodings the server supports, most preferred first
+
+    Returns:
+        The chosen encoding, or None to send the response uncompressed
+    """
+    accepted = dict(parse_quality_list(accept_encoding))
+    best = None
+    best_quality = 0.0
+    for encoding in preferences:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with a negotiated content encoding.
+
+    Compressible responses of at least minimum_size bytes are buffered and
+    compressed with the encoding the client accepts with the highest q value,
+    preferring the earlier entry in compressors on ties.
+    """
+
+    def __init__(self, app, compressors: Dict[str, Compressor], minimum_size: int = 1024):
+        self.app = app
+        self.compressors = compressors
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        encoding = negotiate_encoding(
+            headers.get(b"accept-encoding", b"").decode("latin-1"), list(self.compressors)
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Dict[str, Any]] = None
+        body_chunks: List[bytes] = []
+
+        async def send_wrapper(message):
+            nonlocal start_message
+
+            if message["type"] == "http.response.start":
+                response_headers = dict(message.get("headers", []))
+                content_type = response_headers.get(b"content-type", b"")
+                if b"content-encoding" in response_headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    await send(message)
+                    return
+                # Hold the response until the body is complete so its size is known
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            body_chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(body_chunks)
+            response_headers = [
+                (name, value) for name, value in start_message.get("headers", [])
+                if name.lower() != b"content-length"
+            ]
+            response_headers.append((b"vary", b"Accept-Encoding"))
+
+            if len(body) >= self.minimum_size:
+                started = time.perf_counter()
+                body = self.compressors[encoding](body)
+                observe_stage("compression", time.perf_counter() - started)
+                response_headers.append((b"content-encoding", encoding.encode("latin-1")))
+
+            response_headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            start_message["headers"] = response_headers
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
@@ -17,10 +17,100 @@ class Settings(BaseSettings):
     # LLM Provider Configuration
     default_llm_provider: str = "gemini"
     llm_fallback_enabled: bool = True
+    llm_single_shot: bool = False  # One combined prompt for all analysis sections
+    
+    # LLM Prompt Budgeting
+    llm_max_input_tokens: int = 2000
+    llm_max_prompt_segments: int = 10
+    llm_max_output_tokens_hypothesis: int = 500
+    llm_max_output_tokens_interpretation: int = 1000
+    llm_max_output_tokens_recommendations: int = 700
+    llm_max_output_tokens_questions: int = 500
+    llm_max_output_tokens_combined: int = 2000
+    
+    # LLM Rate Limiting (per provider)
+    llm_rate_limit_per_minute: int = 60  # 0 disables the token bucket
+    llm_rate_limit_burst: int = 10
+    llm_max_concurrency: int = 4  # Concurrent calls per provider per worker
+    llm_max_queue_wait_seconds: float = 10.0
+    llm_rate_limit_backend: str = "memory"  # "memory" (per worker) or "file" (shared across workers)
+    llm_rate_limit_state_dir: str = "/tmp/pmtools-ratelimit"
+    llm_coalesce_enabled: bool = True  # Share one provider call among identical in-flight prompts
+    
+    # Fake LLM Provider (load testing only; select with DEFAULT_LLM_PROVIDER=fake)
+    llm_fake_enabled: bool = False
+    llm_fake_latency_median_ms: float = 800.0
+    llm_fake_latency_p95_ms: float = 2500.0
+    llm_fake_error_rate: float = 0.0
+    llm_fake_seed: Optional[int] = None
+    
+    # Small-Sample Tests (exact test and Newcombe interval when expected cell counts are low)
+    small_sample_test: str = "fisher"  # "fisher" or "barnard" (slower; tables up to 50 users per arm)
+    small_sample_min_expected_count: float = 5.0
+    
+    # Segment Tree Scan (segments with a hierarchy path in /analyze/results)
+    segment_tree_max_results: int = 20
+    
+    # Bootstrap Intervals (bootstrap_interval in /analyze/results)
+    bootstrap_replicates: int = 2000
+    bootstrap_chunk_size: int = 1_000_000  # Draws per arm per block; bounds memory
+    bootstrap_workers: int = 1  # Threads per request resampling large segment batches; 0 uses every core
+    bootstrap_seed: Optional[int] = 0  # Fixed seed keeps intervals reproducible; unset for random
+    
+    # Power Simulation (power_method="simulation" in /validate/setup)
+    power_simulation_runs: int = 2000  # Simulated experiments per candidate sample size
+    power_simulation_chunk_size: int = 1000  # Simulated experiments drawn per batch; bounds memory
+    power_simulation_budget_ms: float = 250.0  # Search refinement stops after this long
+    power_simulation_seed: Optional[int] = 0  # Fixed seed keeps answers reproducible; unset for random
+    
+    # Duration Forecasting (traffic shape and ramp schedule in /validate/setup)
+    duration_forecast_max_days: int = 730
+    
+    # Background Jobs
+    job_workers: int = 2  # Concurrent background analyses per worker process
+    job_max_pending: int = 100
+    job_ttl_seconds: int = 3600
+    job_store_backend: str = "memory"  # "memory" (per worker) or "sqlite" (records shared across workers; jobs run where accepted)
+    job_sqlite_path: str = "/tmp/pmtools-jobs.sqlite3"
+    
+    # Observability
+    metrics_enabled: bool = True  # Prometheus request and stage metrics at /metrics
+    
+    # Tracing (OpenTelemetry, needs the "tracing" extra)
+    tracing_enabled: bool = False
+    tracing_exporter: str = "otlp"  # "otlp" (HTTP collector), "file" (JSON lines) or "console"
+    tracing_otlp_endpoint: str = "http://localhost:4318/v1/traces"
+    tracing_file_path: str = "/tmp/pmtools-traces.jsonl"
+    tracing_service_name: str = "pmtools-api"
+    tracing_sample_ratio: float = 1.0  # Applies to new traces; sampled parents are always followed
+    
+    # Response Compression
+    compression_enabled: bool = True
+    compression_min_size: int = 1024  # Bytes; smaller responses are sent uncompressed
+    compression_encodings: str = "zstd,br,gzip"  # Server preference order among those the client accepts
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5
+    compression_zstd_level: int = 3
+    
+    # Profiling
+    profiling_enabled: bool = False
+    profiling_sample_rate: float = 0.0  # Fraction of requests profiled at random
+    profiling_header: str = "X-Profile"  # Requests with this header set to true are always profiled
+    profiling_interval_ms: float = 5.0
+    profiling_output_dir: str = "/tmp/pmtools-profiles"
+    profiling_max_profiles: int = 50
+    admin_token: Optional[str] = None  # Required as X-Admin-Token on /admin endpoints; unset disables them
+    
+    # Startup Warm-up (/ready reports ready once it has finished)
+    warmup_enabled: bool = True
+    warmup_llm_connections: bool = False  # Open provider connections at startup (one cheap API call each)
+    warmup_timeout_seconds: float = 10.0  # Per warm-up step
     
     # Production Settings
     workers: int = 4
     log_level: str = "info"
+    log_format: str = "json"  # "json" (one object per line) or "text"
+    access_log_enabled: bool = True  # One structured record per request
 
     class Config:
         env_file = ".env"
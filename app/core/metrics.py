@@ -0,0 +1,138 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR so every worker writes
+# its samples to a shared directory and /metrics aggregates them.
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REQUEST_LATENCY = Histogram(
+    "pmtools_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+STAGE_LATENCY = Histogram(
+    "pmtools_stage_duration_seconds",
+    "Latency of processing stages within a request",
+    ["route", "stage"],
+    buckets=LATENCY_BUCKETS
+)
+
+LLM_REQUEST_LATENCY = Histogram(
+    "pmtools_llm_request_duration_seconds",
+    "LLM provider call latency",
+    ["provider", "outcome"],
+    buckets=LATENCY_BUCKETS
+)
+
+LLM_ERRORS = Counter(
+    "pmtools_llm_errors_total",
+    "LLM provider call failures",
+    ["provider", "error_type"]
+)
+
+LLM_QUEUE_DEPTH = Gauge(
+    "pmtools_llm_queue_depth",
+    "Requests waiting for LLM provider capacity",
+    ["provider"],
+    multiprocess_mode="livesum"
+)
+
+LLM_IN_FLIGHT = Gauge(
+    "pmtools_llm_in_flight",
+    "LLM provider calls currently executing",
+    ["provider"],
+    multiprocess_mode="livesum"
+)
+
+FALLBACK_RESPONSES = Counter(
+    "pmtools_llm_fallback_responses_total",
+    "Responses served with fallback content because LLM generation failed",
+    ["section"]
+)
+
+CACHE_REQUESTS = Counter(
+    "pmtools_cache_requests_total",
+    "Cache and request-coalescing lookups by result",
+    ["cache", "result"]
+)
+
+# ASGI scope of the request being handled, set by MetricsMiddleware
+current_scope: ContextVar[Optional[dict]] = ContextVar("current_scope", default=None)
+
+
+def route_label(scope: Optional[dict]) -> str:
+    """Get the matched route template for a request, keeping label cardinality bounded."""
+    if scope is None:
+        return "background"
+    return getattr(scope.get("route"), "path", "unmatched")
+
+
+def observe_stage(stage: str, duration: float) -> None:
+    """Record the duration of a processing stage for the current route."""
+    STAGE_LATENCY.labels(route=route_label(current_scope.get()), stage=stage).observe(duration)
+
+
+def render_metrics() -> bytes:
+    """Render all metrics in the Prometheus text format, aggregated across workers."""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_worker_exit() -> None:
+    """Drop this worker's live gauge samples when running in multiprocess mode."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        scope_token = current_scope.set(scope)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_LATENCY.labels(
+                method=scope["method"],
+                route=route_label(scope),
+                status=str(status_code)
+            ).observe(time.perf_counter() - started)
+            current_scope.reset(scope_token)
+
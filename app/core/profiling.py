@@ -0,0 +1,226 @@
+import asyncio
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+def frame_label(frame) -> str:
+    """Label a frame by module and qualified function name, without line numbers so samples merge."""
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def capture_stack(frame) -> Tuple[str, ...]:
+    """Capture a stack as frame labels, outermost first."""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return tuple(reversed(labels))
+
+
+class Profile:
+    """Stack samples collected while one request was being handled."""
+
+    def __init__(self, method: str, path: str):
+        self.profile_id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.created_at = time.time()
+        self.started = time.perf_counter()
+        self.duration_ms = 0.0
+        self.status_code: Optional[int] = None
+        self.samples: Counter = Counter()
+
+    def to_folded(self) -> str:
+        """Render samples in the folded stack format read by flamegraph.pl and speedscope."""
+        return "".join(
+            f"{';'.join(stack)} {count}\n" for stack, count in self.samples.most_common()
+        )
+
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "profile_id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "created_at": self.created_at,
+            "duration_ms": round(self.duration_ms, 3),
+            "samples": sum(self.samples.values())
+        }
+
+
+class StackSampler:
+    """
+    Background thread sampling the event loop thread's stack at a fixed interval.
+
+    The thread only runs while at least one profile is active. Each sample is
+    added to every active profile, so concurrently profiled requests on the same
+    event loop also see each other's work.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active: Dict[str, Tuple[int, Profile]] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, profile: Profile) -> None:
+        """Start sampling the calling thread for profile."""
+        with self._lock:
+            self._active[profile.profile_id] = (threading.get_ident(), profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="pmtools-profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, profile: Profile) -> None:
+        """Stop sampling for profile."""
+        with self._lock:
+            self._active.pop(profile.profile_id, None)
+
+    def _run(self) -> None:
+        own_thread = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                active = list(self._active.values())
+
+            frames = sys._current_frames()
+            stacks: Dict[int, Tuple[str, ...]] = {}
+            for thread_id, profile in active:
+                if thread_id == own_thread or thread_id not in frames:
+                    continue
+                if thread_id not in stacks:
+                    stacks[thread_id] = capture_stack(frames[thread_id])
+                profile.samples[stacks[thread_id]] += 1
+
+
+class ProfileStore:
+    """Profiles saved as folded stack files with JSON metadata, keeping the newest max_profiles."""
+
+    def __init__(self, directory: str, max_profiles: int):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def _path(self, profile_id: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.{extension}")
+
+    def save(self, profile: Profile) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(profile.profile_id, "folded"), "w") as folded_file:
+            folded_file.write(profile.to_folded())
+        with open(self._path(profile.profile_id, "json"), "w") as metadata_file:
+            json.dump(profile.metadata(), metadata_file)
+        self._prune()
+
+    def _prune(self) -> None:
+        for metadata in self.list()[self.max_profiles:]:
+            for extension in ("json", "folded"):
+                try:
+                    os.remove(self._path(metadata["profile_id"], extension))
+                except FileNotFoundError:
+                    pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """List saved profile metadata, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+
+        profiles = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as metadata_file:
+                    profiles.append(json.load(metadata_file))
+            except (OSError, ValueError):
+                continue
+        return sorted(profiles, key=lambda metadata: metadata["created_at"], reverse=True)
+
+    def get_folded(self, profile_id: str) -> Optional[str]:
+        """Get the folded stacks of a saved profile."""
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        try:
+            with open(self._path(profile_id, "folded")) as folded_file:
+                return folded_file.read()
+        except FileNotFoundError:
+            return None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling a sample of requests.
+
+    A request is profiled at random with probability sample_rate, or when it
+    carries the trigger header with a truthy value together with a valid
+    X-Admin-Token; without an admin_token the header is ignored, so outside
+    callers cannot force profiling. Profiled responses carry an X-Profile-Id
+    header naming the saved profile. Profiles are saved off the event loop.
+    """
+
+    def __init__(
+        self,
+        app,
+        store: ProfileStore,
+        sampler: StackSampler,
+        sample_rate: float = 0.0,
+        header: str = "X-Profile",
+        admin_token: Optional[str] = None
+    ):
+        self.app = app
+        self.store = store
+        self.sampler = sampler
+        self.sample_rate = sample_rate
+        self.header = header.lower().encode("latin-1")
+        self.admin_token = admin_token.encode("latin-1") if admin_token else None
+
+    def should_profile(self, scope) -> bool:
+        headers = dict(scope.get("headers", []))
+        value = headers.get(self.header, b"").lower()
+        if value in (b"1", b"true", b"yes") and self.admin_token is not None:
+            if hmac.compare_digest(headers.get(b"x-admin-token", b""), self.admin_token):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile.profile_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        self.sampler.start(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.sampler.stop(profile)
+            profile.duration_ms = (time.perf_counter() - profile.started) * 1000
+            await asyncio.to_thread(self.store.save, profile)
+
+
+# Global profile store, shared by the middleware and the admin endpoints
+profile_store = ProfileStore(settings.profiling_output_dir, settings.profiling_max_profiles)
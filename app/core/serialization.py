@@ -0,0 +1,158 @@
+from typing import Any, Dict, List, Optional
+import orjson
+from pydantic import BaseModel
+from starlette.responses import Response
+from app.core.compression import parse_quality_list
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional "bulk" extra
+    msgpack = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # pragma: no cover - optional "bulk" extra
+    pyarrow = None
+
+DUMPS_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Alternative names clients send for the same encodings
+MEDIA_TYPE_ALIASES = {
+    "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+    "application/vnd.msgpack": MSGPACK_MEDIA_TYPE,
+}
+
+
+def _default(value: Any) -> Any:
+    """Serialize types orjson does not handle natively."""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _msgpack_default(value: Any) -> Any:
+    """Serialize types msgpack does not handle natively."""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if hasattr(value, "item"):  # numpy scalars
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not MessagePack serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize content to JSON bytes with orjson.
+
+    Plain dicts and lists are encoded directly, without FastAPI's jsonable_encoder
+    pass; pydantic models and numpy scalars are also accepted.
+    """
+    return orjson.dumps(content, default=_default, option=DUMPS_OPTIONS)
+
+
+def loads(content: Any) -> Any:
+    """Parse JSON bytes or text."""
+    return orjson.loads(content)
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with orjson, for large statistics payloads."""
+    media_type = JSON_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class MessagePackResponse(Response):
+    """MessagePack response carrying the same document as the JSON response."""
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=_msgpack_default)
+
+
+class ArrowResponse(Response):
+    """
+    Arrow IPC stream response for tabular bulk results.
+
+    The list under records_key becomes the record batch; the remaining top-level
+    fields are stored as JSON in the schema metadata under the same keys.
+    """
+    media_type = ARROW_MEDIA_TYPE
+
+    def __init__(self, content: Dict[str, Any], records_key: str, **kwargs: Any):
+        self.records_key = records_key
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Dict[str, Any]) -> bytes:
+        table = pyarrow.Table.from_pylist(content.get(self.records_key) or [])
+        table = table.replace_schema_metadata({
+            key: dumps(value) for key, value in content.items() if key != self.records_key
+        })
+
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+def available_media_types(records_key: Optional[str] = None) -> List[str]:
+    """List the response media types that can be produced, JSON first."""
+    media_types = [JSON_MEDIA_TYPE]
+    if msgpack is not None:
+        media_types.append(MSGPACK_MEDIA_TYPE)
+    if pyarrow is not None and records_key is not None:
+        media_types.append(ARROW_MEDIA_TYPE)
+    return media_types
+
+
+def negotiate_media_type(accept: Optional[str], available: List[str]) -> str:
+    """
+    Choose the response media type from an Accept header.
+
+    Entries are tried by descending q value, in the client's order on ties.
+    Wildcards and unsupported types fall back to JSON, so clients that do not
+    negotiate always receive JSON.
+    """
+    for media_type, quality in parse_quality_list(accept or ""):
+        if quality <= 0:
+            continue
+        media_type = MEDIA_TYPE_ALIASES.get(media_type, media_type)
+        if media_type in available:
+            return media_type
+        if media_type in ("*/*", "application/*"):
+            return available[0]
+    return JSON_MEDIA_TYPE
+
+
+def encode_response(
+    content: Dict[str, Any],
+    accept: Optional[str] = None,
+    status_code: int = 200,
+    records_key: Optional[str] = None
+) -> Response:
+    """
+    Render content in the media type negotiated from the Accept header.
+
+    Args:
+        content: Response payload
+        accept: The request's Accept header
+        status_code: HTTP status code
+        records_key: Key of the record list to send as the Arrow table; Arrow is
+            only offered when given
+
+    Returns:
+        A JSON, MessagePack or Arrow response
+    """
+    media_type = negotiate_media_type(accept, available_media_types(records_key))
+    headers = {"Vary": "Accept"}
+
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return MessagePackResponse(content, status_code=status_code, headers=headers)
+    if media_type == ARROW_MEDIA_TYPE:
+        return ArrowResponse(content, records_key=records_key, status_code=status_code, headers=headers)
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
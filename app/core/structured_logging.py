@@ -0,0 +1,180 @@
+import atexit
+import logging
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+import orjson
+from app.core.metrics import route_label
+from app.core.timing import TIMINGS_SCOPE_KEY
+
+access_logger = logging.getLogger("pmtools.access")
+
+# Attributes every LogRecord has; anything else was passed through extra=
+STANDARD_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including fields passed via extra=."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "timestamp": round(record.created, 6),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode("utf-8")
+
+
+class StructuredQueueHandler(QueueHandler):
+    """
+    Queue handler that keeps extra fields intact for the listener's formatter.
+
+    The stock QueueHandler merges the formatted message and traceback into msg;
+    this one only resolves the message arguments and renders the traceback text,
+    so the JSON formatter still sees every field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level: str, log_format: str = "json") -> QueueListener:
+    """
+    Route all logging through a queue to a background thread writing to stdout.
+
+    Log calls on the request path only enqueue the record; formatting and I/O
+    happen on the listener thread, which is flushed and stopped at exit.
+
+    Args:
+        level: Root log level name
+        log_format: "json" for one JSON object per line, or "text"
+
+    Returns:
+        The started queue listener
+    """
+    if log_format == "json":
+        formatter: logging.Formatter = JSONFormatter()
+    elif log_format == "text":
+        formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    else:
+        raise ValueError(f"Unknown log format: {log_format}")
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, StructuredQueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(StructuredQueueHandler(log_queue))
+    root.setLevel(getattr(logging, level.upper()))
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def summarize_timings(timings) -> Dict[str, Any]:
+    """Summarize stage timings and LLM attribution for the access log."""
+    stages: Dict[str, float] = {}
+    providers = []
+    llm_attempts = 0
+    provider_fallbacks = 0
+    cache_hits = 0
+
+    for stage in timings.stages:
+        stages[stage["name"]] = round(stages.get(stage["name"], 0.0) + stage["duration_ms"], 3)
+        if stage.get("provider") and stage["provider"] not in providers:
+            providers.append(stage["provider"])
+        attempts = stage.get("attempts") or []
+        llm_attempts += len(attempts)
+        provider_fallbacks += sum(1 for attempt in attempts if attempt["outcome"] == "error")
+        if stage.get("coalesced"):
+            cache_hits += 1
+
+    return {
+        "stages": stages,
+        "llm_providers": providers,
+        "llm_attempts": llm_attempts,
+        "provider_fallbacks": provider_fallbacks,
+        "fallback_responses": list(timings.fallbacks),
+        "cache_hits": cache_hits
+    }
+
+
+class AccessLogMiddleware:
+    """
+    ASGI middleware emitting one structured access record per request.
+
+    The record combines latency and payload sizes measured here with the stage
+    timings and LLM attribution collected by ServerTimingMiddleware.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        request_bytes = 0
+        response_bytes = 0
+        response_encoding: Optional[str] = None
+
+        async def receive_wrapper():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_bytes, response_encoding
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                encoding = dict(message.get("headers", [])).get(b"content-encoding")
+                response_encoding = encoding.decode("latin-1") if encoding else None
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            record: Dict[str, Any] = {
+                "event": "request",
+                "method": scope["method"],
+                "route": route_label(scope),
+                "path": scope["path"],
+                "status": status_code,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                "request_bytes": request_bytes,
+                "response_bytes": response_bytes,
+                "response_encoding": response_encoding
+            }
+            timings = scope.get(TIMINGS_SCOPE_KEY)
+            if timings is not None:
+                record.update(summarize_timings(timings))
+            access_logger.info("%s %s %s", scope["method"], scope["path"], status_code, extra=record)
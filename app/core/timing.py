@@ -0,0 +1,224 @@
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs
+from app.core.metrics import FALLBACK_RESPONSES, observe_stage
+from app.core import serialization
+from app.core.tracing import start_span
+
+
+class RequestTimings:
+    """Stage timings collected while handling a single request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.handler_finished: Optional[float] = None
+        self.stages: List[Dict[str, Any]] = []
+        self.fallbacks: List[str] = []
+
+    def add(self, name: str, duration: float, **details: Any) -> None:
+        """Record a completed stage."""
+        stage = {"name": name, "duration_ms": round(duration * 1000, 3)}
+        stage.update(details)
+        self.stages.append(stage)
+
+    def server_timing_header(self) -> str:
+        """Format the stages as a Server-Timing header value."""
+        entries = []
+        for stage in self.stages:
+            entry = f"{stage['name']};dur={stage['duration_ms']}"
+            description = describe_stage(stage)
+            if description:
+                entry += f';desc="{description}"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the timing breakdown for the debug payload."""
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "stages": self.stages
+        }
+
+
+def describe_stage(stage: Dict[str, Any]) -> str:
+    """Summarize LLM attribution details of a stage for the Server-Timing description."""
+    parts = []
+    if stage.get("provider"):
+        parts.append(stage["provider"])
+    if stage.get("attempts"):
+        count = len(stage["attempts"])
+        parts.append(f"{count} attempt" + ("s" if count != 1 else ""))
+    if stage.get("coalesced"):
+        parts.append("coalesced")
+    return ", ".join(parts).replace('"', "'")
+
+
+# Scope key under which ServerTimingMiddleware exposes the timings to outer middleware
+TIMINGS_SCOPE_KEY = "pmtools.timings"
+
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("current_timings", default=None)
+current_stage_details: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
+    "current_stage_details", default=None
+)
+
+
+def record_stage(name: str, duration: float, **details: Any) -> None:
+    """Record a stage in Prometheus metrics and in the current request's timings."""
+    observe_stage(name, duration)
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add(name, duration, **details)
+
+
+@contextmanager
+def track_stage(name: str) -> Iterator[Dict[str, Any]]:
+    """
+    Time a block of code as a named processing stage.
+
+    Yields a details dict; code running inside the block can attach attribution
+    (such as the LLM provider used) through annotate_stage. When tracing is
+    configured the stage also runs inside a child span.
+    """
+    details: Dict[str, Any] = {}
+    with start_span(f"stage.{name}") as span:
+        token = current_stage_details.set(details)
+        started = time.perf_counter()
+        try:
+            yield details
+        finally:
+            current_stage_details.reset(token)
+            record_stage(name, time.perf_counter() - started, **details)
+            if span is not None:
+                span.set_attribute("pmtools.stage", name)
+                if details.get("provider"):
+                    span.set_attribute("gen_ai.system", details["provider"])
+                if details.get("coalesced"):
+                    span.set_attribute("pmtools.llm.coalesced", True)
+
+
+def annotate_stage(**details: Any) -> None:
+    """Attach details to the stage currently being tracked, if any."""
+    stage_details = current_stage_details.get()
+    if stage_details is not None:
+        stage_details.update(details)
+
+
+def record_fallback(section: str) -> None:
+    """Record that a response section was served with fallback content."""
+    FALLBACK_RESPONSES.labels(section=section).inc()
+    timings = current_timings.get()
+    if timings is not None:
+        timings.fallbacks.append(section)
+
+
+def timed_endpoint(endpoint: Callable) -> Callable:
+    """
+    Decorate an async endpoint to record validation time and mark when it returns.
+
+    The validation stage covers everything FastAPI does before calling the endpoint:
+    reading the body, JSON decoding and pydantic validation. The time between the
+    endpoint returning and the response starting is recorded as serialization.
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        timings = current_timings.get()
+        if timings is not None:
+            record_stage("validation", time.perf_counter() - timings.started)
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            if timings is not None:
+                timings.handler_finished = time.perf_counter()
+
+    return wrapper
+
+
+def is_debug_request(scope: Dict[str, Any]) -> bool:
+    """Check whether the request asked for the debug payload via ?debug=true."""
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("debug", ["false"])[-1].lower() in ("1", "true", "yes")
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware exposing per-request stage timings.
+
+    Every response carries a Server-Timing header. When the request has
+    ?debug=true, JSON responses also embed the breakdown under a "debug" key.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        scope[TIMINGS_SCOPE_KEY] = timings
+        token = current_timings.set(timings)
+        debug = is_debug_request(scope)
+        start_message: Optional[Dict[str, Any]] = None
+        body_chunks: List[bytes] = []
+
+        def finish_timings() -> None:
+            if timings.handler_finished is not None:
+                record_stage("serialization", time.perf_counter() - timings.handler_finished)
+                timings.handler_finished = None
+            timings.add("total", time.perf_counter() - timings.started)
+
+        async def send_wrapper(message):
+            nonlocal start_message
+
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                is_json = headers.get(b"content-type", b"").startswith(b"application/json")
+                if debug and is_json:
+                    # Hold the response until the body is complete so it can be rewritten
+                    start_message = message
+                    return
+
+                finish_timings()
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", timings.server_timing_header().encode("latin-1"))
+                ]
+                await send(message)
+                return
+
+            if message["type"] == "http.response.body" and start_message is not None:
+                body_chunks.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+
+                finish_timings()
+                body = b"".join(body_chunks)
+                try:
+                    payload = serialization.loads(body)
+                    if isinstance(payload, dict):
+                        payload["debug"] = {"timings": timings.to_dict()}
+                        body = serialization.dumps(payload)
+                except ValueError:
+                    pass
+
+                headers = [
+                    (name, value) for name, value in start_message.get("headers", [])
+                    if name.lower() != b"content-length"
+                ]
+                headers.append((b"content-length", str(len(body)).encode("latin-1")))
+                headers.append((b"server-timing", timings.server_timing_header().encode("latin-1")))
+                start_message["headers"] = headers
+
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body, "more_body": False})
+                return
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_timings.reset(token)
@@ -0,0 +1,194 @@
+import functools
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+from app.core.metrics import route_label
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.propagate import extract
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:  # pragma: no cover - optional "tracing" extra
+    trace = None
+
+try:
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import (
+        BatchSpanProcessor,
+        ConsoleSpanExporter,
+        SimpleSpanProcessor,
+        SpanExporter,
+    )
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+except ImportError:  # pragma: no cover - optional "tracing" extra
+    TracerProvider = None
+
+logger = logging.getLogger(__name__)
+
+# Set by configure_tracing; spans are only created while a tracer is configured
+_tracer = None
+_provider = None
+
+
+if TracerProvider is not None:
+    class JsonLinesSpanExporter(ConsoleSpanExporter):
+        """Span exporter appending one JSON span per line to a file it closes on shutdown."""
+
+        def __init__(self, path: str):
+            self._file = open(path, "a")
+            super().__init__(out=self._file, formatter=lambda span: span.to_json(indent=None) + "\n")
+
+        def shutdown(self) -> None:
+            # Called by the tracer provider's shutdown, after pending spans are exported
+            if not self._file.closed:
+                self._file.flush()
+                self._file.close()
+
+
+def create_exporter(settings: Any) -> "SpanExporter":
+    """Create the span exporter selected in settings."""
+    if settings.tracing_exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter(endpoint=settings.tracing_otlp_endpoint)
+    if settings.tracing_exporter == "file":
+        # One JSON span per line, readable offline without a collector
+        return JsonLinesSpanExporter(settings.tracing_file_path)
+    if settings.tracing_exporter == "console":
+        return ConsoleSpanExporter()
+    raise ValueError(f"Unknown tracing exporter: {settings.tracing_exporter}")
+
+
+def configure_tracing(settings: Any, exporter: Optional["SpanExporter"] = None) -> Optional["TracerProvider"]:
+    """
+    Configure the tracer used for pmtools spans.
+
+    Args:
+        settings: Application settings
+        exporter: Exporter to use instead of the configured one; spans are then
+            exported synchronously, which keeps tests deterministic
+
+    Returns:
+        The tracer provider, or None if the OpenTelemetry SDK is not installed
+    """
+    global _tracer, _provider
+
+    if TracerProvider is None:
+        logger.warning("Tracing enabled but the OpenTelemetry SDK is not installed")
+        return None
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.tracing_service_name}),
+        sampler=ParentBased(TraceIdRatioBased(settings.tracing_sample_ratio))
+    )
+    if exporter is None:
+        provider.add_span_processor(BatchSpanProcessor(create_exporter(settings)))
+    else:
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+
+    _provider = provider
+    _tracer = provider.get_tracer("pmtools")
+    return provider
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans, stop tracing and close the exporter (and its trace file)."""
+    global _tracer, _provider
+    if _provider is not None:
+        _provider.shutdown()
+    _tracer = None
+    _provider = None
+
+
+@contextmanager
+def start_span(name: str, **attributes: Any) -> Iterator[Optional[Any]]:
+    """
+    Run a block inside a child span of the current span.
+
+    Yields None when tracing is not configured, so callers can skip building
+    attributes.
+    """
+    if _tracer is None:
+        yield None
+        return
+
+    attributes = {key: value for key, value in attributes.items() if value is not None}
+    with _tracer.start_as_current_span(name, attributes=attributes) as span:
+        yield span
+
+
+def set_span_attributes(**attributes: Any) -> None:
+    """Set attributes on the current span, if tracing is active."""
+    if _tracer is None:
+        return
+    span = trace.get_current_span()
+    for key, value in attributes.items():
+        if value is not None:
+            span.set_attribute(key, value)
+
+
+def set_span_error(error: Exception) -> None:
+    """Record a handled exception on the current span and mark it as failed."""
+    if _tracer is None:
+        return
+    span = trace.get_current_span()
+    span.record_exception(error)
+    span.set_status(Status(StatusCode.ERROR, type(error).__name__))
+
+
+def traced(name: str) -> Callable:
+    """Decorate a function to run inside a span of the given name."""
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return function(*args, **kwargs)
+            with _tracer.start_as_current_span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening a server span per request.
+
+    Incoming W3C trace context headers are honoured, so pmtools spans join the
+    caller's trace.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _tracer is None:
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {
+            name.decode("latin-1"): value.decode("latin-1") for name, value in scope.get("headers", [])
+        }
+        method = scope["method"]
+
+        with _tracer.start_as_current_span(
+            method,
+            context=extract(carrier),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope["path"]}
+        ) as span:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = route_label(scope)
+                span.update_name(f"{method} {route}")
+                span.set_attribute("http.route", route)
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.core import serialization
+from app.core.compression import create_compressors
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupStatus:
+    PENDING = "pending"
+    WARMING = "warming"
+    READY = "ready"
+
+
+def warm_statistics() -> None:
+    """Import scipy and run each statistics path once on a small synthetic input."""
+    from app.statistics.calculations import (
+        analyze_segments,
+        calculate_conversion_metrics,
+        generate_tradeoff_matrix,
+    )
+    from app.statistics.stratified import stratified_analysis
+
+    generate_tradeoff_matrix(
+        baseline_conversion_rate=0.05,
+        estimated_daily_users=1000,
+        mde_values=[0.1, 0.2]
+    )
+    calculate_conversion_metrics(1000, 50, 1000, 60)
+    segments = [
+        {"segment_name": "warmup", "variants": [{"users": 100, "conversions": 5}, {"users": 100, "conversions": 7}]},
+        {"segment_name": "warmup-small", "variants": [{"users": 20, "conversions": 1}, {"users": 20, "conversions": 3}]}
+    ]
+    analyze_segments(segments)
+    stratified_analysis(segments)
+
+
+def warm_encoding(settings: Any) -> None:
+    """Validate, serialize and compress a sample response so encoder state is built before traffic."""
+    from app.models.requests import AnalyzeResultsRequest
+    from app.models.responses import StatisticalSummaryModel
+    from app.statistics.calculations import calculate_conversion_metrics
+
+    AnalyzeResultsRequest(
+        context={"hypothesis": "Warm-up hypothesis text", "primary_metric_name": "conversion_rate"},
+        results_data={"variants": [
+            {"name": "control", "users": 1000, "conversions": 50},
+            {"name": "treatment", "users": 1000, "conversions": 60}
+        ]}
+    )
+    summary = StatisticalSummaryModel(**calculate_conversion_metrics(1000, 50, 1000, 60))
+    body = serialization.dumps({"statistical_summary": summary, "segment_analysis": None})
+    for compress in create_compressors(settings).values():
+        compress(body * 20)
+
+
+class Warmup:
+    """
+    Startup warm-up tracking readiness.
+
+    The application reports ready once warm-up has finished, whether or not
+    every step succeeded: warm-up only moves first-request costs to startup,
+    so a failed, timed-out or cancelled step is recorded in the state (which
+    is then degraded) rather than keeping the worker out of rotation for good.
+    """
+
+    def __init__(self):
+        self.status = WarmupStatus.PENDING
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: List[Dict[str, Any]] = []
+
+    @property
+    def is_ready(self) -> bool:
+        return self.status == WarmupStatus.READY
+
+    async def _run_step(self, name: str, step: Callable[[], Awaitable[Any]], timeout: float) -> None:
+        started = time.perf_counter()
+        record: Dict[str, Any] = {"name": name, "ok": True}
+        try:
+            result = await asyncio.wait_for(step(), timeout)
+            if result:
+                record["details"] = result
+        except asyncio.TimeoutError:
+            logger.warning("Warm-up step %s timed out after %.1f s", name, timeout)
+            record.update(ok=False, error=f"Timed out after {timeout} s")
+        except asyncio.CancelledError:
+            record.update(ok=False, error="Cancelled")
+            raise
+        except Exception as e:
+            logger.warning("Warm-up step %s failed: %s", name, e)
+            record.update(ok=False, error=str(e))
+        finally:
+            record["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            self.steps.append(record)
+
+    async def run(self, settings: Any, llm_manager: Optional[Any] = None) -> None:
+        """
+        Run the warm-up steps, each bounded by warmup_timeout_seconds.
+
+        CPU-bound steps run in a worker thread so the event loop keeps answering
+        /health while the process warms up.
+
+        Args:
+            settings: Application settings
+            llm_manager: Manager whose providers are warmed when
+                warmup_llm_connections is enabled
+        """
+        self.status = WarmupStatus.WARMING
+        self.started_at = time.time()
+        self.steps = []
+        timeout = settings.warmup_timeout_seconds
+
+        try:
+            await self._run_step("statistics", lambda: asyncio.to_thread(warm_statistics), timeout)
+            await self._run_step("encoding", lambda: asyncio.to_thread(warm_encoding, settings), timeout)
+
+            if settings.warmup_llm_connections and llm_manager is not None:
+                await self._run_step("llm_connections", llm_manager.warm_up, timeout)
+        finally:
+            # Ready even when a step failed or the run was cancelled; the failure stays in get_state
+            self.finished_at = time.time()
+            self.status = WarmupStatus.READY
+            logger.info(
+                "Warm-up finished in %.0f ms%s", (self.finished_at - self.started_at) * 1000,
+                " (degraded)" if self.is_degraded else "",
+                extra={"warmup_steps": self.steps}
+            )
+
+    @property
+    def is_degraded(self) -> bool:
+        """Whether any warm-up step failed, timed out or was cancelled."""
+        return any(not step["ok"] for step in self.steps)
+
+    def mark_ready(self) -> None:
+        """Report ready without warming up."""
+        self.status = WarmupStatus.READY
+        self.finished_at = time.time()
+
+    def get_state(self) -> Dict[str, Any]:
+        """Get warm-up progress for the readiness endpoint."""
+        return {
+            "status": self.status,
+            "degraded": self.is_degraded,
+            "duration_ms": round((self.finished_at - self.started_at) * 1000, 3)
+            if self.started_at and self.finished_at else None,
+            "steps": self.steps
+        }
+
+
+# Global warm-up state, shared by the lifespan and the readiness endpoint
+warmup = Warmup()
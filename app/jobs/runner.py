@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.jobs.store import JobStatus, JobStore, create_job_store
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+JobFunction = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class JobQueueFullError(Exception):
+    """Raised when the background job queue has no room for another job."""
+    pass
+
+
+class JobRunner:
+    """
+    Bounded pool of asyncio workers executing background jobs.
+
+    Jobs are queued in submission order and executed by a fixed number of
+    workers; submissions beyond max_pending are rejected rather than queued.
+    The queue lives in this process, so a job only runs in the worker process
+    that accepted it, whichever store backend holds its record. Store calls
+    can block (the SQLite store waits on file locks held by other processes),
+    so they run in a thread rather than on the event loop.
+    """
+
+    def __init__(self, store: JobStore, workers: int, max_pending: int):
+        self.store = store
+        self.workers = workers
+        self.max_pending = max_pending
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    async def submit(self, job: JobFunction, partial_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Queue a job for background execution.
+
+        Args:
+            job: Coroutine function producing the job result
+            partial_result: Result data available immediately at submission
+
+        Returns:
+            The created job record
+        """
+        if self._queue is None:
+            raise JobQueueFullError("Background job workers are not running")
+        if self._queue.full():
+            raise JobQueueFullError("Background job queue is full")
+
+        job_id = uuid.uuid4().hex
+        # Created before queueing, so a worker never updates a record that does not exist yet
+        record = await asyncio.to_thread(self.store.create, job_id, partial_result)
+        try:
+            self._queue.put_nowait((job_id, job))
+        except asyncio.QueueFull:
+            # Filled up while the record was being written
+            await asyncio.to_thread(self.store.update, job_id, JobStatus.FAILED, error="Background job queue is full")
+            raise JobQueueFullError("Background job queue is full")
+        return record
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job record from the store, or None if it does not exist or has expired."""
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get worker pool statistics for monitoring."""
+        return {
+            "workers": len(self._tasks),
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "max_pending": self.max_pending
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            job_id, job = await self._queue.get()
+            try:
+                await asyncio.to_thread(self.store.update, job_id, JobStatus.RUNNING)
+                result = await job()
+                await asyncio.to_thread(self.store.update, job_id, JobStatus.COMPLETED, result=result)
+            except asyncio.CancelledError:
+                # The worker is being cancelled, so write the final status directly
+                self.store.update(job_id, JobStatus.FAILED, error="Job cancelled during shutdown")
+                raise
+            except Exception as e:
+                logger.exception("Background job %s failed", job_id)
+                await asyncio.to_thread(self.store.update, job_id, JobStatus.FAILED, error=str(e))
+            finally:
+                self._queue.task_done()
+
+
+# Global background job runner instance
+job_runner = JobRunner(
+    store=create_job_store(settings),
+    workers=settings.job_workers,
+    max_pending=settings.job_max_pending
+)
@@ -0,0 +1,218 @@
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from app.core import serialization
+
+
+class JobStatus:
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class JobStore(ABC):
+    """Abstract storage for background job records with TTL eviction."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+
+    def _new_record(self, job_id: str, partial_result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "job_id": job_id,
+            "status": JobStatus.PENDING,
+            "created_at": now,
+            "updated_at": now,
+            "partial_result": partial_result,
+            "result": None,
+            "error": None
+        }
+
+    @abstractmethod
+    def create(self, job_id: str, partial_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Create a pending job record."""
+        pass
+
+    @abstractmethod
+    def update(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> None:
+        """Update a job's status, result or error."""
+        pass
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job record, or None if it does not exist or has expired."""
+        pass
+
+    @abstractmethod
+    def evict_expired(self) -> int:
+        """Remove expired job records and return how many were removed."""
+        pass
+
+
+class InMemoryJobStore(JobStore):
+    """Job store kept in process memory. Jobs are only visible to the worker that created them."""
+
+    def __init__(self, ttl_seconds: float):
+        super().__init__(ttl_seconds)
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str, partial_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self.evict_expired()
+        record = self._new_record(job_id, partial_result)
+        with self._lock:
+            self._jobs[job_id] = record
+        return dict(record)
+
+    def update(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> None:
+        with self._lock:
+            record = self._jobs.get(job_id)
+            if record is None:
+                return
+            record.update(status=status, result=result, error=error, updated_at=time.time())
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._jobs.get(job_id)
+            if record is None:
+                return None
+            if time.time() - record["updated_at"] > self.ttl_seconds:
+                del self._jobs[job_id]
+                return None
+            return dict(record)
+
+    def evict_expired(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [job_id for job_id, record in self._jobs.items() if record["updated_at"] < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Job store backed by a SQLite file, shared by all workers on the same host.
+
+    Any worker can answer a poll, but the job itself still runs only in the
+    worker process that accepted it. Calls block while another process holds
+    the write lock (up to the 10 s timeout); JobRunner calls them in a thread.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float):
+        super().__init__(ttl_seconds)
+        self.path = path
+        with self._connect() as connection:
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    partial_result TEXT,
+                    result TEXT,
+                    error TEXT
+                )
+                """
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_updated_at ON jobs (updated_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def create(self, job_id: str, partial_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self.evict_expired()
+        record = self._new_record(job_id, partial_result)
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO jobs (job_id, status, created_at, updated_at, partial_result) VALUES (?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    record["status"],
+                    record["created_at"],
+                    record["updated_at"],
+                    serialization.dumps(partial_result) if partial_result is not None else None
+                )
+            )
+        return record
+
+    def update(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE job_id = ?",
+                (
+                    status,
+                    serialization.dumps(result) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id
+                )
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT job_id, status, created_at, updated_at, partial_result, result, error "
+                "FROM jobs WHERE job_id = ? AND updated_at >= ?",
+                (job_id, time.time() - self.ttl_seconds)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            "job_id": row[0],
+            "status": row[1],
+            "created_at": row[2],
+            "updated_at": row[3],
+            "partial_result": serialization.loads(row[4]) if row[4] is not None else None,
+            "result": serialization.loads(row[5]) if row[5] is not None else None,
+            "error": row[6]
+        }
+
+    def evict_expired(self) -> int:
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "DELETE FROM jobs WHERE updated_at < ?",
+                (time.time() - self.ttl_seconds,)
+            )
+            return cursor.rowcount
+
+
+def create_job_store(settings: Any) -> JobStore:
+    """Create the job store configured in application settings."""
+    if settings.job_store_backend == "sqlite":
+        return SQLiteJobStore(settings.job_sqlite_path, settings.job_ttl_seconds)
+    if settings.job_store_backend == "memory":
+        return InMemoryJobStore(settings.job_ttl_seconds)
+    raise ValueError(f"Unknown job store backend: {settings.job_store_backend}")
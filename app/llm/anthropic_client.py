@@ -1,6 +1,7 @@
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 from typing import Optional
 from app.llm.base import LLMProvider, LLMError, LLMUnavailableError
+from app.core.tracing import set_span_attributes
 
 
 class AnthropicProvider(LLMProvider):
@@ -13,7 +14,7 @@ class AnthropicProvider(LLMProvider):
         
         if api_key:
             try:
-                self.client = Anthropic(api_key=api_key)
+                self.client = AsyncAnthropic(api_key=api_key)
             except Exception as e:
                 raise LLMError(f"Failed to initialize Anthropic: {str(e)}")
     
@@ -21,19 +22,35 @@ class AnthropicProvider(LLMProvider):
         """Check if Anthropic is available and configured."""
         return self.api_key is not None and self.client is not None
     
+    async def warm_up(self) -> None:
+        """Open a pooled connection to the API with a request that consumes no tokens."""
+        if not self.is_available():
+            raise LLMUnavailableError("Anthropic provider is not available")
+        
+        try:
+            await self.client.models.list(limit=1)
+        except Exception as e:
+            raise LLMError(f"Anthropic warm-up failed: {str(e)}")
+    
     async def generate_text(self, prompt: str, **kwargs) -> str:
         """Generate text using Claude."""
         if not self.is_available():
             raise LLMUnavailableError("Anthropic provider is not available")
         
         try:
-            response = self.client.messages.create(
+            response = await self.client.messages.create(
                 model=self.model_name,
-                max_tokens=1000,
+                max_tokens=kwargs.get("max_tokens", 1000),
                 messages=[
                     {"role": "user", "content": prompt}
                 ]
             )
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                set_span_attributes(**{
+                    "gen_ai.usage.input_tokens": usage.input_tokens,
+                    "gen_ai.usage.output_tokens": usage.output_tokens
+                })
             if response.content and len(response.content) > 0:
                 return response.content[0].text
             else:
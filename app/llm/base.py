@@ -14,6 +14,10 @@ class LLMProvider(ABC):
     def is_available(self) -> bool:
         """Check if the LLM provider is available and configured."""
         pass
+    
+    async def warm_up(self) -> None:
+        """Open connections ahead of the first request. Providers without a cheap warm-up call skip it."""
+        pass
 
 
 class LLMError(Exception):
@@ -23,4 +27,9 @@ class LLMError(Exception):
 
 class LLMUnavailableError(LLMError):
     """Raised when LLM provider is not available."""
-    pass
\ No newline at end of file
+    pass
+
+
+class LLMRateLimitError(LLMError):
+    """Raised when a request cannot acquire provider capacity within the queue wait limit."""
+    pass
@@ -0,0 +1,136 @@
+import math
+from typing import Callable, Dict, List, Optional
+from app.core.config import settings
+
+
+# Rough characters-per-token ratio shared by Gemini and Claude tokenizers on English text
+CHARS_PER_TOKEN = 4
+
+# Output token limit per prompt section, mapped to its setting
+SECTION_OUTPUT_LIMITS = {
+    "hypothesis": "llm_max_output_tokens_hypothesis",
+    "interpretation": "llm_max_output_tokens_interpretation",
+    "recommendations": "llm_max_output_tokens_recommendations",
+    "questions": "llm_max_output_tokens_questions",
+    "combined": "llm_max_output_tokens_combined",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a piece of text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def get_output_token_limit(section: str) -> int:
+    """Get the configured output token limit for a prompt section."""
+    return getattr(settings, SECTION_OUTPUT_LIMITS[section])
+
+
+def rank_segments(segment_results: List[Dict]) -> List[Dict]:
+    """
+    Rank segment analyses by significance, then by effect size.
+
+    Args:
+        segment_results: Segment analyses as produced by analyze_segments
+
+    Returns:
+        Segment analyses ordered from most to least noteworthy
+    """
+    def sort_key(segment: Dict):
+        metrics = segment["metrics"]
+        return (
+            bool(metrics.get("is_significant", False)),
+            abs(metrics.get("z_score", 0)),
+            abs(metrics.get("relative_lift", 0))
+        )
+
+    return sorted(segment_results, key=sort_key, reverse=True)
+
+
+def format_segment_line(segment: Dict) -> str:
+    """Format a single segment analysis as one compact prompt line."""
+    metrics = segment["metrics"]
+    return (
+        f"- {segment['segment_name']}: control {metrics.get('control_conversion_rate', 'N/A')}, "
+        f"treatment {metrics.get('treatment_conversion_rate', 'N/A')}, "
+        f"relative lift {metrics.get('relative_lift', 'N/A')}, "
+        f"p-value {metrics.get('p_value', 'N/A')}, "
+        f"significant {metrics.get('is_significant', 'N/A')}"
+    )
+
+
+def build_segment_context(
+    segment_results: Optional[List[Dict]],
+    token_budget: int,
+    max_segments: int
+) -> str:
+    """
+    Build the segment section of a prompt within a token budget.
+
+    Segments are ranked by significance and effect size, and only the top ones
+    that fit within both max_segments and token_budget are included.
+
+    Args:
+        segment_results: Segment analyses as produced by analyze_segments
+        token_budget: Maximum number of tokens the section may use
+        max_segments: Maximum number of segments to include
+
+    Returns:
+        Segment section text, or an empty string if nothing fits
+    """
+    if not segment_results or token_budget <= 0 or max_segments <= 0:
+        return ""
+
+    header = "Segment Results (ranked by significance and effect size):"
+    used_tokens = estimate_tokens(header)
+    lines = []
+
+    for segment in rank_segments(segment_results)[:max_segments]:
+        line = format_segment_line(segment)
+        line_tokens = estimate_tokens(line)
+        if used_tokens + line_tokens > token_budget:
+            break
+        lines.append(line)
+        used_tokens += line_tokens
+
+    if not lines:
+        return ""
+
+    omitted = len(segment_results) - len(lines)
+    if omitted > 0:
+        lines.append(f"({omitted} lower-ranked segments omitted)")
+
+    return "\n".join([header] + lines)
+
+
+def fit_prompt(
+    build_prompt: Callable[[str], str],
+    segment_results: Optional[List[Dict]] = None,
+    max_input_tokens: Optional[int] = None,
+    max_segments: Optional[int] = None
+) -> str:
+    """
+    Assemble a prompt, filling the remaining input budget with segment context.
+
+    Args:
+        build_prompt: Prompt builder taking the segment context text
+        segment_results: Segment analyses to consider for inclusion
+        max_input_tokens: Input token budget, defaults to settings
+        max_segments: Maximum segments to include, defaults to settings
+
+    Returns:
+        The assembled prompt
+    """
+    if max_input_tokens is None:
+        max_input_tokens = settings.llm_max_input_tokens
+    if max_segments is None:
+        max_segments = settings.llm_max_prompt_segments
+
+    base_prompt = build_prompt("")
+    if not segment_results:
+        return base_prompt
+
+    remaining_budget = max_input_tokens - estimate_tokens(base_prompt)
+    segment_context = build_segment_context(segment_results, remaining_budget, max_segments)
+
+    return build_prompt(segment_context) if segment_context else base_prompt
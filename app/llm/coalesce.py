@@ -0,0 +1,64 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+from app.core.metrics import CACHE_REQUESTS
+
+T = TypeVar("T")
+
+
+def make_request_key(prompt: str, **params: Any) -> str:
+    """Build a stable key identifying an LLM request by its prompt and parameters."""
+    payload = json.dumps({"prompt": prompt, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one in-flight execution.
+
+    The first caller for a key starts the call; callers arriving while it is in
+    flight await the same task and receive its result or its exception. The
+    shared task is shielded, so one caller being cancelled does not cancel it
+    for the others.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.calls_total = 0
+        self.coalesced_total = 0
+
+    def _forget(self, key: str, task: asyncio.Future) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def is_in_flight(self, key: str) -> bool:
+        """Check whether a call for key is currently in flight."""
+        return key in self._in_flight
+
+    async def do(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """Run call for key, or join the identical call already in flight."""
+        self.calls_total += 1
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            CACHE_REQUESTS.labels(cache="llm_single_flight", result="miss").inc()
+        else:
+            self.coalesced_total += 1
+            CACHE_REQUESTS.labels(cache="llm_single_flight", result="hit").inc()
+
+        return await asyncio.shield(task)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get deduplication statistics for monitoring."""
+        return {
+            "in_flight": len(self._in_flight),
+            "calls_total": self.calls_total,
+            "coalesced_total": self.coalesced_total,
+            "deduplication_ratio": round(
+                self.coalesced_total / self.calls_total, 4
+            ) if self.calls_total else 0.0
+        }
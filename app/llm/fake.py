@@ -0,0 +1,79 @@
+import asyncio
+import math
+import random
+from typing import Optional
+from app.llm.base import LLMProvider, LLMError
+
+HYPOTHESIS_RESPONSE = """Score: 7/10
+Assessment: The hypothesis names the change and the metric and expects an increase, but it does not quantify the expected lift.
+Suggestions: State the minimum lift you expect and why the change should produce it."""
+
+INTERPRETATION_RESPONSE = (
+    "The treatment converted at a higher rate than control. The difference is large enough to matter "
+    "in practice, but confirm it holds across key segments before rolling it out to all users."
+)
+
+RECOMMENDATIONS_RESPONSE = """1. ACTION: SHIP TO ALL USERS - CONFIDENCE: Medium
+   Rationale: The observed lift is positive and consistent with the hypothesis.
+
+2. ACTION: MONITOR SEGMENTS - CONFIDENCE: High
+   Rationale: Segment results vary, so watch the weakest segments after launch.
+
+3. ACTION: ITERATE AND RE-TEST - CONFIDENCE: Low
+   Rationale: A follow-up test could confirm the effect size with more traffic."""
+
+QUESTIONS_RESPONSE = """1. Which user segments contributed most of the observed lift?
+2. Did any external events overlap with the test window?
+3. Does the effect persist beyond the novelty period?
+4. How does the change affect downstream retention and revenue?
+5. What variant would test the mechanism behind the lift more directly?"""
+
+
+class FakeProvider(LLMProvider):
+    """
+    Canned-response provider with a log-normal latency distribution, for load testing.
+
+    Responses follow the format each prompt asks for, so parsing and response
+    building run exactly as they would with a real provider.
+    """
+
+    def __init__(
+        self,
+        latency_median_ms: float = 800.0,
+        latency_p95_ms: float = 2500.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.model_name = "fake"
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+        # Log-normal with the given median and 95th percentile (z = 1.645)
+        self._mu = math.log(max(latency_median_ms, 0.001) / 1000)
+        self._sigma = max(math.log(max(latency_p95_ms, latency_median_ms) / max(latency_median_ms, 0.001)) / 1.645, 0.0)
+
+    def is_available(self) -> bool:
+        return True
+
+    def sample_latency(self) -> float:
+        """Draw one call latency in seconds."""
+        return self._random.lognormvariate(self._mu, self._sigma)
+
+    async def generate_text(self, prompt: str, **kwargs) -> str:
+        await asyncio.sleep(self.sample_latency())
+        if self._random.random() < self.error_rate:
+            raise LLMError("Fake provider injected error")
+
+        if "=== INTERPRETATION ===" in prompt:
+            return (
+                f"=== INTERPRETATION ===\n{INTERPRETATION_RESPONSE}\n\n"
+                f"=== RECOMMENDATIONS ===\n{RECOMMENDATIONS_RESPONSE}\n\n"
+                f"=== QUESTIONS ===\n{QUESTIONS_RESPONSE}"
+            )
+        if "Score: X/10" in prompt:
+            return HYPOTHESIS_RESPONSE
+        if "ACTION: [Action]" in prompt:
+            return RECOMMENDATIONS_RESPONSE
+        if "follow-up questions" in prompt:
+            return QUESTIONS_RESPONSE
+        return INTERPRETATION_RESPONSE
@@ -1,6 +1,7 @@
 import google.generativeai as genai
 from typing import Optional
 from app.llm.base import LLMProvider, LLMError, LLMUnavailableError
+from app.core.tracing import set_span_attributes
 
 
 class GeminiProvider(LLMProvider):
@@ -28,7 +29,20 @@ class GeminiProvider(LLMProvider):
             raise LLMUnavailableError("Gemini provider is not available")
         
         try:
-            response = self.model.generate_content(prompt)
+            generation_config = {}
+            if kwargs.get("max_tokens"):
+                generation_config["max_output_tokens"] = kwargs["max_tokens"]
+            
+            response = await self.model.generate_content_async(
+                prompt,
+                generation_config=generation_config or None
+            )
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None:
+                set_span_attributes(**{
+                    "gen_ai.usage.input_tokens": usage.prompt_token_count,
+                    "gen_ai.usage.output_tokens": usage.candidates_token_count
+                })
             if response.text:
                 return response.text
             else:
@@ -1,8 +1,23 @@
+import asyncio
+import logging
+import time
 from typing import Optional, Dict, Any
 from app.llm.base import LLMProvider, LLMError, LLMUnavailableError
 from app.llm.gemini import GeminiProvider
 from app.llm.anthropic_client import AnthropicProvider
+from app.llm.fake import FakeProvider
+from app.llm.ratelimit import ProviderLimiter, create_limiter
+from app.llm.coalesce import SingleFlight, make_request_key
 from app.core.config import settings
+from app.core.metrics import LLM_ERRORS, LLM_REQUEST_LATENCY
+from app.core.timing import annotate_stage
+from app.core.tracing import set_span_attributes, set_span_error, start_span
+
+logger = logging.getLogger(__name__)
+
+
+# Name of the load-testing provider
+FAKE_PROVIDER = "fake"
 
 
 class LLMManager:
@@ -10,6 +25,8 @@ class LLMManager:
     
     def __init__(self):
         self.providers: Dict[str, LLMProvider] = {}
+        self.limiters: Dict[str, ProviderLimiter] = {}
+        self.single_flight = SingleFlight()
         self._init_providers()
     
     def _init_providers(self):
@@ -21,10 +38,9 @@ class LLMManager:
                     api_key=settings.google_api_key,
                     model_name=settings.gemini_model
                 )
-                print(f"Initialized Gemini provider with model: {settings.gemini_model}")
+                logger.info("Initialized Gemini provider with model: %s", settings.gemini_model)
             except LLMError as e:
-                print(f"Failed to initialize Gemini provider: {e}")
-                pass
+                logger.warning("Failed to initialize Gemini provider: %s", e)
         
         # Initialize Anthropic
         if settings.anthropic_api_key and not settings.anthropic_api_key.startswith("your_"):
@@ -33,17 +49,49 @@ class LLMManager:
                     api_key=settings.anthropic_api_key,
                     model_name=settings.anthropic_model
                 )
-                print(f"Initialized Anthropic provider with model: {settings.anthropic_model}")
+                logger.info("Initialized Anthropic provider with model: %s", settings.anthropic_model)
             except LLMError as e:
-                print(f"Failed to initialize Anthropic provider: {e}")
-                pass
+                logger.warning("Failed to initialize Anthropic provider: %s", e)
+        
+        # Fake provider for load testing; never enabled by default
+        if settings.llm_fake_enabled:
+            self.providers[FAKE_PROVIDER] = FakeProvider(
+                latency_median_ms=settings.llm_fake_latency_median_ms,
+                latency_p95_ms=settings.llm_fake_latency_p95_ms,
+                error_rate=settings.llm_fake_error_rate,
+                seed=settings.llm_fake_seed
+            )
+            logger.warning("Fake LLM provider enabled: responses are canned, for load testing only")
+        
+        for name in self.providers:
+            self.limiters[name] = create_limiter(name, settings)
         
-        print(f"Available LLM providers: {list(self.providers.keys())}")
+        logger.info("Available LLM providers: %s", list(self.providers.keys()))
     
     def get_available_providers(self) -> list[str]:
         """Get list of available provider names."""
         return [name for name, provider in self.providers.items() if provider.is_available()]
     
+    async def warm_up(self) -> Dict[str, Optional[str]]:
+        """
+        Warm up every available provider concurrently.
+        
+        Returns:
+            Provider name to error message, or None when warm-up succeeded
+        """
+        names = self.get_available_providers()
+        results = await asyncio.gather(
+            *(self.providers[name].warm_up() for name in names), return_exceptions=True
+        )
+        return {
+            name: str(result) if isinstance(result, Exception) else None
+            for name, result in zip(names, results)
+        }
+    
+    def get_limiter_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get rate limiter queue statistics per provider."""
+        return {name: limiter.get_stats() for name, limiter in self.limiters.items()}
+    
     async def generate_text(
         self, 
         prompt: str, 
@@ -63,34 +111,105 @@ class LLMManager:
         Returns:
             Generated text response
         """
+        if not settings.llm_coalesce_enabled:
+            return await self._generate_text(prompt, preferred_provider, use_fallback, **kwargs)
+        
+        # Identical concurrent requests share a single provider call
+        key = make_request_key(
+            prompt,
+            preferred_provider=preferred_provider,
+            use_fallback=use_fallback,
+            **kwargs
+        )
+        if self.single_flight.is_in_flight(key):
+            annotate_stage(coalesced=True)
+        
+        return await self.single_flight.do(
+            key,
+            lambda: self._generate_text(prompt, preferred_provider, use_fallback, **kwargs)
+        )
+    
+    async def _generate_text(
+        self,
+        prompt: str,
+        preferred_provider: Optional[str],
+        use_fallback: bool,
+        **kwargs
+    ) -> str:
+        """Generate text by trying providers in order, without coalescing."""
         providers_to_try = []
         
         # Add preferred provider first
         if preferred_provider and preferred_provider in self.providers:
             providers_to_try.append(preferred_provider)
         
-        # Add fallback providers if enabled
+        # Add fallback providers if enabled. The fake provider never shares a fallback chain
+        # with real ones, so injected load-test errors do not turn into billed API calls
         if use_fallback:
             for name in self.get_available_providers():
-                if name not in providers_to_try:
-                    providers_to_try.append(name)
+                if name in providers_to_try:
+                    continue
+                if providers_to_try and (name == FAKE_PROVIDER) != (providers_to_try[0] == FAKE_PROVIDER):
+                    continue
+                providers_to_try.append(name)
         
         if not providers_to_try:
             raise LLMUnavailableError("No LLM providers are available")
         
         last_error = None
+        attempts = []
         for provider_name in providers_to_try:
             provider = self.providers[provider_name]
             
             if not provider.is_available():
                 continue
             
-            try:
-                return await provider.generate_text(prompt, **kwargs)
-            except LLMError as e:
-                last_error = e
-                continue
+            with start_span(
+                "llm.generate_text",
+                **{
+                    "gen_ai.system": provider_name,
+                    "gen_ai.request.model": getattr(provider, "model_name", None),
+                    "gen_ai.request.max_tokens": kwargs.get("max_tokens"),
+                    "pmtools.llm.attempt": len(attempts) + 1,
+                    "pmtools.llm.fallback_reason": type(last_error).__name__ if last_error else None
+                }
+            ):
+                started = time.perf_counter()
+                try:
+                    limiter = self.limiters.get(provider_name)
+                    if limiter is None:
+                        response = await provider.generate_text(prompt, **kwargs)
+                    else:
+                        async with limiter.acquire():
+                            response = await provider.generate_text(prompt, **kwargs)
+                    
+                    duration = time.perf_counter() - started
+                    LLM_REQUEST_LATENCY.labels(provider=provider_name, outcome="success").observe(duration)
+                    set_span_attributes(**{"pmtools.llm.outcome": "success"})
+                    attempts.append({
+                        "provider": provider_name,
+                        "outcome": "success",
+                        "duration_ms": round(duration * 1000, 3)
+                    })
+                    annotate_stage(provider=provider_name, attempts=attempts)
+                    return response
+                except LLMError as e:
+                    duration = time.perf_counter() - started
+                    LLM_REQUEST_LATENCY.labels(provider=provider_name, outcome="error").observe(duration)
+                    LLM_ERRORS.labels(provider=provider_name, error_type=type(e).__name__).inc()
+                    set_span_attributes(**{"pmtools.llm.outcome": "error"})
+                    set_span_error(e)
+                    attempts.append({
+                        "provider": provider_name,
+                        "outcome": "error",
+                        "duration_ms": round(duration * 1000, 3),
+                        "error": type(e).__name__
+                    })
+                    logger.warning("LLM provider %s failed: %s", provider_name, e)
+                    last_error = e
+                    continue
         
+        annotate_stage(provider=None, attempts=attempts)
         raise LLMError(f"All LLM providers failed. Last error: {last_error}")
 
 
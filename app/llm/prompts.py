@@ -1,3 +1,6 @@
+from typing import Dict, List, Optional
+
+
 def get_hypothesis_assessment_prompt(hypothesis: str) -> str:
     """Generate prompt for hypothesis clarity assessment."""
     return f"""
@@ -35,11 +38,31 @@ Suggestions: [Specific, actionable improvements - always provide suggestions unl
 """
 
 
+def format_metrics_context(metric_results: Optional[List[Dict]]) -> str:
+    """Summarize every metric of the experiment in one block, so a single narrative covers them all."""
+    if not metric_results:
+        return ""
+    
+    lines = ["All Metrics (p-values adjusted for the false discovery rate across metrics):"]
+    for metric in metric_results:
+        status = "significant" if metric["is_significant"] else "not significant"
+        if metric["guardrail_violated"]:
+            status += ", GUARDRAIL VIOLATED"
+        lines.append(
+            f"- {metric['metric_name']} ({metric['role']}): relative lift {metric['relative_lift']}, "
+            f"adjusted p-value {metric['adjusted_p_value']}, {status}"
+        )
+    lines.append("Interpret these metrics together, weighing secondary metrics and any guardrail regressions.")
+    return "\n".join(lines)
+
+
 def get_interpretation_prompt(
     hypothesis: str,
     metric_name: str,
     statistical_results: dict,
-    pm_notes: str = None
+    pm_notes: str = None,
+    segment_context: str = "",
+    metrics_context: str = ""
 ) -> str:
     """Generate prompt for experiment results interpretation."""
     
@@ -62,6 +85,10 @@ Primary Metric: {metric_name}
 Statistical Results:
 {results_summary}
 
+{metrics_context}
+
+{segment_context}
+
 {context_section}
 
 Please provide a plain-English interpretation of these results. Consider:
@@ -77,7 +104,8 @@ Keep your explanation accessible to someone who is data-literate but not a stati
 def get_recommendations_prompt(
     hypothesis: str,
     statistical_results: dict,
-    pm_notes: str = None
+    pm_notes: str = None,
+    metrics_context: str = ""
 ) -> str:
     """Generate prompt for actionable recommendations."""
     
@@ -92,6 +120,7 @@ Hypothesis: "{hypothesis}"
 Statistical significance: {significance}
 P-value: {p_value}
 Relative lift: {relative_lift}
+{metrics_context}
 {"PM Context: " + pm_notes if pm_notes else ""}
 
 For each recommendation, provide:
@@ -113,7 +142,8 @@ Format as:
 def get_followup_questions_prompt(
     hypothesis: str,
     statistical_results: dict,
-    pm_notes: str = None
+    pm_notes: str = None,
+    metrics_context: str = ""
 ) -> str:
     """Generate prompt for follow-up questions."""
     
@@ -122,6 +152,7 @@ Based on these A/B test results, generate 5 critical follow-up questions the Pro
 
 Hypothesis: "{hypothesis}"
 Results: {statistical_results.get('is_significant', False)} significance, {statistical_results.get('relative_lift', 0)} relative lift
+{metrics_context}
 {"PM Context: " + pm_notes if pm_notes else ""}
 
 Focus on questions that would:
@@ -132,4 +163,56 @@ Focus on questions that would:
 5. Inform broader product strategy
 
 Format as a numbered list of 5 questions, each being specific and actionable.
-"""
\ No newline at end of file
+"""
+
+def get_combined_analysis_prompt(
+    hypothesis: str,
+    metric_name: str,
+    statistical_results: dict,
+    pm_notes: str = None,
+    segment_context: str = "",
+    metrics_context: str = ""
+) -> str:
+    """Generate a single prompt for interpretation, recommendations and follow-up questions."""
+    
+    results_summary = f"""
+Control conversion rate: {statistical_results.get('control_conversion_rate', 'N/A')}
+Treatment conversion rate: {statistical_results.get('treatment_conversion_rate', 'N/A')}
+Relative lift: {statistical_results.get('relative_lift', 'N/A')}
+P-value: {statistical_results.get('p_value', 'N/A')}
+Statistical significance: {statistical_results.get('is_significant', 'N/A')}
+"""
+    
+    context_section = f"PM Context: {pm_notes}" if pm_notes else ""
+    
+    return f"""
+You are a statistical consultant helping a Product Manager interpret A/B test results.
+
+Original Hypothesis: "{hypothesis}"
+Primary Metric: {metric_name}
+
+Statistical Results:
+{results_summary}
+
+{metrics_context}
+
+{segment_context}
+
+{context_section}
+
+Produce exactly three sections, each starting with its header line exactly as shown.
+
+=== INTERPRETATION ===
+A plain-English interpretation of these results. Cover what they mean in practical terms,
+whether they are statistically and practically significant, what factors might explain them,
+and the key takeaways. Keep it accessible to someone who is data-literate but not a statistician.
+
+=== RECOMMENDATIONS ===
+3-5 specific, actionable next steps (e.g., "SHIP TO ALL USERS", "ITERATE AND RE-TEST", "ABANDON HYPOTHESIS"), formatted as:
+1. ACTION: [Action] - CONFIDENCE: [High/Medium/Low]
+   Rationale: [1-2 sentence explanation]
+
+=== QUESTIONS ===
+A numbered list of 5 specific, actionable follow-up questions covering user behavior,
+confounding factors, segmentation, future experiment design and product strategy.
+"""
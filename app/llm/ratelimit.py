@@ -0,0 +1,211 @@
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from app.llm.base import LLMError, LLMRateLimitError
+from app.core.metrics import LLM_IN_FLIGHT, LLM_QUEUE_DEPTH
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+class TokenBucket:
+    """In-process token bucket limiting the request rate to a provider."""
+
+    def __init__(
+        self,
+        rate_per_second: float,
+        capacity: int,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+
+    def _refill(self, tokens: float, updated: float, now: float) -> float:
+        elapsed = max(0.0, now - updated)
+        return min(float(self.capacity), tokens + elapsed * self.rate_per_second)
+
+    def try_acquire(self) -> float:
+        """
+        Take one token if available.
+
+        Returns:
+            0 if a token was taken, otherwise seconds until one becomes available
+        """
+        now = self._clock()
+        self._tokens = self._refill(self._tokens, self._updated, now)
+        self._updated = now
+
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate_per_second
+
+
+class FileTokenBucket(TokenBucket):
+    """Token bucket whose state is shared across worker processes through a locked file."""
+
+    def __init__(self, path: str, rate_per_second: float, capacity: int):
+        if fcntl is None:
+            raise LLMError("File-lock rate limit backend requires a POSIX platform")
+
+        # Wall-clock time so that all workers agree on refill timing
+        super().__init__(rate_per_second, capacity, clock=time.time)
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def try_acquire(self) -> float:
+        with open(self.path, "a+") as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                state_file.seek(0)
+                content = state_file.read()
+                now = self._clock()
+
+                try:
+                    state = json.loads(content)
+                    tokens = self._refill(state["tokens"], state["updated"], now)
+                except (ValueError, KeyError, TypeError):
+                    tokens = float(self.capacity)
+
+                if tokens >= 1:
+                    tokens -= 1
+                    wait = 0.0
+                else:
+                    wait = (1 - tokens) / self.rate_per_second
+
+                state_file.seek(0)
+                state_file.truncate()
+                state_file.write(json.dumps({"tokens": tokens, "updated": now}))
+                state_file.flush()
+                return wait
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+
+
+class ProviderLimiter:
+    """
+    Rate limiter and bounded concurrency pool for a single LLM provider.
+
+    Callers queue in FIFO order: the head of the queue waits for a rate limit
+    token, then for a free concurrency slot. Requests that cannot start within
+    max_queue_wait seconds fail with LLMRateLimitError so the manager can fall
+    back to another provider.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        bucket: Optional[TokenBucket],
+        max_concurrency: int,
+        max_queue_wait: float
+    ):
+        self.name = name
+        self.bucket = bucket
+        self.max_concurrency = max_concurrency
+        self.max_queue_wait = max_queue_wait
+        self._queue_lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.acquired_total = 0
+        self.rejected_total = 0
+        self.wait_seconds_total = 0.0
+
+    async def _wait_for_token(self, deadline: float) -> None:
+        loop = asyncio.get_running_loop()
+        while self.bucket is not None:
+            wait = self.bucket.try_acquire()
+            if wait == 0:
+                return
+            if loop.time() + wait > deadline:
+                raise LLMRateLimitError(
+                    f"Rate limit for {self.name} exceeded the {self.max_queue_wait}s queue wait"
+                )
+            await asyncio.sleep(wait)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[None]:
+        """Wait for a rate limit token and a concurrency slot."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + self.max_queue_wait
+
+        self.queue_depth += 1
+        LLM_QUEUE_DEPTH.labels(provider=self.name).inc()
+        try:
+            # Only the head of the queue polls the bucket, which keeps ordering fair
+            await asyncio.wait_for(self._queue_lock.acquire(), self.max_queue_wait)
+            try:
+                await self._wait_for_token(deadline)
+            finally:
+                self._queue_lock.release()
+
+            await asyncio.wait_for(self._semaphore.acquire(), max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            self.rejected_total += 1
+            raise LLMRateLimitError(
+                f"Timed out after {self.max_queue_wait}s waiting for {self.name} capacity"
+            )
+        except LLMRateLimitError:
+            self.rejected_total += 1
+            raise
+        finally:
+            self.queue_depth -= 1
+            LLM_QUEUE_DEPTH.labels(provider=self.name).dec()
+
+        self.acquired_total += 1
+        self.wait_seconds_total += loop.time() - started
+        self.in_flight += 1
+        LLM_IN_FLIGHT.labels(provider=self.name).inc()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            LLM_IN_FLIGHT.labels(provider=self.name).dec()
+            self._semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue and throughput statistics for monitoring."""
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "acquired_total": self.acquired_total,
+            "rejected_total": self.rejected_total,
+            "average_wait_seconds": round(
+                self.wait_seconds_total / self.acquired_total, 4
+            ) if self.acquired_total else 0.0
+        }
+
+
+def create_limiter(name: str, settings: Any) -> ProviderLimiter:
+    """Create a provider limiter from application settings."""
+    bucket = None
+    if settings.llm_rate_limit_per_minute > 0:
+        rate_per_second = settings.llm_rate_limit_per_minute / 60
+        if settings.llm_rate_limit_backend == "file":
+            bucket = FileTokenBucket(
+                path=os.path.join(settings.llm_rate_limit_state_dir, f"{name}.json"),
+                rate_per_second=rate_per_second,
+                capacity=settings.llm_rate_limit_burst
+            )
+        elif settings.llm_rate_limit_backend == "memory":
+            bucket = TokenBucket(rate_per_second, settings.llm_rate_limit_burst)
+        else:
+            raise LLMError(f"Unknown rate limit backend: {settings.llm_rate_limit_backend}")
+
+    return ProviderLimiter(
+        name=name,
+        bucket=bucket,
+        max_concurrency=settings.llm_max_concurrency,
+        max_queue_wait=settings.llm_max_queue_wait_seconds
+    )
@@ -1,24 +1,60 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from app.api.validate import router as validate_router
-from app.api.analyze import router as analyze_router
-from app.core.config import settings
+import asyncio
+from contextlib import asynccontextmanager
 import logging
+from app.core.config import settings
+from app.core.structured_logging import AccessLogMiddleware, configure_logging
 
-# Configure logging for production
-logging.basicConfig(
-    level=getattr(logging, settings.log_level.upper()),
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+# Configure logging before importing modules that log while initializing
+configure_logging(settings.log_level, settings.log_format)
+
+from fastapi import FastAPI, Response  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from app.api.validate import router as validate_router  # noqa: E402
+from app.api.analyze import router as analyze_router  # noqa: E402
+from app.api.meta import router as meta_router  # noqa: E402
+from app.api.admin import router as admin_router  # noqa: E402
+from app.jobs.runner import job_runner  # noqa: E402
+from app.core.metrics import MetricsMiddleware, render_metrics, mark_worker_exit, CONTENT_TYPE_LATEST  # noqa: E402
+from app.core.timing import ServerTimingMiddleware  # noqa: E402
+from app.core.compression import CompressionMiddleware, create_compressors  # noqa: E402
+from app.core.profiling import ProfilingMiddleware, StackSampler, profile_store  # noqa: E402
+from app.core.tracing import TracingMiddleware, configure_tracing, shutdown_tracing  # noqa: E402
+from app.core.warmup import warmup  # noqa: E402
+from app.llm.manager import llm_manager  # noqa: E402
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background workers and tracing, and warm up, with the application."""
+    if settings.tracing_enabled:
+        configure_tracing(settings)
+    await job_runner.start()
+    
+    # Warm up in the background so /health answers while /ready waits for it
+    warmup_task = None
+    if settings.warmup_enabled:
+        warmup_task = asyncio.create_task(warmup.run(settings, llm_manager))
+    else:
+        warmup.mark_ready()
+    
+    yield
+    
+    if warmup_task is not None:
+        warmup_task.cancel()
+    await job_runner.stop()
+    shutdown_tracing()
+    mark_worker_exit()
+
+
 app = FastAPI(
     title="PM Tools - A/B Testing API",
     description="A/B Testing Validation & Analysis API for Product Managers",
     version="1.0.0",
     docs_url="/docs" if settings.api_debug else None,  # Disable docs in production
     redoc_url="/redoc" if settings.api_debug else None,  # Disable redoc in production
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -27,11 +63,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id"],
 )
 
+app.add_middleware(ServerTimingMiddleware)
+
+# Outside ServerTimingMiddleware, which rewrites JSON bodies for ?debug=true
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        compressors=create_compressors(settings),
+        minimum_size=settings.compression_min_size
+    )
+
+if settings.profiling_enabled and not settings.admin_token:
+    logger.warning("PROFILING_ENABLED is set without ADMIN_TOKEN; profiling header and /admin endpoints are disabled")
+
+if settings.profiling_enabled:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=profile_store,
+        sampler=StackSampler(interval=settings.profiling_interval_ms / 1000),
+        sample_rate=settings.profiling_sample_rate,
+        header=settings.profiling_header,
+        admin_token=settings.admin_token
+    )
+
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+# Outermost, so the record covers the full request including compression
+if settings.access_log_enabled:
+    app.add_middleware(AccessLogMiddleware)
+
+# Passes requests straight through until configure_tracing runs at startup
+app.add_middleware(TracingMiddleware)
+
 # Include API routers
 app.include_router(validate_router)
 app.include_router(analyze_router)
+app.include_router(meta_router)
+
+# Admin endpoints expose stacks of the live process; only mounted behind a token
+if settings.admin_token:
+    app.include_router(admin_router)
 
 
 @app.get("/")
@@ -46,7 +121,7 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint for container orchestration and monitoring."""
+    """Liveness check: the process is up. Use /ready to route traffic only to warm workers."""
     return {
         "status": "healthy",
         "version": "1.0.0",
@@ -54,6 +129,26 @@ async def health_check():
     }
 
 
+@app.get("/ready")
+async def readiness_check(response: Response):
+    """Readiness check: 503 until startup warm-up has finished and workers are running."""
+    ready = warmup.is_ready and job_runner.is_running
+    if not ready:
+        response.status_code = 503
+    
+    return {
+        "status": "ready" if ready else "not_ready",
+        "warmup": warmup.get_state(),
+        "job_workers_running": job_runner.is_running
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint."""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/llm/status")
 async def llm_status():
     """Check LLM provider status."""
@@ -68,5 +163,7 @@ async def llm_status():
         "fallback_enabled": settings.llm_fallback_enabled,
         "gemini_model": settings.gemini_model,
         "anthropic_model": settings.anthropic_model,
-        "total_providers": len(llm_manager.providers)
+        "total_providers": len(llm_manager.providers),
+        "rate_limits": llm_manager.get_limiter_stats(),
+        "coalescing": llm_manager.single_flight.get_stats()
     }
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional, List, Union
+from typing import Dict, Optional, List, Union
 from enum import Enum
 
 
@@ -7,12 +7,35 @@ class MetricModel(BaseModel):
     baseline_conversion_rate: float = Field(..., ge=0, le=1, description="Baseline conversion rate (0-1)")
 
 
+class PowerMethod(str, Enum):
+    ANALYTIC = "analytic"
+    SIMULATION = "simulation"
+
+
+class MultipleComparisonCorrection(str, Enum):
+    NONE = "none"
+    BONFERRONI = "bonferroni"
+    SIDAK = "sidak"
+
+
 class ParametersModel(BaseModel):
     variants: int = Field(default=2, ge=2, description="Number of variants in the test")
     minimum_detectable_effect_relative: Optional[float] = Field(None, gt=0, description="Relative MDE (e.g., 0.10 for 10%)")
     minimum_detectable_effect_absolute: Optional[float] = Field(None, gt=0, le=1, description="Absolute MDE (e.g., 0.005)")
     statistical_power: float = Field(default=0.8, ge=0.5, le=0.99, description="Statistical power (1-β)")
     significance_level: float = Field(default=0.05, gt=0, lt=0.5, description="Significance level (α)")
+    power_method: PowerMethod = Field(
+        default=PowerMethod.ANALYTIC,
+        description="Sample size from the normal approximation or from Monte Carlo power simulation"
+    )
+    allocation: Optional[List[float]] = Field(
+        None,
+        description="Traffic weight per variant, control first (e.g., [2, 1, 1]); defaults to an equal split"
+    )
+    multiple_comparison_correction: MultipleComparisonCorrection = Field(
+        default=MultipleComparisonCorrection.BONFERRONI,
+        description="Alpha correction across treatment-vs-control comparisons when there are more than 2 variants"
+    )
     
     @validator('minimum_detectable_effect_absolute')
     def validate_mde(cls, v, values):
@@ -26,10 +49,72 @@ class ParametersModel(BaseModel):
             raise ValueError("Exactly one of minimum_detectable_effect_relative or minimum_detectable_effect_absolute must be provided")
         
         return v
+    
+    @validator('allocation')
+    def validate_allocation(cls, v, values):
+        if v is None:
+            return v
+        
+        if 'variants' in values and len(v) != values['variants']:
+            raise ValueError("allocation must have one weight per variant")
+        
+        if any(weight <= 0 for weight in v):
+            raise ValueError("allocation weights must be positive")
+        
+        return v
+
+
+class RampStepModel(BaseModel):
+    start_day: int = Field(..., ge=0, description="Day the step starts (0 = first day of the test)")
+    exposure: float = Field(..., gt=0, le=1, description="Fraction of eligible traffic in the test from this day")
 
 
 class TrafficModel(BaseModel):
     estimated_daily_users: int = Field(..., gt=0, description="Estimated daily users for the test")
+    daily_traffic: Optional[List[float]] = Field(
+        None,
+        min_items=1,
+        description="Forecast eligible users per day from the start day; repeated cyclically past its end"
+    )
+    weekday_profile: Optional[List[float]] = Field(
+        None,
+        description="Seven relative traffic weights, Monday first, averaging to estimated_daily_users"
+    )
+    start_weekday: int = Field(default=0, ge=0, le=6, description="Weekday the test starts (Monday = 0)")
+    ramp_schedule: Optional[List[RampStepModel]] = Field(
+        None,
+        description="Exposure ramp (e.g., 1% -> 10% -> 50%); each step holds until the next"
+    )
+    
+    @validator('daily_traffic')
+    def validate_daily_traffic(cls, v):
+        if v is not None and (any(users < 0 for users in v) or sum(v) <= 0):
+            raise ValueError("daily_traffic must be non-negative with some traffic")
+        return v
+    
+    @validator('weekday_profile')
+    def validate_weekday_profile(cls, v, values):
+        if v is None:
+            return v
+        
+        if values.get('daily_traffic') is not None:
+            raise ValueError("Provide at most one of daily_traffic or weekday_profile")
+        
+        if len(v) != 7 or any(weight < 0 for weight in v) or sum(v) <= 0:
+            raise ValueError("weekday_profile must have 7 non-negative weights with some traffic")
+        
+        return v
+    
+    @validator('ramp_schedule')
+    def validate_ramp_schedule(cls, v):
+        if v is None:
+            return v
+        
+        start_days = [step.start_day for step in v]
+        if not start_days or start_days[0] != 0 or start_days != sorted(set(start_days)):
+            raise ValueError("ramp_schedule must start on day 0 with strictly increasing start days")
+        
+        return v
 
 
 class ValidateSetupRequest(BaseModel):
@@ -54,6 +139,54 @@ class VariantModel(BaseModel):
 class SegmentModel(BaseModel):
     segment_name: str = Field(..., description="Name of the segment")
     variants: List[VariantModel] = Field(..., min_items=2, description="Variant data for this segment")
+    path: Optional[List[str]] = Field(
+        None,
+        min_items=1,
+        description="Position of this leaf segment in a hierarchy, top level first (e.g., ['EU', 'DE', 'iOS'])"
+    )
+
+
+def check_sum_squares(sum_squares: float, total: Optional[float], users: Optional[int], label: str) -> float:
+    # A sum of squares below total^2 / users would mean a negative variance
+    if total is not None and users and sum_squares < total ** 2 / users * (1 - 1e-9):
+        raise ValueError(f"{label}_sum_squares is too small for {label}_sum over {users} users")
+    return sum_squares
+
+
+class RatioVariantModel(BaseModel):
+    name: str = Field(..., description="Variant name (e.g., 'control', 'treatment')")
+    users: int = Field(..., ge=0, description="Randomization units (e.g., users) in this variant")
+    numerator_sum: float = Field(..., description="Numerator summed over units (e.g., total clicks)")
+    denominator_sum: float = Field(..., description="Denominator summed over units (e.g., total sessions)")
+    numerator_sum_squares: float = Field(..., ge=0, description="Sum over units of the squared numerator")
+    denominator_sum_squares: float = Field(..., ge=0, description="Sum over units of the squared denominator")
+    cross_product_sum: float = Field(..., description="Sum over units of numerator times denominator")
+    
+    @validator('numerator_sum_squares')
+    def numerator_moments_consistent(cls, v, values):
+        return check_sum_squares(v, values.get('numerator_sum'), values.get('users'), "numerator")
+    
+    @validator('denominator_sum_squares')
+    def denominator_moments_consistent(cls, v, values):
+        return check_sum_squares(v, values.get('denominator_sum'), values.get('users'), "denominator")
+
+
+class RatioSegmentModel(BaseModel):
+    segment_name: str = Field(..., description="Name of the segment")
+    variants: List[RatioVariantModel] = Field(..., min_items=2, description="Ratio metric moments for this segment")
+
+
+class MetricRole(str, Enum):
+    SECONDARY = "secondary"
+    GUARDRAIL = "guardrail"
+
+
+class RatioMetricModel(BaseModel):
+    metric_name: str = Field(..., description="Name of the ratio metric (e.g., 'clicks per session')")
+    role: MetricRole = Field(default=MetricRole.SECONDARY, description="Secondary metric or guardrail")
+    higher_is_better: bool = Field(default=True, description="Direction of improvement, used to flag guardrail regressions")
+    variants: List[RatioVariantModel] = Field(..., min_items=2, description="Overall moments per variant, control first")
+    segments: Optional[List[RatioSegmentModel]] = Field(None, description="Optional segmented moments")
 
 
 class ExperimentContextModel(BaseModel):
@@ -62,11 +195,98 @@ class ExperimentContextModel(BaseModel):
     pm_notes: Optional[str] = Field(None, description="Optional qualitative context from PM")
 
 
+class MetricResultsModel(BaseModel):
+    metric_name: str = Field(..., description="Name of the conversion metric (e.g., 'add_to_cart_rate')")
+    role: MetricRole = Field(default=MetricRole.SECONDARY, description="Secondary metric or guardrail")
+    higher_is_better: bool = Field(default=True, description="Direction of improvement, used to flag guardrail regressions")
+    variants: List[VariantModel] = Field(..., min_items=2, description="Results per variant, control first")
+
+
 class ResultsDataModel(BaseModel):
     variants: List[VariantModel] = Field(..., min_items=2, description="Overall variant results")
     segments: Optional[List[SegmentModel]] = Field(None, description="Optional segmented results")
+    metrics: Optional[List[MetricResultsModel]] = Field(
+        None,
+        description="Optional secondary and guardrail conversion metrics; variants above are the primary metric"
+    )
+    ratio_metrics: Optional[List[RatioMetricModel]] = Field(
+        None,
+        description="Optional ratio metrics (e.g., revenue per order) given as per-variant aggregate moments"
+    )
+
+
+class ExperimentSummaryModel(BaseModel):
+    experiment_name: str = Field(..., description="Name of the experiment (e.g., 'checkout-v2 DE')")
+    group: Optional[str] = Field(None, description="Portfolio group, e.g. the change tested; experiments are pooled per group")
+    absolute_lift: float = Field(..., description="Treatment minus control, as in statistical_summary")
+    confidence_interval: Optional[Dict[str, float]] = Field(
+        None,
+        description="Interval on the absolute lift with 'lower' and 'upper', as in statistical_summary"
+    )
+    ci_method: str = Field(
+        default="wald",
+        description="How the interval was computed, as in statistical_summary; only symmetric 'wald' intervals imply a standard error"
+    )
+    standard_error: Optional[float] = Field(None, gt=0, description="Standard error of the lift; overrides the interval")
+    
+    @validator('standard_error', always=True)
+    def validate_precision(cls, v, values):
+        if v is not None:
+            return v
+        
+        interval = values.get('confidence_interval')
+        if interval is None:
+            raise ValueError("Either confidence_interval or standard_error must be provided")
+        if 'lower' not in interval or 'upper' not in interval or interval['upper'] <= interval['lower']:
+            raise ValueError("confidence_interval needs 'lower' below 'upper'")
+        # Small-count (e.g. Newcombe) intervals are asymmetric, so their width gives no standard error
+        if values.get('ci_method', 'wald') != 'wald':
+            raise ValueError(
+                f"standard_error is required when the interval is not a Wald interval (ci_method '{values['ci_method']}')"
+            )
+        
+        return v
+
+
+class MetaAnalysisRequest(BaseModel):
+    experiments: List[ExperimentSummaryModel] = Field(..., min_items=2, description="Experiment summaries to pool")
+    confidence_level: float = Field(
+        default=0.95,
+        gt=0.5,
+        lt=1,
+        description="Coverage of the input intervals and of the pooled and prediction intervals"
+    )
+
+
+class ResponseFormat(str, Enum):
+    FULL = "full"
+    COMPACT = "compact"
+
+
+class GenerationMode(str, Enum):
+    SEPARATE = "separate"
+    SINGLE_SHOT = "single_shot"
+
+
+class BootstrapInterval(str, Enum):
+    PERCENTILE = "percentile"
+    BCA = "bca"
 
 
 class AnalyzeResultsRequest(BaseModel):
     context: ExperimentContextModel
-    results_data: ResultsDataModel
\ No newline at end of file
+    results_data: ResultsDataModel
+    generation_mode: Optional[GenerationMode] = Field(
+        None,
+        description="LLM generation mode: one prompt per section or a single combined prompt (defaults to server setting)"
+    )
+    false_discovery_rate: float = Field(
+        default=0.05,
+        gt=0,
+        lt=0.5,
+        description="Benjamini-Hochberg false discovery rate across the primary, secondary and guardrail metrics"
+    )
+    bootstrap_interval: Optional[BootstrapInterval] = Field(
+        None,
+        description="Add bootstrap confidence intervals on the absolute and relative lift (percentile or BCa)"
+    )
\ No newline at end of file
@@ -2,6 +2,24 @@ from pydantic import BaseModel, Field
 from typing import List, Dict, Optional, Any
 
 
+INPUTS_SUMMARY_EXPLANATIONS = {
+    "baseline_conversion_rate": "The current conversion rate of your control experience",
+    "minimum_detectable_effect": "The smallest change you want to be able to detect",
+    "statistical_power": "Probability of detecting an effect if it exists (1-β)",
+    "significance_level": "Probability of false positive (α)",
+    "variants": "Number of different versions being tested"
+}
+
+STATISTICAL_SUMMARY_EXPLANATIONS = {
+    "relative_lift": "Percentage change from control to treatment",
+    "p_value": "Probability that the observed difference is due to chance",
+    "is_significant": "Whether the difference is statistically significant (p < 0.05)",
+    "confidence_interval": "Range of plausible values for the true difference",
+    "test_method": "Significance test used: the z-test, or an exact test when counts are too small for it",
+    "bootstrap": "Resampled confidence intervals on the lift, including the relative lift (when requested)"
+}
+
+
 class InputsSummaryModel(BaseModel):
     hypothesis: str
     baseline_conversion_rate: float
@@ -12,14 +30,8 @@ class InputsSummaryModel(BaseModel):
     variants: int
     estimated_daily_users: int
     
-    explanations: Dict[str, str] = Field(
-        default_factory=lambda: {
-            "baseline_conversion_rate": "The current conversion rate of your control experience",
-            "minimum_detectable_effect": "The smallest change you want to be able to detect",
-            "statistical_power": "Probability of detecting an effect if it exists (1-β)",
-            "significance_level": "Probability of false positive (α)",
-            "variants": "Number of different versions being tested"
-        }
+    explanations: Optional[Dict[str, str]] = Field(
+        default_factory=lambda: dict(INPUTS_SUMMARY_EXPLANATIONS)
     )
 
 
@@ -28,6 +40,12 @@ class RecommendedPlanModel(BaseModel):
     total_sample_size: int
     estimated_duration_days: float
     duration_explanation: str = "Time needed to collect sufficient data for reliable results"
+    sample_sizes_per_variant: Optional[List[int]] = None  # Per arm, control first
+    allocation: Optional[List[float]] = None
+    adjusted_significance_level: Optional[float] = None  # Per-comparison alpha after correction
+    power_method: str = "analytic"
+    simulated_power: Optional[float] = None
+    forecast_duration_days: Optional[int] = None  # Under the traffic shape and ramp schedule
 
 
 class TradeoffMatrixItem(BaseModel):
@@ -36,11 +54,30 @@ class TradeoffMatrixItem(BaseModel):
     sample_size_per_variant: int
     total_sample_size: int
     estimated_duration_days: float
+    sample_sizes_per_variant: Optional[List[int]] = None
+    optimal_allocation: Optional[List[float]] = None  # Allocation minimizing duration
+    optimal_duration_days: Optional[float] = None
+    forecast_duration_days: Optional[int] = None
+
+
+class AllocationPlanModel(BaseModel):
+    allocation: List[float]
+    sample_sizes_per_variant: List[int]
+    total_sample_size: int
+    estimated_duration_days: float
+
+
+class TrafficForecastModel(BaseModel):
+    daily_users: List[int]  # Experiment users per day, after ramp exposure
+    cumulative_users: List[int]
+    horizon_days: int  # Sample sizes not reached within it have no forecast duration
 
 
 class FeasibilityAnalysisModel(BaseModel):
     recommended_plan: RecommendedPlanModel
     tradeoff_matrix: List[TradeoffMatrixItem]
+    optimal_allocation: Optional[AllocationPlanModel] = None
+    traffic_forecast: Optional[TrafficForecastModel] = None
 
 
 class HypothesisAssessmentModel(BaseModel):
@@ -55,6 +92,13 @@ class ValidateSetupResponse(BaseModel):
     hypothesis_assessment: HypothesisAssessmentModel
 
 
+class BootstrapIntervalModel(BaseModel):
+    method: str  # "percentile" or "bca"
+    replicates: int
+    absolute_lift_ci: Dict[str, Optional[float]]
+    relative_lift_ci: Dict[str, Optional[float]]  # Upper bound is None when the control has no conversions
+
+
 class StatisticalSummaryModel(BaseModel):
     control_conversion_rate: float
     treatment_conversion_rate: float
@@ -64,17 +108,104 @@ class StatisticalSummaryModel(BaseModel):
     p_value: float
     is_significant: bool
     confidence_interval: Dict[str, float]
+    test_method: str = "z_test"  # "z_test", "fisher_exact" or "barnard_exact"
+    ci_method: str = "wald"  # "wald" or "newcombe"
+    bootstrap: Optional[BootstrapIntervalModel] = None
     
-    explanations: Dict[str, str] = Field(
-        default_factory=lambda: {
-            "relative_lift": "Percentage change from control to treatment",
-            "p_value": "Probability that the observed difference is due to chance",
-            "is_significant": "Whether the difference is statistically significant (p < 0.05)",
-            "confidence_interval": "Range of plausible values for the true difference"
-        }
+    explanations: Optional[Dict[str, str]] = Field(
+        default_factory=lambda: dict(STATISTICAL_SUMMARY_EXPLANATIONS)
     )
 
 
+class StratifiedAnalysisModel(BaseModel):
+    """Effect pooled across segments (Cochran-Mantel-Haenszel) with heterogeneity tests."""
+    strata: int
+    strata_excluded: int  # Segments without users in both arms
+    pooled_absolute_lift: Optional[float]
+    absolute_lift_ci: Dict[str, Optional[float]]
+    pooled_relative_lift: Optional[float]
+    relative_lift_ci: Dict[str, Optional[float]]
+    pooled_odds_ratio: Optional[float]
+    odds_ratio_ci: Dict[str, Optional[float]]
+    cmh_statistic: Optional[float]
+    cmh_p_value: Optional[float]
+    is_significant: bool
+    breslow_day_statistic: Optional[float]
+    breslow_day_p_value: Optional[float]
+    cochran_q: Optional[float]
+    cochran_q_p_value: Optional[float]
+    i_squared: Optional[float]  # Share of variation across segments beyond chance
+    is_heterogeneous: bool  # Breslow-Day (Cochran's Q when undefined) below 0.10
+
+
+class DivergentSegmentModel(BaseModel):
+    path: List[str]
+    depth: int
+    users: int
+    control_conversion_rate: float
+    treatment_conversion_rate: float
+    absolute_lift: float
+    rest_absolute_lift: float  # Lift of the parent's other segments combined
+    interaction_difference: float
+    z_score: float
+    p_value: float
+    adjusted_p_value: float  # Benjamini-Hochberg over the tested nodes
+
+
+class SegmentTreeScanModel(BaseModel):
+    """Hierarchy nodes whose effect diverges from their siblings, found by a pruned top-down scan."""
+    nodes: int
+    leaves: int
+    tested_nodes: int
+    pruned_nodes: int  # Skipped because the leaves under their parent had consistent effects
+    untestable_nodes: int  # Examined but too small to test (no users or no variance in an arm)
+    root_heterogeneity_p_value: float
+    divergent_segments: List[DivergentSegmentModel]
+
+
+class RatioMetricSummaryModel(BaseModel):
+    """Ratio metric comparison with delta-method standard errors."""
+    control_value: float
+    treatment_value: float
+    absolute_lift: float
+    relative_lift: float
+    z_score: float
+    p_value: float
+    is_significant: bool
+    confidence_interval: Dict[str, float]
+    relative_lift_ci: Dict[str, Optional[float]]
+    control_standard_error: float
+    treatment_standard_error: float
+
+
+class RatioSegmentItem(BaseModel):
+    segment_name: str
+    metrics: RatioMetricSummaryModel
+
+
+class RatioMetricResultModel(BaseModel):
+    metric_name: str
+    statistical_summary: RatioMetricSummaryModel
+    segment_analysis: Optional[List[RatioSegmentItem]] = None
+
+
+class MetricAnalysisItem(BaseModel):
+    """One metric of the experiment, with its p-value adjusted across all metrics."""
+    metric_name: str
+    role: str  # "primary", "secondary" or "guardrail"
+    metric_type: str  # "conversion" or "ratio"
+    higher_is_better: bool
+    control_value: float
+    treatment_value: float
+    absolute_lift: float
+    relative_lift: float
+    confidence_interval: Dict[str, float]
+    p_value: float
+    adjusted_p_value: float  # Benjamini-Hochberg
+    is_significant: bool  # Adjusted p-value within the false discovery rate
+    guardrail_violated: Optional[bool] = None  # Significant move in the harmful direction
+
+
 class SegmentAnalysisItem(BaseModel):
     segment_name: str
     metrics: StatisticalSummaryModel
@@ -95,4 +226,101 @@ class GenerativeAnalysisModel(BaseModel):
 class AnalyzeResultsResponse(BaseModel):
     statistical_summary: StatisticalSummaryModel
     segment_analysis: Optional[List[SegmentAnalysisItem]] = None
-    generative_analysis: GenerativeAnalysisModel
\ No newline at end of file
+    stratified_analysis: Optional[StratifiedAnalysisModel] = None
+    segment_tree: Optional[SegmentTreeScanModel] = None
+    ratio_metrics: Optional[List[RatioMetricResultModel]] = None
+    metric_analysis: Optional[List[MetricAnalysisItem]] = None
+    generative_analysis: GenerativeAnalysisModel
+
+
+class SegmentMetricsRecord(BaseModel):
+    """Flat per-segment metrics used by the compact response format."""
+    segment_name: str
+    control_conversion_rate: float
+    treatment_conversion_rate: float
+    absolute_lift: float
+    relative_lift: float
+    z_score: float
+    p_value: float
+    is_significant: bool
+    ci_lower: float
+    ci_upper: float
+    test_method: str = "z_test"
+    ci_method: str = "wald"
+    bootstrap: Optional[BootstrapIntervalModel] = None
+
+
+class CompactStatisticalSummaryModel(BaseModel):
+    control_conversion_rate: float
+    treatment_conversion_rate: float
+    absolute_lift: float
+    relative_lift: float
+    z_score: float
+    p_value: float
+    is_significant: bool
+    confidence_interval: Dict[str, float]
+    test_method: str = "z_test"
+    ci_method: str = "wald"
+    bootstrap: Optional[BootstrapIntervalModel] = None
+
+
+class CompactAnalyzeResultsResponse(BaseModel):
+    """Analysis response with explanations listed once and segments as flat records."""
+    statistical_summary: CompactStatisticalSummaryModel
+    segment_analysis: Optional[List[SegmentMetricsRecord]] = None
+    stratified_analysis: Optional[StratifiedAnalysisModel] = None
+    segment_tree: Optional[SegmentTreeScanModel] = None
+    ratio_metrics: Optional[List[RatioMetricResultModel]] = None
+    metric_analysis: Optional[List[MetricAnalysisItem]] = None
+    generative_analysis: GenerativeAnalysisModel
+    explanations: Optional[Dict[str, str]] = None
+
+
+class AnalysisJobResponse(BaseModel):
+    job_id: str
+    status: str
+    created_at: float
+    updated_at: float
+    statistical_summary: StatisticalSummaryModel
+    segment_analysis: Optional[List[SegmentAnalysisItem]] = None
+    stratified_analysis: Optional[StratifiedAnalysisModel] = None
+    segment_tree: Optional[SegmentTreeScanModel] = None
+    ratio_metrics: Optional[List[RatioMetricResultModel]] = None
+    metric_analysis: Optional[List[MetricAnalysisItem]] = None
+    result: Optional[AnalyzeResultsResponse] = None
+    error: Optional[str] = None
+
+
+class PooledEstimateModel(BaseModel):
+    estimate: float
+    standard_error: float
+    confidence_interval: Dict[str, Optional[float]]
+    z_score: float
+    p_value: float
+    is_significant: bool
+
+
+class MetaAnalysisGroupModel(BaseModel):
+    group: Optional[str] = None
+    experiments: int
+    fixed_effect: PooledEstimateModel
+    random_effects: PooledEstimateModel  # DerSimonian-Laird
+    tau_squared: float  # Between-experiment variance of the effect
+    cochran_q: float
+    cochran_q_p_value: Optional[float]  # None for a single experiment
+    i_squared: Optional[float]
+    prediction_interval: Dict[str, Optional[float]]  # Where a new experiment's effect is expected; needs 3+
+
+
+class ExperimentWeightModel(BaseModel):
+    experiment_name: str
+    group: Optional[str] = None
+    absolute_lift: float
+    standard_error: float
+    fixed_weight: float  # Share of its group's total weight
+    random_weight: float
+
+
+class MetaAnalysisResponse(BaseModel):
+    pooled: List[MetaAnalysisGroupModel]
+    experiments: List[ExperimentWeightModel]
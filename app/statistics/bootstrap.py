@@ -0,0 +1,218 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from scipy import stats
+from app.core.tracing import traced
+
+BOOTSTRAP_METHODS = ("percentile", "bca")
+
+
+def _lifts(treatment_rate: np.ndarray, control_rate: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Absolute and relative lift, broadcasting over replicates.
+
+    A zero control rate gives an infinite relative lift when the treatment
+    converted, and 0 when neither arm did (as in calculate_conversion_metrics).
+    """
+    absolute = treatment_rate - control_rate
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relative = np.where(
+            control_rate > 0,
+            absolute / control_rate,
+            np.where(absolute > 0, np.inf, 0.0)
+        )
+    return absolute, relative
+
+
+def _absolute_lift(treatment_rate: np.ndarray, control_rate: np.ndarray) -> np.ndarray:
+    return _lifts(treatment_rate, control_rate)[0]
+
+
+def _relative_lift(treatment_rate: np.ndarray, control_rate: np.ndarray) -> np.ndarray:
+    return _lifts(treatment_rate, control_rate)[1]
+
+
+def jackknife_acceleration(
+    statistic: Callable[[np.ndarray, np.ndarray], np.ndarray],
+    control_users: np.ndarray,
+    control_conversions: np.ndarray,
+    treatment_users: np.ndarray,
+    treatment_conversions: np.ndarray
+) -> np.ndarray:
+    """
+    BCa acceleration from the jackknife, computed from counts alone.
+
+    Leaving out one user can only produce four distinct estimates (dropping a
+    converter or a non-converter from either arm), so the jackknife over every
+    user reduces to a weighted sum over those four. Undefined accelerations
+    (e.g. an arm with a single user) are 0, which leaves a bias-corrected
+    percentile interval.
+    """
+    n0, c = control_users, control_conversions
+    n1, a = treatment_users, treatment_conversions
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p0, p1 = c / n0, a / n1
+        estimates = np.stack([
+            statistic(p1, (c - 1) / (n0 - 1)),
+            statistic(p1, c / (n0 - 1)),
+            statistic((a - 1) / (n1 - 1), p0),
+            statistic(a / (n1 - 1), p0)
+        ])
+        weights = np.stack([c, n0 - c, a, n1 - a])
+        # Estimates that no user can produce carry no weight
+        estimates = np.where(weights > 0, estimates, 0.0)
+
+        mean = np.sum(weights * estimates, axis=0) / (n0 + n1)
+        deviation = mean - estimates
+        acceleration = np.sum(weights * deviation ** 3, axis=0) / (
+            6 * np.sum(weights * deviation ** 2, axis=0) ** 1.5
+        )
+    return np.where(np.isfinite(acceleration), acceleration, 0.0)
+
+
+def _row_quantiles(sorted_replicates: np.ndarray, levels: np.ndarray) -> np.ndarray:
+    """Linearly interpolated quantiles of each row at its own levels, shape (rows, levels)."""
+    position = np.clip(levels, 0, 1) * (sorted_replicates.shape[1] - 1)
+    below = np.floor(position).astype(np.int64)
+    above = np.minimum(below + 1, sorted_replicates.shape[1] - 1)
+    lower_values = np.take_along_axis(sorted_replicates, below, axis=1)
+    upper_values = np.take_along_axis(sorted_replicates, above, axis=1)
+    with np.errstate(invalid="ignore"):
+        interpolated = lower_values + (position - below) * (upper_values - lower_values)
+    # inf - inf is nan; an infinite neighbour makes the quantile infinite
+    return np.where(lower_values == upper_values, lower_values, interpolated)
+
+
+def _interval_levels(
+    replicates: np.ndarray,
+    estimate: np.ndarray,
+    acceleration: Optional[np.ndarray],
+    confidence_level: float
+) -> np.ndarray:
+    """Quantile levels of each row's interval: fixed for percentile, bias-corrected and accelerated for BCa."""
+    alpha = (1 - confidence_level) / 2
+    levels = np.array([alpha, 1 - alpha])
+    if acceleration is None:
+        return np.broadcast_to(levels, (len(replicates), 2))
+
+    # Bias correction: how far the replicate median sits from the estimate
+    below = np.mean(replicates < estimate[:, None], axis=1)
+    ties = np.mean(replicates == estimate[:, None], axis=1)
+    bias = stats.norm.ppf(np.clip(below + ties / 2, 1 / (2 * replicates.shape[1]), 1 - 1 / (2 * replicates.shape[1])))
+
+    z = stats.norm.ppf(levels)[None, :]
+    shifted = bias[:, None] + z
+    return stats.norm.cdf(bias[:, None] + shifted / (1 - acceleration[:, None] * shifted))
+
+
+def _finite_interval(lower: float, upper: float) -> Dict[str, Optional[float]]:
+    return {
+        "lower": round(float(lower), 4) if np.isfinite(lower) else None,
+        "upper": round(float(upper), 4) if np.isfinite(upper) else None
+    }
+
+
+@traced("statistics.bootstrap_lift_intervals")
+def bootstrap_lift_intervals(
+    control_users: Sequence[int],
+    control_conversions: Sequence[int],
+    treatment_users: Sequence[int],
+    treatment_conversions: Sequence[int],
+    method: str = "bca",
+    replicates: int = 2000,
+    confidence_level: float = 0.95,
+    chunk_size: int = 1_000_000,
+    workers: int = 1,
+    seed: Optional[int] = None
+) -> List[Dict]:
+    """
+    Bootstrap confidence intervals on the absolute and relative lift of many pairs.
+
+    Replicates are resampled from the aggregated counts: each arm's conversions
+    are redrawn as Binomial(users, observed rate), which is exactly what
+    resampling that arm's users with replacement gives, without per-user data.
+    Every pair's replicates are drawn as one array operation, in blocks of
+    about chunk_size draws per arm so memory stays bounded. Blocks get
+    independent random streams spawned from the seed, so results do not depend
+    on how many workers process them.
+
+    Args:
+        control_users: Users per control arm
+        control_conversions: Conversions per control arm
+        treatment_users: Users per treatment arm
+        treatment_conversions: Conversions per treatment arm
+        method: "percentile" or "bca" (bias-corrected and accelerated)
+        replicates: Bootstrap replicates per pair
+        confidence_level: Interval coverage
+        chunk_size: Draws per arm per block
+        workers: Threads processing blocks; 0 uses every core
+        seed: Seed for reproducible results
+
+    Returns:
+        One dictionary per pair with the method, the number of replicates and
+        the absolute and relative lift intervals; bounds are None where
+        undefined (an empty arm, or an infinite relative lift)
+    """
+    if method not in BOOTSTRAP_METHODS:
+        raise ValueError(f"Unknown bootstrap method: {method}")
+
+    n0 = np.asarray(control_users, dtype=np.int64)
+    c = np.asarray(control_conversions, dtype=np.int64)
+    n1 = np.asarray(treatment_users, dtype=np.int64)
+    a = np.asarray(treatment_conversions, dtype=np.int64)
+    pairs = len(n0)
+
+    both_arms = (n0 > 0) & (n1 > 0)
+    p0 = np.where(both_arms, c / np.maximum(n0, 1), 0.0)
+    p1 = np.where(both_arms, a / np.maximum(n1, 1), 0.0)
+    absolute_estimate, relative_estimate = _lifts(p1, p0)
+
+    accelerations = {"absolute": None, "relative": None}
+    if method == "bca":
+        accelerations = {
+            name: jackknife_acceleration(statistic, n0, c, n1, a)
+            for name, statistic in (("absolute", _absolute_lift), ("relative", _relative_lift))
+        }
+
+    bounds = {"absolute": np.full((pairs, 2), np.nan), "relative": np.full((pairs, 2), np.nan)}
+
+    def resample(rows: np.ndarray, seed_sequence: np.random.SeedSequence) -> None:
+        rng = np.random.default_rng(seed_sequence)
+        size = (len(rows), replicates)
+        control_rates = rng.binomial(n0[rows, None], p0[rows, None], size=size) / n0[rows, None]
+        treatment_rates = rng.binomial(n1[rows, None], p1[rows, None], size=size) / n1[rows, None]
+        lifts = dict(zip(("absolute", "relative"), _lifts(treatment_rates, control_rates)))
+        estimates = {"absolute": absolute_estimate[rows], "relative": relative_estimate[rows]}
+
+        for name, values in lifts.items():
+            values.sort(axis=1)
+            acceleration = accelerations[name]
+            levels = _interval_levels(
+                values, estimates[name], acceleration[rows] if acceleration is not None else None, confidence_level
+            )
+            bounds[name][rows] = _row_quantiles(values, levels)
+
+    usable = np.nonzero(both_arms)[0]
+    rows_per_block = max(1, chunk_size // replicates)
+    blocks = [usable[start:start + rows_per_block] for start in range(0, len(usable), rows_per_block)]
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(blocks))
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(blocks) > 1:
+        # NumPy releases the GIL while drawing and sorting, and blocks write disjoint rows
+        with ThreadPoolExecutor(max_workers=min(workers, len(blocks))) as executor:
+            list(executor.map(resample, blocks, seed_sequences))
+    else:
+        for rows, seed_sequence in zip(blocks, seed_sequences):
+            resample(rows, seed_sequence)
+
+    return [
+        {
+            "method": method,
+            "replicates": replicates,
+            "absolute_lift_ci": _finite_interval(*absolute),
+            "relative_lift_ci": _finite_interval(*relative)
+        }
+        for absolute, relative in zip(bounds["absolute"], bounds["relative"])
+    ]
@@ -1,9 +1,12 @@
 import math
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Sequence
 from scipy import stats
 import numpy as np
+from app.core.tracing import traced
+from app.statistics.exact import barnard_exact_pvalues, fisher_exact_pvalues, newcombe_interval
 
 
+@traced("statistics.calculate_sample_size")
 def calculate_sample_size(
     baseline_conversion_rate: float,
     minimum_detectable_effect: float,
@@ -44,16 +47,18 @@ def calculate_sample_size(
     z_alpha = stats.norm.ppf(1 - significance_level / 2)
     z_beta = stats.norm.ppf(statistical_power)
     
-    # Sample size calculation
-    n = ((z_alpha + z_beta) / effect_size) ** 2
+    # Sample size calculation (two samples, so twice the one-sample size)
+    n = 2 * ((z_alpha + z_beta) / effect_size) ** 2
     
     return math.ceil(n)
 
 
+@traced("statistics.calculate_test_duration")
 def calculate_test_duration(
     sample_size_per_variant: int,
     estimated_daily_users: int,
-    num_variants: int = 2
+    num_variants: int = 2,
+    sample_sizes: Optional[List[int]] = None
 ) -> float:
     """
     Calculate estimated test duration in days.
@@ -62,14 +67,20 @@ def calculate_test_duration(
         sample_size_per_variant: Required sample size per variant
         estimated_daily_users: Daily traffic available
         num_variants: Number of test variants
+        sample_sizes: Per-arm sample sizes for unequal allocations; when given,
+            their sum is used instead of sample_size_per_variant * num_variants
     
     Returns:
         Test duration in days
     """
-    total_sample_size = sample_size_per_variant * num_variants
+    if sample_sizes is not None:
+        total_sample_size = sum(sample_sizes)
+    else:
+        total_sample_size = sample_size_per_variant * num_variants
     return total_sample_size / estimated_daily_users
 
 
+@traced("statistics.generate_tradeoff_matrix")
 def generate_tradeoff_matrix(
     baseline_conversion_rate: float,
     estimated_daily_users: int,
@@ -113,107 +124,181 @@ def generate_tradeoff_matrix(
     return matrix
 
 
+# Two-sided 95% critical value for confidence intervals
+Z_95 = float(stats.norm.ppf(0.975))
+
+EXACT_TESTS = {"fisher": fisher_exact_pvalues, "barnard": barnard_exact_pvalues}
+
+
+def calculate_conversion_metrics_batch(
+    control_users: Sequence[int],
+    control_conversions: Sequence[int],
+    treatment_users: Sequence[int],
+    treatment_conversions: Sequence[int],
+    exact_test: str = "fisher",
+    min_expected_count: float = 5.0
+) -> List[Dict]:
+    """
+    Calculate conversion metrics for many control/treatment pairs at once.
+    
+    Pairs with ample counts use the two-proportion z-test and a Wald interval.
+    When the smallest expected cell count of a pair's 2x2 table is below
+    min_expected_count, the normal approximation is unreliable, so the pair
+    gets an exact test and a Newcombe (Wilson score) interval instead.
+    
+    Args:
+        control_users: Users per control arm
+        control_conversions: Conversions per control arm
+        treatment_users: Users per treatment arm
+        treatment_conversions: Conversions per treatment arm
+        exact_test: "fisher" or "barnard" for small-count pairs
+        min_expected_count: Smallest expected cell count for the z-test
+    
+    Returns:
+        One dictionary per pair, in the calculate_conversion_metrics layout
+    """
+    if exact_test not in EXACT_TESTS:
+        raise ValueError(f"Unknown exact test: {exact_test}")
+    
+    cu = np.asarray(control_users, dtype=np.int64)
+    cc = np.asarray(control_conversions, dtype=np.int64)
+    tu = np.asarray(treatment_users, dtype=np.int64)
+    tc = np.asarray(treatment_conversions, dtype=np.int64)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Conversion rates
+        control_rate = np.where(cu > 0, cc / np.maximum(cu, 1), 0.0)
+        treatment_rate = np.where(tu > 0, tc / np.maximum(tu, 1), 0.0)
+        
+        # Lift
+        relative_lift = np.where(control_rate > 0, (treatment_rate - control_rate) / control_rate, 0.0)
+        absolute_lift = treatment_rate - control_rate
+        
+        # Statistical test (two-proportion z-test)
+        both_arms = (cu > 0) & (tu > 0)
+        pooled_p = (cc + tc) / np.maximum(cu + tu, 1)
+        se = np.sqrt(pooled_p * (1 - pooled_p) * (1 / np.maximum(cu, 1) + 1 / np.maximum(tu, 1)))
+        testable = both_arms & (se > 0)
+        z_score = np.where(testable, absolute_lift / se, 0.0)
+        p_value = np.where(testable, 2 * stats.norm.sf(np.abs(z_score)), 1.0)
+        
+        # Wald confidence interval for the difference
+        diff_se = np.sqrt(
+            control_rate * (1 - control_rate) / np.maximum(cu, 1) +
+            treatment_rate * (1 - treatment_rate) / np.maximum(tu, 1)
+        )
+        margin_of_error = np.where(testable, Z_95 * diff_se, 0.0)
+        ci_lower = absolute_lift - margin_of_error
+        ci_upper = absolute_lift + margin_of_error
+        
+        # Small counts: exact test and score interval
+        total = cu + tu
+        conversions = cc + tc
+        expected = np.minimum(cu, tu) * np.minimum(conversions, total - conversions) / np.maximum(total, 1)
+        small = both_arms & (expected < min_expected_count)
+    
+    test_method = np.where(small, f"{exact_test}_exact", "z_test")
+    ci_method = np.where(small, "newcombe", "wald")
+    if small.any():
+        p_value[small] = EXACT_TESTS[exact_test](cc[small], cu[small], tc[small], tu[small])
+        ci_lower[small], ci_upper[small] = newcombe_interval(cc[small], cu[small], tc[small], tu[small], Z_95)
+    
+    columns = zip(
+        np.round(control_rate, 4).tolist(),
+        np.round(treatment_rate, 4).tolist(),
+        np.round(absolute_lift, 4).tolist(),
+        np.round(relative_lift, 4).tolist(),
+        np.round(z_score, 3).tolist(),
+        np.round(p_value, 4).tolist(),
+        (p_value < 0.05).tolist(),
+        np.round(ci_lower, 4).tolist(),
+        np.round(ci_upper, 4).tolist(),
+        test_method.tolist(),
+        ci_method.tolist()
+    )
+    return [
+        {
+            "control_conversion_rate": control,
+            "treatment_conversion_rate": treatment,
+            "absolute_lift": absolute,
+            "relative_lift": relative,
+            "z_score": z,
+            "p_value": p,
+            "is_significant": significant,
+            "confidence_interval": {
+                "lower": lower,
+                "upper": upper
+            },
+            "test_method": test,
+            "ci_method": interval,
+            "bootstrap": None  # Filled in by bootstrap_lift_intervals when requested
+        }
+        for control, treatment, absolute, relative, z, p, significant, lower, upper, test, interval in columns
+    ]
+
+
+# Not traced: it runs inside the statistics stage span
 def calculate_conversion_metrics(
     control_users: int,
     control_conversions: int,
     treatment_users: int,
-    treatment_conversions: int
+    treatment_conversions: int,
+    exact_test: str = "fisher",
+    min_expected_count: float = 5.0
 ) -> Dict:
     """
     Calculate conversion rates, lift, and statistical significance.
     
+    Uses the z-test with a Wald interval, or an exact test with a Newcombe
+    interval when counts are small (see calculate_conversion_metrics_batch).
+    
     Returns:
         Dictionary with conversion metrics and statistical results
     """
-    # Conversion rates
-    control_rate = control_conversions / control_users if control_users > 0 else 0
-    treatment_rate = treatment_conversions / treatment_users if treatment_users > 0 else 0
-    
-    # Relative lift
-    relative_lift = ((treatment_rate - control_rate) / control_rate) if control_rate > 0 else 0
-    absolute_lift = treatment_rate - control_rate
-    
-    # Statistical test (two-proportion z-test)
-    if control_users > 0 and treatment_users > 0:
-        # Pooled proportion
-        pooled_p = (control_conversions + treatment_conversions) / (control_users + treatment_users)
-        
-        # Standard error
-        se = math.sqrt(pooled_p * (1 - pooled_p) * (1/control_users + 1/treatment_users))
-        
-        if se > 0:
-            # Z-score
-            z_score = (treatment_rate - control_rate) / se
-            
-            # Two-tailed p-value
-            p_value = 2 * (1 - stats.norm.cdf(abs(z_score)))
-            
-            # Confidence interval for difference
-            diff_se = math.sqrt(
-                (control_rate * (1 - control_rate) / control_users) +
-                (treatment_rate * (1 - treatment_rate) / treatment_users)
-            )
-            
-            margin_of_error = 1.96 * diff_se
-            ci_lower = absolute_lift - margin_of_error
-            ci_upper = absolute_lift + margin_of_error
-        else:
-            z_score = 0
-            p_value = 1.0
-            ci_lower = ci_upper = absolute_lift
-    else:
-        z_score = 0
-        p_value = 1.0
-        ci_lower = ci_upper = absolute_lift
-    
-    return {
-        "control_conversion_rate": round(control_rate, 4),
-        "treatment_conversion_rate": round(treatment_rate, 4),
-        "absolute_lift": round(absolute_lift, 4),
-        "relative_lift": round(relative_lift, 4),
-        "z_score": round(z_score, 3),
-        "p_value": round(p_value, 4),
-        "is_significant": p_value < 0.05,
-        "confidence_interval": {
-            "lower": round(ci_lower, 4),
-            "upper": round(ci_upper, 4)
-        }
-    }
+    return calculate_conversion_metrics_batch(
+        [control_users], [control_conversions], [treatment_users], [treatment_conversions],
+        exact_test=exact_test,
+        min_expected_count=min_expected_count
+    )[0]
 
 
+@traced("statistics.analyze_segments")
 def analyze_segments(
-    segment_data: List[Dict]
+    segment_data: List[Dict],
+    exact_test: str = "fisher",
+    min_expected_count: float = 5.0
 ) -> List[Dict]:
     """
     Analyze segmented experiment results.
     
+    All segments are evaluated in one vectorized batch.
+    
     Args:
         segment_data: List of segment dictionaries with variant data
+        exact_test: Exact test for small-count segments ("fisher" or "barnard")
+        min_expected_count: Smallest expected cell count for the z-test
     
     Returns:
         List of segment analyses
     """
-    segment_analyses = []
+    # Assume first variant is control, second is treatment
+    segments = [segment for segment in segment_data if len(segment["variants"]) >= 2]
+    if not segments:
+        return []
     
-    for segment in segment_data:
-        segment_name = segment["segment_name"]
-        variants = segment["variants"]
-        
-        if len(variants) >= 2:
-            # Assume first variant is control, second is treatment
-            control = variants[0]
-            treatment = variants[1]
-            
-            metrics = calculate_conversion_metrics(
-                control_users=control["users"],
-                control_conversions=control["conversions"],
-                treatment_users=treatment["users"],
-                treatment_conversions=treatment["conversions"]
-            )
-            
-            segment_analyses.append({
-                "segment_name": segment_name,
-                "metrics": metrics
-            })
-    
-    return segment_analyses
\ No newline at end of file
+    metrics = calculate_conversion_metrics_batch(
+        control_users=[segment["variants"][0]["users"] for segment in segments],
+        control_conversions=[segment["variants"][0]["conversions"] for segment in segments],
+        treatment_users=[segment["variants"][1]["users"] for segment in segments],
+        treatment_conversions=[segment["variants"][1]["conversions"] for segment in segments],
+        exact_test=exact_test,
+        min_expected_count=min_expected_count
+    )
+    
+    return [
+        {
+            "segment_name": segment["segment_name"],
+            "metrics": segment_metrics
+        }
+        for segment, segment_metrics in zip(segments, metrics)
+    ]
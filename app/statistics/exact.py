@@ -0,0 +1,195 @@
+from typing import Tuple
+import numpy as np
+from scipy.special import gammaln
+
+# Largest padded table evaluated at once by the exact tests, in cells
+BLOCK_CELLS = 1 << 20
+# Barnard's test enumerates every outcome of both arms, so larger tables use Fisher's test
+BARNARD_MAX_ARM_SIZE = 50
+# Nuisance conversion rates searched for Barnard's supremum
+BARNARD_GRID = np.linspace(0.005, 0.995, 100)
+# Relative tolerance when comparing table probabilities, as in scipy.stats.fisher_exact
+RELATIVE_TOLERANCE = 1 + 1e-7
+
+# Largest k whose log(k!) is cached; beyond it gammaln is evaluated per value, so one huge arm
+# cannot grow the shared table without bound
+LOG_FACTORIAL_CACHE_SIZE = 100_000
+
+_log_factorials = gammaln(np.arange(1024) + 1)
+
+
+def log_factorial(k) -> np.ndarray:
+    """
+    log(k!) for an array of non-negative integers.
+
+    Values below LOG_FACTORIAL_CACHE_SIZE come from a shared table that grows
+    by doubling, so repeated calls cost one lookup rather than a gammaln
+    evaluation per cell; larger values are evaluated directly.
+    """
+    global _log_factorials
+    k = np.asarray(k, dtype=np.int64)
+    largest = int(k.max()) if k.size else 0
+    if largest >= len(_log_factorials) and len(_log_factorials) < LOG_FACTORIAL_CACHE_SIZE:
+        size = min(max(largest + 1, 2 * len(_log_factorials)), LOG_FACTORIAL_CACHE_SIZE)
+        _log_factorials = gammaln(np.arange(size) + 1)
+
+    table = _log_factorials
+    if largest < len(table):
+        return table[k]
+    cached = k < len(table)
+    return np.where(cached, table[np.where(cached, k, 0)], gammaln(np.where(cached, 0, k) + 1.0))
+
+
+def log_comb(n: np.ndarray, k: np.ndarray) -> np.ndarray:
+    """log(n choose k)."""
+    return log_factorial(n) - log_factorial(k) - log_factorial(np.asarray(n) - k)
+
+
+def _blocks(widths: np.ndarray):
+    """Yield index blocks, narrowest tables first, each within BLOCK_CELLS once padded."""
+    order = np.argsort(widths, kind="stable")
+    sorted_widths = widths[order]
+    start = 0
+    while start < len(order):
+        costs = np.arange(1, len(order) - start + 1) * sorted_widths[start:]
+        end = start + max(1, int(np.searchsorted(costs, BLOCK_CELLS, side="right")))
+        yield order[start:end]
+        start = end
+
+
+def fisher_exact_pvalues(x1: np.ndarray, n1: np.ndarray, x2: np.ndarray, n2: np.ndarray) -> np.ndarray:
+    """
+    Two-sided Fisher exact test p-values for many 2x2 tables at once.
+
+    Each table's hypergeometric support is laid out along one row of a padded
+    matrix; the p-value sums the probabilities of all tables no more likely
+    than the observed one.
+
+    Args:
+        x1, n1: Conversions and users in the first arm
+        x2, n2: Conversions and users in the second arm
+
+    Returns:
+        Array of p-values
+    """
+    x1, n1, x2, n2 = (np.asarray(a, dtype=np.int64) for a in (x1, n1, x2, n2))
+    total = x1 + x2
+    n = n1 + n2
+
+    lo = np.maximum(0, total - n2)
+    hi = np.minimum(n1, total)
+    widths = hi - lo + 1
+    pvalues = np.ones(len(x1))
+
+    for rows in _blocks(widths):
+        k = lo[rows, None] + np.arange(widths[rows].max())[None, :]
+        valid = k <= hi[rows, None]
+        k = np.where(valid, k, lo[rows, None])
+        t, a, b = total[rows, None], n1[rows, None], n2[rows, None]
+
+        log_denominator = log_comb(n[rows], total[rows])[:, None]
+        log_p = log_comb(a, k) + log_comb(b, t - k) - log_denominator
+        log_observed = (
+            log_comb(n1[rows], x1[rows]) + log_comb(n2[rows], x2[rows])
+        )[:, None] - log_denominator
+
+        extreme = valid & (log_p <= log_observed + np.log(RELATIVE_TOLERANCE))
+        pvalues[rows] = np.where(extreme, np.exp(log_p), 0.0).sum(axis=1)
+
+    return np.minimum(pvalues, 1.0)
+
+
+def _wald_statistics(n1: int, n2: int) -> np.ndarray:
+    """Pooled Wald statistic for every outcome of an (n1, n2) table, shape (n1 + 1, n2 + 1)."""
+    i = np.arange(n1 + 1)[:, None]
+    j = np.arange(n2 + 1)[None, :]
+    pooled = (i + j) / (n1 + n2)
+    se = np.sqrt(pooled * (1 - pooled) * (1 / n1 + 1 / n2))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(se > 0, (j / n2 - i / n1) / se, 0.0)
+
+
+def barnard_exact_pvalues(x1: np.ndarray, n1: np.ndarray, x2: np.ndarray, n2: np.ndarray) -> np.ndarray:
+    """
+    Two-sided Barnard exact test p-values (pooled Wald statistic).
+
+    The p-value is the largest, over a grid of common conversion rates, of the
+    probability of a statistic at least as extreme as the observed one. Tables
+    sharing arm sizes share one enumeration of outcomes, and the tail
+    probabilities for every grid rate come from one cumulative sum over the
+    outcomes ordered by extremeness.
+
+    Tables with an arm larger than BARNARD_MAX_ARM_SIZE use Fisher's test.
+
+    Returns:
+        Array of p-values
+    """
+    x1, n1, x2, n2 = (np.asarray(a, dtype=np.int64) for a in (x1, n1, x2, n2))
+    pvalues = np.ones(len(x1))
+
+    large = (n1 > BARNARD_MAX_ARM_SIZE) | (n2 > BARNARD_MAX_ARM_SIZE)
+    if large.any():
+        pvalues[large] = fisher_exact_pvalues(x1[large], n1[large], x2[large], n2[large])
+
+    log_rate = np.log(BARNARD_GRID)[:, None]
+    log_complement = np.log1p(-BARNARD_GRID)[:, None]
+
+    small = np.nonzero(~large)[0]
+    sizes = np.stack([n1[small], n2[small]], axis=1)
+    for size_1, size_2 in np.unique(sizes, axis=0):
+        rows = small[(n1[small] == size_1) & (n2[small] == size_2)]
+
+        statistics = np.abs(_wald_statistics(size_1, size_2)).ravel()
+        order = np.argsort(-statistics, kind="stable")
+        sorted_statistics = statistics[order]
+
+        i = np.arange(size_1 + 1)
+        j = np.arange(size_2 + 1)
+        log_pmf_1 = log_comb(size_1, i)[None, :] + i * log_rate + (size_1 - i) * log_complement
+        log_pmf_2 = log_comb(size_2, j)[None, :] + j * log_rate + (size_2 - j) * log_complement
+        # Probability of every outcome for every grid rate, ordered by extremeness
+        probabilities = np.exp(log_pmf_1[:, :, None] + log_pmf_2[:, None, :]).reshape(len(BARNARD_GRID), -1)
+        tails = np.cumsum(probabilities[:, order], axis=1)
+
+        observed = np.abs(_wald_statistics(size_1, size_2))[x1[rows], x2[rows]]
+        # Outcomes at least as extreme as observed (within rounding) form a prefix of the order
+        counts = np.searchsorted(-sorted_statistics, -observed * (1 - 1e-9) + 1e-12, side="right")
+        pvalues[rows] = tails[:, counts - 1].max(axis=0)
+
+    return np.minimum(pvalues, 1.0)
+
+
+def wilson_interval(conversions: np.ndarray, users: np.ndarray, z: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Wilson score interval for each proportion; (0, 1) when there are no users."""
+    x = np.asarray(conversions, dtype=float)
+    n = np.asarray(users, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        center = (x + z ** 2 / 2) / (n + z ** 2)
+        half_width = z / (n + z ** 2) * np.sqrt(np.where(n > 0, x * (n - x) / n, 0.0) + z ** 2 / 4)
+    lower = np.where(n > 0, np.clip(center - half_width, 0, 1), 0.0)
+    upper = np.where(n > 0, np.clip(center + half_width, 0, 1), 1.0)
+    return lower, upper
+
+
+def newcombe_interval(
+    control_conversions: np.ndarray,
+    control_users: np.ndarray,
+    treatment_conversions: np.ndarray,
+    treatment_users: np.ndarray,
+    z: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Newcombe hybrid score interval for the difference treatment rate - control rate.
+
+    Combines the two Wilson intervals, so it stays inside [-1, 1] and keeps
+    close to nominal coverage with few conversions, unlike the Wald interval.
+    """
+    control_rate = np.where(control_users > 0, control_conversions / np.maximum(control_users, 1), 0.0)
+    treatment_rate = np.where(treatment_users > 0, treatment_conversions / np.maximum(treatment_users, 1), 0.0)
+    control_lower, control_upper = wilson_interval(control_conversions, control_users, z)
+    treatment_lower, treatment_upper = wilson_interval(treatment_conversions, treatment_users, z)
+
+    difference = treatment_rate - control_rate
+    lower = difference - np.sqrt((treatment_rate - treatment_lower) ** 2 + (control_upper - control_rate) ** 2)
+    upper = difference + np.sqrt((treatment_upper - treatment_rate) ** 2 + (control_rate - control_lower) ** 2)
+    return lower, upper
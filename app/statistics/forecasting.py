@@ -0,0 +1,105 @@
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from app.core.tracing import traced
+
+
+def build_daily_traffic(
+    estimated_daily_users: float,
+    horizon_days: int,
+    daily_traffic: Optional[Sequence[float]] = None,
+    weekday_profile: Optional[Sequence[float]] = None,
+    start_weekday: int = 0
+) -> np.ndarray:
+    """
+    Expected eligible users for each day of the forecast horizon.
+
+    Args:
+        estimated_daily_users: Average daily users, used with a weekday profile
+            or when no traffic shape is given
+        horizon_days: Number of days to forecast
+        daily_traffic: Daily users from the start day; repeated cyclically
+            past its end, so a series of whole weeks keeps its weekly pattern
+        weekday_profile: Seven relative weights, Monday first, scaled so their
+            mean is estimated_daily_users
+        start_weekday: Weekday of the first day (Monday = 0)
+
+    Returns:
+        Array of daily users, shape (horizon_days,)
+    """
+    days = np.arange(horizon_days)
+    if daily_traffic is not None:
+        series = np.asarray(daily_traffic, dtype=float)
+        return series[days % len(series)]
+    if weekday_profile is not None:
+        profile = np.asarray(weekday_profile, dtype=float)
+        profile = profile / profile.mean() * estimated_daily_users
+        return profile[(days + start_weekday) % 7]
+    return np.full(horizon_days, float(estimated_daily_users))
+
+
+def build_exposure(horizon_days: int, ramp_schedule: Optional[Sequence[Dict]] = None) -> np.ndarray:
+    """
+    Fraction of eligible traffic in the experiment on each day.
+
+    Args:
+        horizon_days: Number of days to forecast
+        ramp_schedule: Steps with "start_day" and "exposure", sorted by start
+            day; each step holds until the next one. Full exposure when None.
+
+    Returns:
+        Array of exposure fractions, shape (horizon_days,)
+    """
+    if not ramp_schedule:
+        return np.ones(horizon_days)
+    start_days = np.array([step["start_day"] for step in ramp_schedule])
+    exposures = np.array([step["exposure"] for step in ramp_schedule], dtype=float)
+    step_index = np.searchsorted(start_days, np.arange(horizon_days), side="right") - 1
+    # Days before the first step have no exposure
+    return np.where(step_index >= 0, exposures[np.maximum(step_index, 0)], 0.0)
+
+
+@traced("statistics.forecast_completion_days")
+def forecast_completion_days(
+    total_sample_sizes: Sequence[int],
+    estimated_daily_users: float,
+    daily_traffic: Optional[Sequence[float]] = None,
+    weekday_profile: Optional[Sequence[float]] = None,
+    start_weekday: int = 0,
+    ramp_schedule: Optional[Sequence[Dict]] = None,
+    max_days: int = 730
+) -> Dict:
+    """
+    Forecast the day each sample size is reached under a traffic shape and ramp schedule.
+
+    Daily experiment users are eligible traffic times exposure; their cumulative
+    sum is searched for every sample size at once.
+
+    Args:
+        total_sample_sizes: Total users needed, one per plan (e.g. per trade-off row)
+        estimated_daily_users: Average daily users
+        daily_traffic: Daily users series (see build_daily_traffic)
+        weekday_profile: Seven relative weekday weights, Monday first
+        start_weekday: Weekday of the first day (Monday = 0)
+        ramp_schedule: Exposure steps (see build_exposure)
+        max_days: Forecast horizon; sample sizes not reached by then get None
+
+    Returns:
+        Dictionary with the completion day (1-based) per sample size, and the
+        daily and cumulative experiment users up to the last completion day
+    """
+    daily = build_daily_traffic(estimated_daily_users, max_days, daily_traffic, weekday_profile, start_weekday)
+    daily = daily * build_exposure(max_days, ramp_schedule)
+    cumulative = np.cumsum(daily)
+
+    # First day whose cumulative total reaches each sample size
+    days = np.searchsorted(cumulative, np.asarray(total_sample_sizes, dtype=float), side="left") + 1
+    reached = days <= max_days
+    curve_days = int(days.max()) if reached.all() else max_days
+
+    completion_days: List[Optional[int]] = [int(day) if ok else None for day, ok in zip(days, reached)]
+    return {
+        "completion_days": completion_days,
+        "daily_users": [int(round(users)) for users in daily[:curve_days]],
+        "cumulative_users": [int(round(users)) for users in cumulative[:curve_days]],
+        "horizon_days": max_days
+    }
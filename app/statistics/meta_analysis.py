@@ -0,0 +1,159 @@
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from scipy import stats
+from app.core.tracing import traced
+
+
+def _interval(lower: np.ndarray, upper: np.ndarray) -> List[Dict[str, Optional[float]]]:
+    return [
+        {
+            "lower": round(lo, 6) if np.isfinite(lo) else None,
+            "upper": round(hi, 6) if np.isfinite(hi) else None
+        }
+        for lo, hi in zip(lower.tolist(), upper.tolist())
+    ]
+
+
+def _pooled(
+    estimate: np.ndarray,
+    standard_error: np.ndarray,
+    z_critical: float,
+    significance_level: float
+) -> List[Dict]:
+    """Pooled estimate payloads, one per group, in the PooledEstimateModel layout."""
+    z_score = estimate / standard_error
+    p_value = 2 * stats.norm.sf(np.abs(z_score))
+    intervals = _interval(estimate - z_critical * standard_error, estimate + z_critical * standard_error)
+    return [
+        {
+            "estimate": round(est, 6),
+            "standard_error": round(se, 6),
+            "confidence_interval": interval,
+            "z_score": round(z, 3),
+            "p_value": round(p, 4),
+            "is_significant": p < significance_level
+        }
+        for est, se, interval, z, p in zip(
+            estimate.tolist(), standard_error.tolist(), intervals, z_score.tolist(), p_value.tolist()
+        )
+    ]
+
+
+def standard_errors_from_intervals(
+    lower: Sequence[float],
+    upper: Sequence[float],
+    confidence_level: float = 0.95
+) -> np.ndarray:
+    """
+    Standard errors implied by symmetric (Wald) confidence intervals.
+
+    Asymmetric intervals, such as the Newcombe intervals of small-count
+    summaries, do not imply a standard error this way; callers need the
+    standard error itself for those.
+    """
+    z_critical = stats.norm.ppf(1 - (1 - confidence_level) / 2)
+    return (np.asarray(upper, dtype=float) - np.asarray(lower, dtype=float)) / (2 * z_critical)
+
+
+@traced("statistics.meta_analysis")
+def meta_analysis(
+    effects: Sequence[float],
+    standard_errors: Sequence[float],
+    groups: Optional[Sequence[str]] = None,
+    confidence_level: float = 0.95
+) -> Dict:
+    """
+    Fixed- and random-effects meta-analysis of many experiments, per group.
+
+    Experiments are pooled by inverse-variance weighting (fixed effect) and by
+    DerSimonian-Laird random effects, which widens the pooled interval by the
+    between-experiment variance tau^2. Every group (e.g. one change tested in
+    several markets) is pooled at once with weighted bincounts, so thousands
+    of experiments across many groups take one vectorized pass.
+
+    Args:
+        effects: Effect per experiment (e.g. absolute lift)
+        standard_errors: Standard error of each effect
+        groups: Group label per experiment; all experiments form one group when None
+        confidence_level: Coverage of the pooled and prediction intervals
+
+    Returns:
+        Dictionary with "groups" (pooled estimates and heterogeneity per group,
+        in order of first appearance) and "experiments" (each experiment's
+        share of its group's fixed- and random-effects weight)
+    """
+    theta = np.asarray(effects, dtype=float)
+    variance = np.asarray(standard_errors, dtype=float) ** 2
+    labels = list(groups) if groups is not None else [None] * len(theta)
+
+    # Group index per experiment, groups in order of first appearance
+    names: Dict[Optional[str], int] = {}
+    index = np.array([names.setdefault(label, len(names)) for label in labels], dtype=np.int64)
+    group_count = len(names)
+
+    def group_sum(values: np.ndarray) -> np.ndarray:
+        return np.bincount(index, weights=values, minlength=group_count)
+
+    alpha = 1 - confidence_level
+    z_critical = stats.norm.ppf(1 - alpha / 2)
+    sizes = np.bincount(index, minlength=group_count)
+
+    # Fixed effect: inverse-variance weights
+    weights = 1 / variance
+    weight_sums = group_sum(weights)
+    fixed_estimate = group_sum(weights * theta) / weight_sums
+    fixed_se = np.sqrt(1 / weight_sums)
+
+    # Cochran's Q and DerSimonian-Laird between-experiment variance
+    q = group_sum(weights * (theta - fixed_estimate[index]) ** 2)
+    degrees_of_freedom = sizes - 1
+    scale = weight_sums - group_sum(weights ** 2) / weight_sums
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tau_squared = np.where(degrees_of_freedom > 0, np.maximum(0.0, (q - degrees_of_freedom) / scale), 0.0)
+        tau_squared = np.nan_to_num(tau_squared)
+        q_p_value = np.where(degrees_of_freedom > 0, stats.chi2.sf(q, np.maximum(degrees_of_freedom, 1)), np.nan)
+        i_squared = np.where((degrees_of_freedom > 0) & (q > 0), np.maximum(0.0, (q - degrees_of_freedom) / q), np.nan)
+        i_squared = np.where((degrees_of_freedom > 0) & (q == 0), 0.0, i_squared)
+
+    # Random effects: weights 1 / (v + tau^2)
+    random_weights = 1 / (variance + tau_squared[index])
+    random_weight_sums = group_sum(random_weights)
+    random_estimate = group_sum(random_weights * theta) / random_weight_sums
+    random_se = np.sqrt(1 / random_weight_sums)
+
+    # Prediction interval for a new experiment's effect (Higgins et al.), needs 3+ experiments
+    with np.errstate(invalid="ignore"):
+        t_critical = np.where(sizes >= 3, stats.t.ppf(1 - alpha / 2, np.maximum(sizes - 2, 1)), np.nan)
+    prediction_half_width = t_critical * np.sqrt(random_se ** 2 + tau_squared)
+
+    fixed = _pooled(fixed_estimate, fixed_se, z_critical, alpha)
+    random = _pooled(random_estimate, random_se, z_critical, alpha)
+    predictions = _interval(random_estimate - prediction_half_width, random_estimate + prediction_half_width)
+
+    def optional(value: float, digits: int = 4) -> Optional[float]:
+        return round(value, digits) if np.isfinite(value) else None
+
+    group_results = [
+        {
+            "group": name,
+            "experiments": int(sizes[i]),
+            "fixed_effect": fixed[i],
+            "random_effects": random[i],
+            "tau_squared": round(float(tau_squared[i]), 8),
+            "cochran_q": round(float(q[i]), 3),
+            "cochran_q_p_value": optional(float(q_p_value[i])),
+            "i_squared": optional(float(i_squared[i])),
+            "prediction_interval": predictions[i]
+        }
+        for name, i in names.items()
+    ]
+
+    fixed_share = np.round(weights / weight_sums[index], 6).tolist()
+    random_share = np.round(random_weights / random_weight_sums[index], 6).tolist()
+    return {
+        "groups": group_results,
+        "experiments": [
+            {"group": label, "fixed_weight": fixed_weight, "random_weight": random_weight}
+            for label, fixed_weight, random_weight in zip(labels, fixed_share, random_share)
+        ]
+    }
@@ -0,0 +1,82 @@
+from typing import Dict, List, Sequence
+import numpy as np
+from app.core.tracing import traced
+
+
+def benjamini_hochberg(p_values: Sequence[float]) -> np.ndarray:
+    """
+    Benjamini-Hochberg adjusted p-values (q-values).
+
+    A metric is a discovery at false discovery rate q when its adjusted
+    p-value is at most q. The adjustment is the step-up p * m / rank, made
+    monotone from the largest p-value down.
+    """
+    p = np.asarray(p_values, dtype=float)
+    if len(p) == 0:
+        return p
+    order = np.argsort(p)
+    scaled = p[order] * len(p) / np.arange(1, len(p) + 1)
+    adjusted = np.minimum.accumulate(scaled[::-1])[::-1]
+    result = np.empty_like(p)
+    result[order] = np.minimum(adjusted, 1.0)
+    return result
+
+
+def metric_family_entry(
+    metric_name: str,
+    role: str,
+    metric_type: str,
+    higher_is_better: bool,
+    summary: Dict
+) -> Dict:
+    """
+    Normalize a conversion or ratio metric summary into a metric family entry.
+
+    Conversion summaries report rates, ratio summaries report values; both
+    become control_value and treatment_value.
+    """
+    value_key = "conversion_rate" if metric_type == "conversion" else "value"
+    return {
+        "metric_name": metric_name,
+        "role": role,
+        "metric_type": metric_type,
+        "higher_is_better": higher_is_better,
+        "control_value": summary[f"control_{value_key}"],
+        "treatment_value": summary[f"treatment_{value_key}"],
+        "absolute_lift": summary["absolute_lift"],
+        "relative_lift": summary["relative_lift"],
+        "confidence_interval": summary["confidence_interval"],
+        "p_value": summary["p_value"]
+    }
+
+
+@traced("statistics.analyze_metric_family")
+def analyze_metric_family(entries: List[Dict], false_discovery_rate: float = 0.05) -> List[Dict]:
+    """
+    Control the false discovery rate across an experiment's metrics.
+
+    Every metric's p-value is adjusted with Benjamini-Hochberg over the whole
+    family (primary, secondary and guardrail metrics), so checking many
+    metrics does not inflate the share of spurious wins. A guardrail is
+    violated when it moves significantly in its harmful direction.
+
+    Args:
+        entries: Metric family entries (see metric_family_entry)
+        false_discovery_rate: Target false discovery rate
+
+    Returns:
+        The entries, in order, with adjusted_p_value, is_significant (after
+        adjustment) and guardrail_violated (None for non-guardrail metrics)
+    """
+    adjusted = benjamini_hochberg([entry["p_value"] for entry in entries])
+    significant = adjusted <= false_discovery_rate
+
+    results = []
+    for entry, adjusted_p_value, is_significant in zip(entries, adjusted.tolist(), significant.tolist()):
+        harmful = entry["absolute_lift"] < 0 if entry["higher_is_better"] else entry["absolute_lift"] > 0
+        result = dict(entry)
+        result["adjusted_p_value"] = round(adjusted_p_value, 4)
+        result["is_significant"] = is_significant
+        result["guardrail_violated"] = is_significant and harmful if entry["role"] == "guardrail" else None
+        results.append(result)
+    return results
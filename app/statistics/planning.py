@@ -0,0 +1,224 @@
+import math
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from scipy import stats
+from app.core.tracing import traced
+
+CORRECTION_METHODS = ("none", "bonferroni", "sidak")
+
+
+def adjust_significance_level(significance_level: float, comparisons: int, method: str = "bonferroni") -> float:
+    """
+    Per-comparison alpha that keeps the family-wise error rate at significance_level.
+
+    Args:
+        significance_level: Family-wise alpha
+        comparisons: Number of treatment-vs-control comparisons
+        method: "none", "bonferroni" or "sidak"
+
+    Returns:
+        Alpha to use for each comparison
+    """
+    if method not in CORRECTION_METHODS:
+        raise ValueError(f"Unknown correction method: {method}")
+    if method == "none" or comparisons <= 1:
+        return significance_level
+    if method == "bonferroni":
+        return significance_level / comparisons
+    return 1 - (1 - significance_level) ** (1 / comparisons)
+
+
+def normalize_allocation(allocation: Optional[Sequence[float]], num_variants: int) -> np.ndarray:
+    """Traffic share per arm (control first) summing to 1; equal shares when allocation is None."""
+    if allocation is None:
+        return np.full(num_variants, 1 / num_variants)
+    weights = np.asarray(allocation, dtype=float)
+    if len(weights) != num_variants or np.any(weights <= 0):
+        raise ValueError(f"Allocation needs {num_variants} positive weights")
+    return weights / weights.sum()
+
+
+def required_total_sample_size(
+    baseline_conversion_rate: float,
+    minimum_detectable_effects: Sequence[float],
+    allocations: np.ndarray,
+    statistical_power: float = 0.8,
+    significance_level: float = 0.05,
+    is_relative_mde: bool = True
+) -> np.ndarray:
+    """
+    Total sample size for every combination of allocation and MDE.
+
+    Uses the same pooled normal approximation as calculate_sample_size,
+    generalized to unequal arms: each treatment arm i needs a total of
+    (z_alpha + z_beta)^2 * p(1-p) * (1/w_0 + 1/w_i) / d^2, where w are the
+    traffic shares and p is the share-weighted pooled rate. The design needs
+    the largest total over all treatment arms.
+
+    Args:
+        baseline_conversion_rate: Control conversion rate
+        minimum_detectable_effects: MDE values, shape (M,)
+        allocations: Traffic shares, shape (A, arms), control first, rows summing to 1
+        statistical_power: Power per comparison
+        significance_level: Alpha per comparison (already corrected)
+        is_relative_mde: True if MDEs are relative
+
+    Returns:
+        Array of shape (A, M) with the (unrounded) total sample size
+    """
+    p1 = baseline_conversion_rate
+    mdes = np.asarray(minimum_detectable_effects, dtype=float)
+    p2 = np.clip(p1 * (1 + mdes) if is_relative_mde else p1 + mdes, 0, 1)
+
+    allocations = np.atleast_2d(allocations)
+    control = allocations[:, :1, None]  # (A, 1, 1)
+    treatments = allocations[:, 1:, None]  # (A, arms - 1, 1)
+
+    pooled = (control * p1 + treatments * p2) / (control + treatments)  # (A, arms - 1, M)
+    z = stats.norm.ppf(1 - significance_level / 2) + stats.norm.ppf(statistical_power)
+    with np.errstate(divide="ignore"):
+        totals = z ** 2 * pooled * (1 - pooled) * (1 / control + 1 / treatments) / (p2 - p1) ** 2
+
+    return totals.max(axis=1)
+
+
+def arm_sample_sizes(total_sample_size: float, allocation: np.ndarray) -> List[int]:
+    """Round a total up to whole users per arm."""
+    return [int(math.ceil(total_sample_size * share - 1e-9)) for share in allocation]
+
+
+def control_share_grid(num_variants: int, resolution: float = 0.005) -> np.ndarray:
+    """
+    Candidate allocations varying the control share, treatments splitting the rest equally.
+
+    Treatments share the same MDE, so by symmetry the optimum gives them equal
+    traffic and only the control share needs searching.
+    """
+    shares = np.arange(resolution, 1, resolution)
+    treatment = (1 - shares) / (num_variants - 1)
+    return np.column_stack([shares] + [treatment] * (num_variants - 1))
+
+
+@traced("statistics.plan_sample_sizes")
+def plan_sample_sizes(
+    baseline_conversion_rate: float,
+    minimum_detectable_effect: float,
+    num_variants: int = 2,
+    allocation: Optional[Sequence[float]] = None,
+    statistical_power: float = 0.8,
+    significance_level: float = 0.05,
+    is_relative_mde: bool = True,
+    correction: str = "bonferroni"
+) -> Dict:
+    """
+    Plan per-arm sample sizes for a given allocation and multiple-comparison correction.
+
+    Returns:
+        Dictionary with the normalized allocation, per-comparison alpha, per-arm
+        and total sample sizes
+    """
+    shares = normalize_allocation(allocation, num_variants)
+    alpha = adjust_significance_level(significance_level, num_variants - 1, correction)
+    total = required_total_sample_size(
+        baseline_conversion_rate, [minimum_detectable_effect], shares,
+        statistical_power, alpha, is_relative_mde
+    )[0, 0]
+    sample_sizes = arm_sample_sizes(total, shares)
+
+    return {
+        "allocation": [round(float(share), 4) for share in shares],
+        "adjusted_significance_level": alpha,
+        "sample_sizes": sample_sizes,
+        "total_sample_size": sum(sample_sizes)
+    }
+
+
+@traced("statistics.find_optimal_allocations")
+def find_optimal_allocations(
+    baseline_conversion_rate: float,
+    minimum_detectable_effects: Sequence[float],
+    num_variants: int = 2,
+    statistical_power: float = 0.8,
+    significance_level: float = 0.05,
+    is_relative_mde: bool = True,
+    correction: str = "bonferroni",
+    resolution: float = 0.005
+) -> List[Dict]:
+    """
+    Find the allocation minimizing total sample size (and so duration) for each MDE.
+
+    Every candidate control share is evaluated against every MDE in one
+    vectorized pass.
+
+    Returns:
+        One dictionary per MDE with the allocation, per-arm and total sample sizes
+    """
+    alpha = adjust_significance_level(significance_level, num_variants - 1, correction)
+    grid = control_share_grid(num_variants, resolution)
+    totals = required_total_sample_size(
+        baseline_conversion_rate, minimum_detectable_effects, grid,
+        statistical_power, alpha, is_relative_mde
+    )
+    best = totals.argmin(axis=0)
+
+    plans = []
+    for column, row in enumerate(best):
+        sample_sizes = arm_sample_sizes(totals[row, column], grid[row])
+        plans.append({
+            "allocation": [round(float(share), 4) for share in grid[row]],
+            "sample_sizes": sample_sizes,
+            "total_sample_size": sum(sample_sizes)
+        })
+    return plans
+
+
+@traced("statistics.plan_tradeoff_matrix")
+def plan_tradeoff_matrix(
+    baseline_conversion_rate: float,
+    estimated_daily_users: int,
+    mde_values: List[float],
+    num_variants: int = 2,
+    allocation: Optional[Sequence[float]] = None,
+    statistical_power: float = 0.8,
+    significance_level: float = 0.05,
+    is_relative_mde: bool = True,
+    correction: str = "bonferroni",
+    optimal_allocations: Optional[List[Dict]] = None
+) -> List[Dict]:
+    """
+    Trade-off matrix for the given allocation, with the duration-minimizing allocation per row.
+
+    Args:
+        optimal_allocations: find_optimal_allocations results for mde_values,
+            when the caller already has them; searched here otherwise
+
+    Returns:
+        List of dictionaries with MDE, per-arm and total sample size, duration,
+        and the optimal allocation and its duration
+    """
+    shares = normalize_allocation(allocation, num_variants)
+    alpha = adjust_significance_level(significance_level, num_variants - 1, correction)
+    totals = required_total_sample_size(
+        baseline_conversion_rate, mde_values, shares, statistical_power, alpha, is_relative_mde
+    )[0]
+    optimal = optimal_allocations
+    if optimal is None:
+        optimal = find_optimal_allocations(
+            baseline_conversion_rate, mde_values, num_variants, statistical_power,
+            significance_level, is_relative_mde, correction
+        )
+
+    matrix = []
+    for mde, total, best in zip(mde_values, totals, optimal):
+        sample_sizes = arm_sample_sizes(total, shares)
+        matrix.append({
+            "mde": mde,
+            "mde_type": "relative" if is_relative_mde else "absolute",
+            "sample_size_per_variant": max(sample_sizes),
+            "sample_sizes_per_variant": sample_sizes,
+            "total_sample_size": sum(sample_sizes),
+            "estimated_duration_days": round(sum(sample_sizes) / estimated_daily_users, 1),
+            "optimal_allocation": best["allocation"],
+            "optimal_duration_days": round(best["total_sample_size"] / estimated_daily_users, 1)
+        })
+    return matrix
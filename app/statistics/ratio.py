@@ -0,0 +1,205 @@
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from scipy import stats
+from app.core.tracing import traced
+from app.statistics.calculations import Z_95
+
+# Aggregate moments describing one variant of a ratio metric, per randomization unit
+MOMENT_FIELDS = (
+    "users",
+    "numerator_sum",
+    "denominator_sum",
+    "numerator_sum_squares",
+    "denominator_sum_squares",
+    "cross_product_sum"
+)
+
+
+def _moment_arrays(moments: Sequence[Dict]) -> Tuple[np.ndarray, ...]:
+    """Stack moment dictionaries into one float array per field."""
+    table = np.array([[m[field] for field in MOMENT_FIELDS] for m in moments], dtype=float).reshape(-1, len(MOMENT_FIELDS))
+    return tuple(table.T)
+
+
+def ratio_estimates(
+    users: np.ndarray,
+    numerator_sum: np.ndarray,
+    denominator_sum: np.ndarray,
+    numerator_sum_squares: np.ndarray,
+    denominator_sum_squares: np.ndarray,
+    cross_product_sum: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ratio of means and its delta-method variance for each variant.
+
+    With per-unit numerator x and denominator y, R = mean(x) / mean(y) and
+
+        Var(R) ~ (var(x) - 2 R cov(x, y) + R^2 var(y)) / (n mean(y)^2)
+
+    using sample (co)variances recovered from the sums. Units, not events,
+    are the independent observations, so correlated events within a unit
+    (e.g. clicks within a user's sessions) are accounted for.
+
+    Returns:
+        Tuple of (ratio, variance) arrays; nan where fewer than 2 units or
+        a zero denominator make them undefined
+    """
+    n = users
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_x = numerator_sum / n
+        mean_y = denominator_sum / n
+        ratio = np.where((n > 0) & (mean_y != 0), mean_x / mean_y, np.nan)
+
+        var_x = (numerator_sum_squares - n * mean_x ** 2) / (n - 1)
+        var_y = (denominator_sum_squares - n * mean_y ** 2) / (n - 1)
+        cov_xy = (cross_product_sum - n * mean_x * mean_y) / (n - 1)
+        variance = (var_x - 2 * ratio * cov_xy + ratio ** 2 * var_y) / (n * mean_y ** 2)
+    # Rounding in the sums can leave a tiny negative variance
+    variance = np.where(n >= 2, np.maximum(variance, 0.0), np.nan)
+    return ratio, variance
+
+
+def calculate_ratio_metrics_batch(
+    control_moments: Sequence[Dict],
+    treatment_moments: Sequence[Dict]
+) -> List[Dict]:
+    """
+    Compare ratio metrics for many control/treatment pairs at once.
+
+    Each pair gets the difference of ratios with a two-sided z-test and Wald
+    interval, and the relative lift with an interval from the delta-method
+    variance of the log ratio (so it stays above -100%).
+
+    Args:
+        control_moments: Per-pair control moments with the MOMENT_FIELDS keys
+        treatment_moments: Per-pair treatment moments with the MOMENT_FIELDS keys
+
+    Returns:
+        One dictionary per pair, in the RatioMetricSummaryModel layout; pairs
+        whose ratios or variances are undefined get a p-value of 1 and a
+        zero-width interval, as in calculate_conversion_metrics_batch
+    """
+    control_ratio, control_variance = ratio_estimates(*_moment_arrays(control_moments))
+    treatment_ratio, treatment_variance = ratio_estimates(*_moment_arrays(treatment_moments))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        absolute_lift = treatment_ratio - control_ratio
+        relative_lift = np.where(control_ratio != 0, absolute_lift / control_ratio, np.nan)
+
+        se = np.sqrt(control_variance + treatment_variance)
+        testable = np.isfinite(absolute_lift) & np.isfinite(se) & (se > 0)
+        z_score = np.where(testable, absolute_lift / se, 0.0)
+        p_value = np.where(testable, 2 * stats.norm.sf(np.abs(z_score)), 1.0)
+        margin_of_error = np.where(testable, Z_95 * se, 0.0)
+
+        # Relative lift on the log scale: Var(log R1 - log R0) ~ v1 / R1^2 + v0 / R0^2
+        log_ratio = np.log(treatment_ratio / control_ratio)
+        log_se = np.sqrt(treatment_variance / treatment_ratio ** 2 + control_variance / control_ratio ** 2)
+        relative_lower = np.exp(log_ratio - Z_95 * log_se) - 1
+        relative_upper = np.exp(log_ratio + Z_95 * log_se) - 1
+
+    def values(array: np.ndarray, digits: int = 4) -> List[float]:
+        return np.round(np.nan_to_num(array, nan=0.0, posinf=0.0, neginf=0.0), digits).tolist()
+
+    def optional_values(array: np.ndarray) -> List:
+        return [value if np.isfinite(value) else None for value in np.round(array, 4).tolist()]
+
+    columns = zip(
+        values(control_ratio),
+        values(treatment_ratio),
+        values(absolute_lift),
+        values(relative_lift),
+        values(z_score, 3),
+        values(p_value),
+        (p_value < 0.05).tolist(),
+        values(absolute_lift - margin_of_error),
+        values(absolute_lift + margin_of_error),
+        optional_values(relative_lower),
+        optional_values(relative_upper),
+        values(np.sqrt(control_variance), 6),
+        values(np.sqrt(treatment_variance), 6)
+    )
+    return [
+        {
+            "control_value": control,
+            "treatment_value": treatment,
+            "absolute_lift": absolute,
+            "relative_lift": relative,
+            "z_score": z,
+            "p_value": p,
+            "is_significant": significant,
+            "confidence_interval": {
+                "lower": lower,
+                "upper": upper
+            },
+            "relative_lift_ci": {
+                "lower": relative_lower,
+                "upper": relative_upper
+            },
+            "control_standard_error": control_se,
+            "treatment_standard_error": treatment_se
+        }
+        for (
+            control, treatment, absolute, relative, z, p, significant,
+            lower, upper, relative_lower, relative_upper, control_se, treatment_se
+        ) in columns
+    ]
+
+
+# Not traced: it runs inside the ratio metrics stage span
+def calculate_ratio_metrics(control_moments: Dict, treatment_moments: Dict) -> Dict:
+    """
+    Compare a ratio metric between control and treatment.
+
+    Returns:
+        Dictionary with the ratios, lift, delta-method test and intervals
+    """
+    return calculate_ratio_metrics_batch([control_moments], [treatment_moments])[0]
+
+
+@traced("statistics.analyze_ratio_metrics")
+def analyze_ratio_metrics(metric_data: List[Dict]) -> List[Dict]:
+    """
+    Analyze ratio metrics overall and per segment.
+
+    Every metric's overall comparison and all of its segments are evaluated
+    in one vectorized batch.
+
+    Args:
+        metric_data: List of metric dictionaries with "metric_name", "variants"
+            (moments, control first) and optional "segments" ("segment_name"
+            and "variants")
+
+    Returns:
+        One dictionary per metric with its statistical summary and, when it
+        has segments, the per-segment analysis
+    """
+    # Assume first variant is control, second is treatment
+    pairs = []
+    for metric in metric_data:
+        pairs.append(metric["variants"][:2])
+        for segment in metric.get("segments") or []:
+            if len(segment["variants"]) >= 2:
+                pairs.append(segment["variants"][:2])
+
+    results = iter(calculate_ratio_metrics_batch(
+        [control for control, _ in pairs],
+        [treatment for _, treatment in pairs]
+    ))
+
+    analyses = []
+    for metric in metric_data:
+        summary = next(results)
+        segment_analysis = None
+        if metric.get("segments"):
+            segment_analysis = [
+                {"segment_name": segment["segment_name"], "metrics": next(results)}
+                for segment in metric["segments"]
+                if len(segment["variants"]) >= 2
+            ]
+        analyses.append({
+            "metric_name": metric["metric_name"],
+            "statistical_summary": summary,
+            "segment_analysis": segment_analysis
+        })
+    return analyses
@@ -0,0 +1,221 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from scipy import stats
+from app.core.tracing import traced
+from app.statistics.multiple_metrics import benjamini_hochberg
+
+
+def build_segment_tree(paths: Sequence[Sequence[str]]) -> Tuple[np.ndarray, np.ndarray, List[Tuple[str, ...]], np.ndarray]:
+    """
+    Index every prefix of the leaf paths as a tree node.
+
+    Node 0 is the root (the empty path). Parents are always indexed before
+    their children.
+
+    Returns:
+        Tuple of (parent per node, -1 for the root; depth per node; path per
+        node; ancestor node of each leaf at each depth, shape (leaves,
+        max depth + 1), -1 below a leaf's own depth)
+    """
+    max_depth = max((len(path) for path in paths), default=0)
+    ancestors = np.full((len(paths), max_depth + 1), -1, dtype=np.int64)
+    ancestors[:, 0] = 0
+
+    index: Dict[Tuple[str, ...], int] = {(): 0}
+    parents = [-1]
+    node_paths: List[Tuple[str, ...]] = [()]
+    for leaf, path in enumerate(paths):
+        path = tuple(path)
+        parent = 0
+        for depth in range(1, len(path) + 1):
+            node = index.get(path[:depth])
+            if node is None:
+                node = index[path[:depth]] = len(node_paths)
+                parents.append(parent)
+                node_paths.append(path[:depth])
+            ancestors[leaf, depth] = node
+            parent = node
+
+    depths = np.array([len(path) for path in node_paths], dtype=np.int64)
+    return np.array(parents, dtype=np.int64), depths, node_paths, ancestors
+
+
+def _rates(counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Control rate, treatment rate and absolute lift for rows of (n0, c0, n1, c1)."""
+    n0, c0, n1, c1 = counts.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p0 = c0 / n0
+        p1 = c1 / n1
+    return p0, p1, p1 - p0
+
+
+def _null_lift_variance(counts: np.ndarray) -> np.ndarray:
+    """
+    Variance of the lift for rows of (n0, c0, n1, c1) with both arms at their pooled rate.
+
+    Unlike the Wald variance it stays away from zero when one arm happens to
+    have no conversions, so sparse cells do not get outsized weights.
+    """
+    n0, c0, n1, c1 = counts.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pooled = (c0 + c1) / (n0 + n1)
+        return pooled * (1 - pooled) * (1 / n0 + 1 / n1)
+
+
+def _has_min_counts(counts: np.ndarray, min_arm_count: float) -> np.ndarray:
+    """Rows of (n0, c0, n1, c1) with at least min_arm_count conversions and non-conversions in each arm."""
+    n0, c0, n1, c1 = counts.T
+    return (np.minimum.reduce([c0, n0 - c0, c1, n1 - c1]) >= min_arm_count) & (n0 > 0) & (n1 > 0)
+
+
+@traced("statistics.scan_segment_tree")
+def scan_segment_tree(
+    paths: Sequence[Sequence[str]],
+    control_users: Sequence[int],
+    control_conversions: Sequence[int],
+    treatment_users: Sequence[int],
+    treatment_conversions: Sequence[int],
+    false_discovery_rate: float = 0.05,
+    prune_level: Optional[float] = None,
+    max_results: int = 20,
+    min_arm_count: int = 5
+) -> Dict:
+    """
+    Find segments of a hierarchy whose effect diverges from the rest of their parent.
+
+    Leaf counts are summed into every ancestor once, one bincount per level.
+    Each node's lift is then compared with the lift of its siblings combined
+    (parent minus node) by a z-test of the interaction, and each node gets
+    Cochran's Q across the leaves beneath it, aggregated the same way. The
+    scan is top-down: a node's children are only tested when its Q is below
+    prune_level, so subtrees whose leaves agree are pruned without testing
+    every node in them. The Benjamini-Hochberg procedure then controls the
+    false discovery rate over the nodes that were tested.
+
+    Variances use rates pooled under the null rather than each cell's own
+    rate, which is near zero in sparse cells and would give them huge
+    weights: the node, the rest of its parent and every leaf in Cochran's Q
+    each get the lift variance at their two arms' pooled rate. Nodes and leaves with fewer than min_arm_count conversions or
+    non-conversions in an arm are left out, as the normal approximation does
+    not hold for them.
+
+    Args:
+        paths: Hierarchy path of each leaf segment, top level first (e.g.
+            ["EU", "DE", "iOS"])
+        control_users, control_conversions: Control counts per leaf
+        treatment_users, treatment_conversions: Treatment counts per leaf
+        false_discovery_rate: Target false discovery rate among reported segments
+        prune_level: Cochran's Q p-value above which a node's subtree is not
+            tested; defaults to false_discovery_rate
+        max_results: Most divergent segments to return
+        min_arm_count: Conversions and non-conversions each arm needs for a
+            node (and the rest of its parent) to be tested or a leaf to count
+            in Cochran's Q
+
+    Returns:
+        Dictionary with the tree size; how many nodes were tested, pruned, or
+        examined but untestable (fewer than min_arm_count conversions or
+        non-conversions in an arm of the node or the rest of its parent); and
+        the divergent segments ordered by adjusted p-value
+    """
+    prune_level = false_discovery_rate if prune_level is None else prune_level
+    parents, depths, node_paths, ancestors = build_segment_tree(paths)
+    node_count = len(node_paths)
+
+    # Bottom-up aggregation: every leaf adds its counts to each of its ancestors
+    leaf_counts = np.stack([
+        np.asarray(control_users, dtype=float),
+        np.asarray(control_conversions, dtype=float),
+        np.asarray(treatment_users, dtype=float),
+        np.asarray(treatment_conversions, dtype=float)
+    ], axis=1).reshape(-1, 4)
+    counts = np.zeros((node_count, 4))
+    for depth in range(ancestors.shape[1]):
+        at_depth = ancestors[:, depth] >= 0
+        nodes = ancestors[at_depth, depth]
+        for column in range(4):
+            counts[:, column] += np.bincount(nodes, weights=leaf_counts[at_depth, column], minlength=node_count)
+
+    control_rate, treatment_rate, lift = _rates(counts)
+
+    # Interaction: each node against the rest of its parent, each side's lift at its pooled rate under the null
+    children = np.arange(1, node_count)
+    rest_counts = counts[parents[children]] - counts[children]
+    _, _, rest_lift = _rates(rest_counts)
+    rest_lift = np.concatenate([[np.nan], rest_lift])
+    testable = np.zeros(node_count, dtype=bool)
+    testable[children] = _has_min_counts(counts[children], min_arm_count) & _has_min_counts(rest_counts, min_arm_count)
+
+    variance = _null_lift_variance(counts)
+    rest_variance = np.concatenate([[np.nan], _null_lift_variance(rest_counts)])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        testable &= np.isfinite(variance + rest_variance) & (variance + rest_variance > 0)
+        difference = lift - rest_lift
+        z_score = np.where(testable, difference / np.sqrt(variance + rest_variance), 0.0)
+    p_value = np.where(testable, 2 * stats.norm.sf(np.abs(z_score)), 1.0)
+
+    # Cochran's Q across the leaves under each node, aggregated bottom-up like the counts
+    _, _, leaf_lift = _rates(leaf_counts)
+    leaf_variance = _null_lift_variance(leaf_counts)
+    leaf_valid = _has_min_counts(leaf_counts, min_arm_count) & np.isfinite(leaf_variance) & (leaf_variance > 0)
+    leaf_weight = np.where(leaf_valid, 1 / np.where(leaf_valid, leaf_variance, 1.0), 0.0)
+    leaf_lift = np.where(leaf_valid, leaf_lift, 0.0)
+    moments = np.stack([leaf_weight, leaf_weight * leaf_lift, leaf_weight * leaf_lift ** 2, leaf_valid], axis=1)
+    subtree = np.zeros((node_count, 4))
+    for depth in range(ancestors.shape[1]):
+        at_depth = ancestors[:, depth] >= 0
+        nodes = ancestors[at_depth, depth]
+        for column in range(4):
+            subtree[:, column] += np.bincount(nodes, weights=moments[at_depth, column], minlength=node_count)
+
+    weight_sums, weighted_lifts, weighted_squares, valid_leaves = subtree.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        q = weighted_squares - weighted_lifts ** 2 / weight_sums
+    degrees_of_freedom = valid_leaves - 1
+    q_p_value = np.where(
+        degrees_of_freedom >= 1,
+        stats.chi2.sf(np.nan_to_num(np.maximum(q, 0.0)), np.maximum(degrees_of_freedom, 1)),
+        1.0
+    )
+
+    # Top-down pruning: a node's children are examined only if the leaves beneath it disagree
+    explored = np.zeros(node_count, dtype=bool)
+    explored[0] = q_p_value[0] < prune_level
+    for depth in range(1, int(depths.max()) + 1):
+        nodes = np.nonzero(depths == depth)[0]
+        explored[nodes] = explored[parents[nodes]] & (q_p_value[nodes] < prune_level)
+
+    # Children of explored nodes are examined; those too small to test are counted apart from pruned ones
+    examined = explored[parents[children]]
+    tested = np.zeros(node_count, dtype=bool)
+    tested[children] = examined & testable[children]
+
+    adjusted = np.ones(node_count)
+    adjusted[tested] = benjamini_hochberg(p_value[tested])
+    discoveries = np.nonzero(tested & (adjusted <= false_discovery_rate))[0]
+    discoveries = discoveries[np.lexsort((-np.abs(difference[discoveries]), adjusted[discoveries]))][:max_results]
+
+    return {
+        "nodes": int(node_count - 1),
+        "leaves": int(len(leaf_counts)),
+        "tested_nodes": int(tested.sum()),
+        "pruned_nodes": int((~examined).sum()),
+        "untestable_nodes": int((examined & ~testable[children]).sum()),
+        "root_heterogeneity_p_value": round(float(q_p_value[0]), 4),
+        "divergent_segments": [
+            {
+                "path": list(node_paths[node]),
+                "depth": int(depths[node]),
+                "users": int(counts[node, 0] + counts[node, 2]),
+                "control_conversion_rate": round(float(control_rate[node]), 4),
+                "treatment_conversion_rate": round(float(treatment_rate[node]), 4),
+                "absolute_lift": round(float(lift[node]), 4),
+                "rest_absolute_lift": round(float(rest_lift[node]), 4),
+                "interaction_difference": round(float(difference[node]), 4),
+                "z_score": round(float(z_score[node]), 3),
+                "p_value": round(float(p_value[node]), 6),
+                "adjusted_p_value": round(float(adjusted[node]), 6)
+            }
+            for node in discoveries
+        ]
+    }
@@ -0,0 +1,201 @@
+import math
+import time
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from scipy import stats
+from app.core.tracing import traced
+
+
+def allocate_sample(total_sample_size: int, allocation: Sequence[float]) -> np.ndarray:
+    """
+    Split a total sample across arms in proportion to the allocation weights.
+
+    Every arm gets at least 2 users, and rounding leftovers go to the largest
+    remainders so the arm sizes always sum to the total.
+    """
+    weights = np.asarray(allocation, dtype=float) / float(np.sum(allocation))
+    exact = weights * total_sample_size
+    sizes = np.floor(exact).astype(np.int64)
+    remainder = int(total_sample_size - sizes.sum())
+    if remainder > 0:
+        sizes[np.argsort(sizes - exact)[:remainder]] += 1
+    return np.maximum(sizes, 2)
+
+
+def simulate_power(
+    arm_rates: Sequence[float],
+    total_sample_sizes: Sequence[int],
+    allocation: Optional[Sequence[float]] = None,
+    significance_level: float = 0.05,
+    simulations: int = 2000,
+    chunk_size: int = 1000,
+    rng: Optional[np.random.Generator] = None
+) -> np.ndarray:
+    """
+    Estimate power for several candidate sample sizes by simulation.
+
+    Each simulated experiment draws binomial conversions for every arm and runs
+    the same two-sided pooled z-test as calculate_conversion_metrics for each
+    treatment against the control (arm 0). All candidates are simulated in one
+    vectorized batch, processed in chunks of simulations so memory stays
+    bounded at chunk_size x candidates x arms draws.
+
+    Args:
+        arm_rates: True conversion rate per arm, control first
+        total_sample_sizes: Candidate total sample sizes across all arms
+        allocation: Traffic weight per arm (defaults to an equal split)
+        significance_level: Alpha per comparison (apply any multiple-testing
+            correction before calling)
+        simulations: Simulated experiments per candidate
+        chunk_size: Simulated experiments drawn per batch
+        rng: Random generator, for reproducible results
+
+    Returns:
+        Array of shape (candidates, arms - 1) with the estimated power of each
+        treatment-vs-control comparison
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    rates = np.asarray(arm_rates, dtype=float)
+    allocation = allocation if allocation is not None else [1.0] * len(rates)
+    # Arm sizes, shape (arms, candidates)
+    sizes = np.stack([allocate_sample(int(total), allocation) for total in total_sample_sizes], axis=1)
+    z_critical = stats.norm.ppf(1 - significance_level / 2)
+
+    rejections = np.zeros((sizes.shape[1], len(rates) - 1), dtype=np.int64)
+    remaining = simulations
+    while remaining > 0:
+        batch = min(chunk_size, remaining)
+        remaining -= batch
+
+        conversions = rng.binomial(sizes[:, None, :], rates[:, None, None], size=(len(rates), batch, sizes.shape[1]))
+        control_n = sizes[0]
+        control_conversions = conversions[0]
+        for arm in range(1, len(rates)):
+            treatment_n = sizes[arm]
+            pooled = (control_conversions + conversions[arm]) / (control_n + treatment_n)
+            se = np.sqrt(pooled * (1 - pooled) * (1 / control_n + 1 / treatment_n))
+            diff = conversions[arm] / treatment_n - control_conversions / control_n
+            # se == 0 means no conversions (or all converted) in both arms: never significant
+            significant = np.abs(diff) > z_critical * se
+            significant &= se > 0
+            rejections[:, arm - 1] += significant.sum(axis=0)
+
+    return rejections / simulations
+
+
+@traced("statistics.find_sample_size_by_simulation")
+def find_sample_size_by_simulation(
+    arm_rates: Sequence[float],
+    statistical_power: float = 0.8,
+    significance_level: float = 0.05,
+    allocation: Optional[Sequence[float]] = None,
+    initial_total: Optional[int] = None,
+    simulations: int = 2000,
+    chunk_size: int = 1000,
+    candidates_per_round: int = 8,
+    relative_tolerance: float = 0.01,
+    time_budget_ms: Optional[float] = None,
+    max_total: int = 10**9,
+    seed: Optional[int] = None
+) -> Dict:
+    """
+    Find the smallest total sample size whose simulated power meets the target.
+
+    The search first brackets the answer with a geometric grid around the
+    initial guess, then narrows the bracket by simulating evenly spaced
+    candidates inside it in one batch per round (a multi-point bisection).
+    Every treatment arm must reach the target power.
+
+    Refinement stops once the bracket is within relative_tolerance, or when the
+    time budget runs out; the upper end of the bracket is returned either way,
+    so a budget stop errs on the side of a larger sample.
+
+    Args:
+        arm_rates: True conversion rate per arm, control first
+        statistical_power: Target power for every treatment-vs-control comparison
+        significance_level: Alpha per comparison
+        allocation: Traffic weight per arm (defaults to an equal split)
+        initial_total: Starting guess for the total sample size, e.g. from
+            the normal approximation
+        simulations: Simulated experiments per candidate
+        chunk_size: Simulated experiments drawn per batch
+        candidates_per_round: Candidates simulated together in each round
+        relative_tolerance: Stop once the bracket width is within this
+            fraction of its upper end
+        time_budget_ms: Stop refining after this much time
+        max_total: Largest total sample size considered
+        seed: Seed for reproducible results
+
+    Returns:
+        Dictionary with the total and per-arm sample sizes, the simulated power
+        at that size and search diagnostics
+
+    Raises:
+        ValueError: If the target power is not reached within max_total
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    num_arms = len(arm_rates)
+    deadline = started + time_budget_ms / 1000 if time_budget_ms is not None else None
+    evaluations = 0
+    rounds = 0
+
+    def evaluate(candidates: List[int]) -> np.ndarray:
+        nonlocal evaluations, rounds
+        evaluations += len(candidates)
+        rounds += 1
+        power = simulate_power(
+            arm_rates, candidates, allocation, significance_level, simulations, chunk_size, rng
+        )
+        return power.min(axis=1)
+
+    # Bracket: grow a geometric grid until some candidate reaches the target
+    lo = 2 * num_arms
+    guess = max(initial_total or 100 * num_arms, lo + candidates_per_round)
+    hi = None
+    hi_power = 0.0
+    while hi is None:
+        grid = sorted({max(lo, int(v)) for v in np.geomspace(guess / 2, guess * 2, candidates_per_round)})
+        power = evaluate(grid)
+        reached = np.nonzero(power >= statistical_power)[0]
+        if len(reached):
+            first = int(reached[0])
+            hi, hi_power = grid[first], float(power[first])
+            if first > 0:
+                lo = grid[first - 1]
+        else:
+            lo = grid[-1]
+            if lo >= max_total:
+                raise ValueError(
+                    f"Target power {statistical_power} is not reachable with up to {max_total} users"
+                )
+            guess = min(guess * 4, max_total)
+
+    # Refine: simulate evenly spaced candidates inside (lo, hi) together
+    converged = hi - lo <= max(1, relative_tolerance * hi)
+    while not converged and (deadline is None or time.perf_counter() < deadline):
+        candidates = sorted({int(v) for v in np.linspace(lo, hi, candidates_per_round + 2)[1:-1]} - {lo, hi})
+        if not candidates:
+            break
+        power = evaluate(candidates)
+        reached = np.nonzero(power >= statistical_power)[0]
+        if len(reached):
+            first = int(reached[0])
+            hi, hi_power = candidates[first], float(power[first])
+            lo = candidates[first - 1] if first > 0 else lo
+        else:
+            lo = candidates[-1]
+        converged = hi - lo <= max(1, relative_tolerance * hi)
+
+    arm_sizes = allocate_sample(hi, allocation if allocation is not None else [1.0] * num_arms)
+    return {
+        "total_sample_size": int(arm_sizes.sum()),
+        "sample_sizes": [int(size) for size in arm_sizes],
+        "power": round(hi_power, 4),
+        "power_standard_error": round(math.sqrt(hi_power * (1 - hi_power) / simulations), 4),
+        "simulations": simulations,
+        "candidates_evaluated": evaluations,
+        "rounds": rounds,
+        "converged": converged,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3)
+    }
@@ -0,0 +1,171 @@
+from typing import Dict, List, Optional
+import numpy as np
+from scipy import stats
+from app.core.tracing import traced
+
+# Heterogeneity tests have little power, so the conventional threshold is 0.10
+HETEROGENEITY_SIGNIFICANCE_LEVEL = 0.10
+
+
+def _interval(estimate: float, half_width: float, transform=None) -> Dict[str, Optional[float]]:
+    """Confidence interval dict, optionally computed on a transformed (e.g. log) scale."""
+    if not np.isfinite(estimate) or not np.isfinite(half_width):
+        return {"lower": None, "upper": None}
+    lower, upper = estimate - half_width, estimate + half_width
+    if transform is not None:
+        lower, upper = transform(lower), transform(upper)
+    return {"lower": round(float(lower), 4), "upper": round(float(upper), 4)}
+
+
+def _finite(value: float, digits: int = 4) -> Optional[float]:
+    return round(float(value), digits) if np.isfinite(value) else None
+
+
+def breslow_day_expected(
+    treatment_users: np.ndarray,
+    control_users: np.ndarray,
+    conversions: np.ndarray,
+    odds_ratio: float
+) -> np.ndarray:
+    """
+    Expected treatment conversions per stratum if every stratum had the given odds ratio.
+
+    Solves (1 - OR) a^2 + (n0 - m1 + OR (n1 + m1)) a - OR n1 m1 = 0 for the root
+    inside the table margins, for all strata at once.
+    """
+    n1, n0, m1 = treatment_users, control_users, conversions
+    quadratic = 1 - odds_ratio
+    linear = n0 - m1 + odds_ratio * (n1 + m1)
+    constant = -odds_ratio * n1 * m1
+    if abs(quadratic) < 1e-12:
+        return -constant / linear
+
+    discriminant = np.sqrt(np.maximum(linear ** 2 - 4 * quadratic * constant, 0))
+    roots = np.stack([(-linear + discriminant) / (2 * quadratic), (-linear - discriminant) / (2 * quadratic)])
+    lower = np.maximum(0, m1 - n0)
+    upper = np.minimum(n1, m1)
+    inside = (roots >= lower - 1e-9) & (roots <= upper + 1e-9)
+    return np.where(inside[0], roots[0], roots[1])
+
+
+@traced("statistics.stratified_analysis")
+def stratified_analysis(segment_data: List[Dict]) -> Optional[Dict]:
+    """
+    Cochran-Mantel-Haenszel analysis pooling the effect across segments.
+
+    Each segment is a stratum with control (first variant) and treatment
+    (second variant) counts. All strata are evaluated in one vectorized pass:
+    Mantel-Haenszel pooled risk difference, risk ratio and odds ratio with
+    confidence intervals, the CMH test of no effect, and two heterogeneity
+    tests, Breslow-Day (with Tarone's correction) on the odds ratios and
+    Cochran's Q on the risk differences, weighted by each stratum's variance
+    at its pooled rate. Breslow-Day decides is_heterogeneous.
+
+    Args:
+        segment_data: List of segment dictionaries with variant data
+
+    Returns:
+        Dictionary with pooled estimates and tests, or None if fewer than two
+        segments have users in both arms
+    """
+    strata = [segment for segment in segment_data if len(segment["variants"]) >= 2]
+    control_users = np.array([s["variants"][0]["users"] for s in strata], dtype=float)
+    control_conversions = np.array([s["variants"][0]["conversions"] for s in strata], dtype=float)
+    treatment_users = np.array([s["variants"][1]["users"] for s in strata], dtype=float)
+    treatment_conversions = np.array([s["variants"][1]["conversions"] for s in strata], dtype=float)
+
+    usable = (control_users > 0) & (treatment_users > 0)
+    if usable.sum() < 2:
+        return None
+
+    n0, c, n1, a = control_users[usable], control_conversions[usable], treatment_users[usable], treatment_conversions[usable]
+    b, d = n1 - a, n0 - c
+    n = n0 + n1
+    m1 = a + c
+    z = stats.norm.ppf(0.975)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p1, p0 = a / n1, c / n0
+
+        # Mantel-Haenszel risk difference, weights n1 n0 / n
+        weights = n1 * n0 / n
+        risk_difference = np.sum(weights * (p1 - p0)) / weights.sum()
+        rd_variance = np.sum(weights ** 2 * (p1 * (1 - p1) / n1 + p0 * (1 - p0) / n0)) / weights.sum() ** 2
+
+        # Mantel-Haenszel risk ratio (Greenland-Robins variance of its log)
+        rr_numerator = np.sum(a * n0 / n)
+        rr_denominator = np.sum(c * n1 / n)
+        risk_ratio = rr_numerator / rr_denominator
+        log_rr_variance = np.sum((n1 * n0 * m1 - a * c * n) / n ** 2) / (rr_numerator * rr_denominator)
+
+        # Mantel-Haenszel odds ratio (Robins-Breslow-Greenland variance of its log)
+        r, s = a * d / n, b * c / n
+        odds_ratio = r.sum() / s.sum()
+        p, q = (a + d) / n, (b + c) / n
+        log_or_variance = (
+            np.sum(p * r) / (2 * r.sum() ** 2)
+            + np.sum(p * s + q * r) / (2 * r.sum() * s.sum())
+            + np.sum(q * s) / (2 * s.sum() ** 2)
+        )
+
+        # CMH test of no association across strata
+        expected = n1 * m1 / n
+        variance = n1 * n0 * m1 * (n - m1) / (n ** 2 * (n - 1))
+        informative = np.isfinite(variance) & (variance > 0)
+        cmh_statistic = np.sum((a - expected)[informative]) ** 2 / variance[informative].sum()
+        cmh_p_value = stats.chi2.sf(cmh_statistic, 1)
+
+        # Breslow-Day test of a common odds ratio, with Tarone's correction
+        breslow_day_statistic = breslow_day_p_value = np.nan
+        if np.isfinite(odds_ratio) and odds_ratio > 0:
+            fitted = breslow_day_expected(n1, n0, m1, odds_ratio)
+            fitted_variance = 1 / (1 / fitted + 1 / (n1 - fitted) + 1 / (m1 - fitted) + 1 / (n0 - m1 + fitted))
+            valid = np.isfinite(fitted_variance) & (fitted_variance > 0)
+            if valid.sum() >= 2:
+                deviation = (a - fitted)[valid]
+                breslow_day_statistic = (
+                    np.sum(deviation ** 2 / fitted_variance[valid])
+                    - deviation.sum() ** 2 / fitted_variance[valid].sum()
+                )
+                breslow_day_p_value = stats.chi2.sf(breslow_day_statistic, valid.sum() - 1)
+
+        # Cochran's Q on inverse-variance weighted risk differences. Variances use each
+        # stratum's pooled rate: the Wald variance is near zero when an arm has no
+        # conversions, which gave sparse strata the largest weights
+        pooled_rate = m1 / n
+        stratum_variance = pooled_rate * (1 - pooled_rate) * (1 / n1 + 1 / n0)
+        weighted = stratum_variance > 0
+        cochran_q = cochran_q_p_value = i_squared = np.nan
+        if weighted.sum() >= 2:
+            inverse_variance = 1 / stratum_variance[weighted]
+            differences = (p1 - p0)[weighted]
+            pooled = np.sum(inverse_variance * differences) / inverse_variance.sum()
+            cochran_q = np.sum(inverse_variance * (differences - pooled) ** 2)
+            degrees_of_freedom = weighted.sum() - 1
+            cochran_q_p_value = stats.chi2.sf(cochran_q, degrees_of_freedom)
+            i_squared = max(0.0, (cochran_q - degrees_of_freedom) / cochran_q) if cochran_q > 0 else 0.0
+
+    # One test decides the flag, as taking either of two tests inflates its false positive rate;
+    # Cochran's Q only when Breslow-Day is undefined (e.g. no conversions in any stratum's arm)
+    heterogeneity_p_value = breslow_day_p_value if np.isfinite(breslow_day_p_value) else cochran_q_p_value
+    return {
+        "strata": int(usable.sum()),
+        "strata_excluded": int(len(segment_data) - usable.sum()),
+        "pooled_absolute_lift": _finite(risk_difference),
+        "absolute_lift_ci": _interval(risk_difference, z * np.sqrt(rd_variance)),
+        "pooled_relative_lift": _finite(risk_ratio - 1),
+        "relative_lift_ci": _interval(np.log(risk_ratio), z * np.sqrt(log_rr_variance), lambda x: np.exp(x) - 1),
+        "pooled_odds_ratio": _finite(odds_ratio),
+        "odds_ratio_ci": _interval(np.log(odds_ratio), z * np.sqrt(log_or_variance), np.exp),
+        "cmh_statistic": _finite(cmh_statistic, 3),
+        "cmh_p_value": _finite(cmh_p_value),
+        "is_significant": bool(np.isfinite(cmh_p_value) and cmh_p_value < 0.05),
+        "breslow_day_statistic": _finite(breslow_day_statistic, 3),
+        "breslow_day_p_value": _finite(breslow_day_p_value),
+        "cochran_q": _finite(cochran_q, 3),
+        "cochran_q_p_value": _finite(cochran_q_p_value),
+        "i_squared": _finite(i_squared),
+        "is_heterogeneous": bool(
+            np.isfinite(heterogeneity_p_value) and heterogeneity_p_value < HETEROGENEITY_SIGNIFICANCE_LEVEL
+        )
+    }
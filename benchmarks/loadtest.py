@@ -0,0 +1,215 @@
+"""
+Load-test a running API with a weighted mix of requests at a fixed arrival rate.
+
+Requests arrive open-loop (Poisson arrivals at --rate per second), so a slow
+server shows up as rising latency and errors instead of a lower send rate.
+Start the server with the fake LLM provider to measure the service itself; it
+never falls back to the real (billed) providers when it injects errors:
+
+    LLM_FAKE_ENABLED=true DEFAULT_LLM_PROVIDER=fake LLM_FALLBACK_ENABLED=false \\
+        uv run uvicorn app.main:app --port 8000 --workers 4 --no-access-log
+
+Usage:
+    python -m benchmarks.loadtest [--rate 20] [--duration 60]
+        [--mix validate=5,analyze=4,analyze_segments=1] [--segments 1000] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import httpx
+from benchmarks.payload_size import make_segments
+
+Scenario = Callable[[random.Random], Tuple[str, str, Dict[str, Any]]]
+
+
+def make_validate_request(rng: random.Random) -> Tuple[str, str, Dict[str, Any]]:
+    return "POST", "/validate/setup", {
+        "hypothesis": f"Changing the checkout button copy will increase conversion by {rng.randint(5, 25)}%",
+        "metric": {"baseline_conversion_rate": round(rng.uniform(0.01, 0.2), 4)},
+        "parameters": {"minimum_detectable_effect_relative": round(rng.uniform(0.05, 0.3), 3)},
+        "traffic": {"estimated_daily_users": rng.randint(500, 50000)}
+    }
+
+
+def make_results_request(rng: random.Random, segments: int = 0) -> Dict[str, Any]:
+    users = rng.randint(5000, 50000)
+    request = {
+        "context": {
+            "hypothesis": f"Showing social proof on the pricing page will increase upgrades (run {rng.random():.6f})",
+            "primary_metric_name": "upgrade_rate"
+        },
+        "results_data": {
+            "variants": [
+                {"name": "control", "users": users, "conversions": rng.randint(users // 40, users // 20)},
+                {"name": "treatment", "users": users, "conversions": rng.randint(users // 40, users // 20)}
+            ]
+        }
+    }
+    if segments:
+        request["results_data"]["segments"] = make_segments(segments, seed=rng.randint(0, 2**31))
+    return request
+
+
+def build_scenarios(segments: int) -> Dict[str, Scenario]:
+    heavy_payloads: List[Dict[str, Any]] = []
+
+    def analyze_segments(rng: random.Random) -> Tuple[str, str, Dict[str, Any]]:
+        # Building thousands of segments is costly, so reuse a small pool of payloads
+        if len(heavy_payloads) < 8:
+            heavy_payloads.append(make_results_request(rng, segments))
+        return "POST", "/analyze/results?response_format=compact", rng.choice(heavy_payloads)
+
+    return {
+        "validate": make_validate_request,
+        "analyze": lambda rng: ("POST", "/analyze/results", make_results_request(rng)),
+        "analyze_segments": analyze_segments,
+    }
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class RouteStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.status_counts: Dict[str, int] = {}
+
+    def record(self, latency: float, status: str, ok: bool) -> None:
+        self.latencies.append(latency)
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        if not ok:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            "requests": count,
+            "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "status_counts": self.status_counts
+        }
+
+
+async def run_load(
+    base_url: str,
+    rate: float,
+    duration: float,
+    weights: Dict[str, float],
+    scenarios: Dict[str, Scenario],
+    max_in_flight: int,
+    timeout: float,
+    seed: int
+) -> Tuple[Dict[str, RouteStats], float, int]:
+    rng = random.Random(seed)
+    names = list(weights)
+    stats = {name: RouteStats() for name in names}
+    in_flight = 0
+    dropped = 0
+    tasks = set()
+
+    async def send(client: httpx.AsyncClient, name: str, method: str, path: str, body: Dict[str, Any]) -> None:
+        nonlocal in_flight
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body)
+            stats[name].record(time.perf_counter() - started, str(response.status_code), response.status_code < 400)
+        except httpx.HTTPError as e:
+            stats[name].record(time.perf_counter() - started, type(e).__name__, False)
+        finally:
+            in_flight -= 1
+
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        next_arrival = started
+        while next_arrival - started < duration:
+            await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+            name = rng.choices(names, weights=[weights[n] for n in names])[0]
+            if in_flight >= max_in_flight:
+                # Client-side saturation: count it rather than silently slowing the arrival rate
+                dropped += 1
+            else:
+                method, path, body = scenarios[name](rng)
+                in_flight += 1
+                task = asyncio.create_task(send(client, name, method, path, body))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            next_arrival += rng.expovariate(rate)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    return stats, elapsed, dropped
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"{'route':<18}{'requests':>9}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}")
+    for name, summary in report["routes"].items():
+        print(
+            f"{name:<18}{summary['requests']:>9}{summary['throughput_rps']:>9.2f}{summary['p50_ms']:>10.1f}"
+            f"{summary['p95_ms']:>10.1f}{summary['p99_ms']:>10.1f}{summary['error_rate']:>9.2%}"
+        )
+    print(f"\nelapsed {report['elapsed_seconds']:.1f}s, dropped at client (max in flight reached): {report['dropped']}")
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rate", type=float, default=20.0, help="Total arrivals per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to generate arrivals for")
+    parser.add_argument("--mix", default="validate=5,analyze=4,analyze_segments=1")
+    parser.add_argument("--segments", type=int, default=1000, help="Segments per segment-heavy payload")
+    parser.add_argument("--max-in-flight", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    scenarios = build_scenarios(args.segments)
+    weights = parse_mix(args.mix)
+    unknown = set(weights) - set(scenarios)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}; choose from {', '.join(scenarios)}")
+
+    stats, elapsed, dropped = asyncio.run(run_load(
+        args.base_url, args.rate, args.duration, weights, scenarios,
+        args.max_in_flight, args.timeout, args.seed
+    ))
+    report = {
+        "config": vars(args),
+        "elapsed_seconds": round(elapsed, 3),
+        "dropped": dropped,
+        "routes": {name: route.summary(elapsed) for name, route in stats.items()}
+    }
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
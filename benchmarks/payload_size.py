@@ -0,0 +1,69 @@
+"""
+Benchmark /analyze/results payload size and encoding time by response format.
+
+Usage:
+    python -m benchmarks.payload_size [--segments 100 1000 10000]
+"""
+import argparse
+import random
+import time
+from app.api.analyze import build_results_response
+from app.core.serialization import dumps
+from app.models.requests import ResponseFormat
+from app.models.responses import GenerativeAnalysisModel, NextStepModel
+from app.statistics.calculations import calculate_conversion_metrics, analyze_segments
+
+
+def make_segments(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    segments = []
+    for index in range(count):
+        users = rng.randint(200, 5000)
+        segments.append({
+            "segment_name": f"segment-{index}",
+            "variants": [
+                {"name": "control", "users": users, "conversions": rng.randint(0, users // 10)},
+                {"name": "treatment", "users": users, "conversions": rng.randint(0, users // 10)}
+            ]
+        })
+    return segments
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    metrics = calculate_conversion_metrics(10000, 500, 10000, 560)
+    generative_analysis = GenerativeAnalysisModel(
+        interpretation_narrative="Narrative",
+        recommended_next_steps=[NextStepModel(action="REVIEW RESULTS", confidence="Medium", rationale="Rationale")],
+        generated_questions=["Question?"]
+    )
+    variants = [
+        ("full", ResponseFormat.FULL, True),
+        ("full, no explanations", ResponseFormat.FULL, False),
+        ("compact", ResponseFormat.COMPACT, True),
+        ("compact, no explanations", ResponseFormat.COMPACT, False),
+    ]
+
+    print(f"{'segments':>9}  {'format':<26}{'bytes':>12}{'vs full':>9}{'encode ms':>11}")
+    for count in args.segments:
+        segment_results = analyze_segments(make_segments(count))
+        full_size = None
+        for label, response_format, include_explanations in variants:
+            started = time.perf_counter()
+            payload = build_results_response(
+                metrics, segment_results, generative_analysis,
+                response_format=response_format,
+                include_explanations=include_explanations
+            )
+            body = dumps(payload)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            full_size = full_size or len(body)
+            print(f"{count:>9}  {label:<26}{len(body):>12,}{len(body) / full_size:>9.0%}{elapsed_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark simulation-based sample size search latency for typical designs.
+
+Usage:
+    python -m benchmarks.power_simulation [--simulations 2000] [--repeat 5]
+"""
+import argparse
+import statistics
+import time
+from app.statistics.calculations import calculate_sample_size
+from app.statistics.simulation import find_sample_size_by_simulation
+
+DESIGNS = [
+    # (baseline, relative MDE, variants)
+    (0.05, 0.10, 2),
+    (0.005, 0.20, 2),
+    (0.001, 0.50, 2),
+    (0.10, 0.05, 2),
+    (0.05, 0.10, 4),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--simulations", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'design':<22}{'analytic n':>12}{'simulated n':>13}{'power':>8}{'rounds':>8}{'median ms':>11}{'max ms':>9}")
+    for baseline, mde, variants in DESIGNS:
+        analytic = calculate_sample_size(baseline, mde)
+        durations = []
+        for seed in range(args.repeat):
+            started = time.perf_counter()
+            result = find_sample_size_by_simulation(
+                [baseline] + [baseline * (1 + mde)] * (variants - 1),
+                initial_total=analytic * variants,
+                simulations=args.simulations,
+                seed=seed
+            )
+            durations.append((time.perf_counter() - started) * 1000)
+        design = f"p={baseline} mde={mde:.0%} k={variants}"
+        print(
+            f"{design:<22}{analytic:>12}{max(result['sample_sizes']):>13}{result['power']:>8.3f}"
+            f"{result['rounds']:>8}{statistics.median(durations):>11.1f}{max(durations):>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
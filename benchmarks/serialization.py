@@ -0,0 +1,91 @@
+"""
+Benchmark /analyze/results response serialization throughput.
+
+Compares the previous path (nested pydantic models encoded through FastAPI's
+jsonable_encoder and json.dumps) with the payload-dict + orjson path.
+
+Usage:
+    python -m benchmarks.serialization [--segments 10000] [--repeat 5]
+"""
+import argparse
+import json
+import time
+from fastapi.encoders import jsonable_encoder
+from app.api.analyze import build_results_response
+from app.core.serialization import dumps
+from app.models.responses import (
+    AnalyzeResultsResponse,
+    GenerativeAnalysisModel,
+    NextStepModel,
+    SegmentAnalysisItem,
+    StatisticalSummaryModel
+)
+from app.statistics.calculations import calculate_conversion_metrics, analyze_segments
+from benchmarks.payload_size import make_segments
+
+
+def encode_with_models(metrics, segment_results, generative_analysis) -> bytes:
+    """Encode the response the way FastAPI does for a response_model return value."""
+    response = AnalyzeResultsResponse(
+        statistical_summary=StatisticalSummaryModel(**metrics),
+        segment_analysis=[
+            SegmentAnalysisItem(
+                segment_name=seg["segment_name"],
+                metrics=StatisticalSummaryModel(**seg["metrics"])
+            )
+            for seg in segment_results
+        ],
+        generative_analysis=generative_analysis
+    )
+    validated = AnalyzeResultsResponse.model_validate(response.model_dump())
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+def encode_fast(metrics, segment_results, generative_analysis) -> bytes:
+    """Encode the response the way /analyze/results does now."""
+    return dumps(build_results_response(metrics, segment_results, generative_analysis))
+
+
+def best_of(repeat: int, encode, *args) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = encode(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, nargs="+", default=[10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    metrics = calculate_conversion_metrics(10000, 500, 10000, 560)
+    generative_analysis = GenerativeAnalysisModel(
+        interpretation_narrative="Narrative",
+        recommended_next_steps=[NextStepModel(action="REVIEW RESULTS", confidence="Medium", rationale="Rationale")],
+        generated_questions=["Question?"]
+    )
+    paths = [("models + jsonable_encoder", encode_with_models), ("payload dicts + orjson", encode_fast)]
+
+    print(f"{'segments':>9}  {'path':<28}{'ms':>10}{'segments/s':>14}{'MB/s':>9}{'speedup':>9}")
+    for count in args.segments:
+        segment_results = analyze_segments(make_segments(count))
+        baseline = None
+        bodies = []
+        for label, encode in paths:
+            elapsed, body = best_of(args.repeat, encode, metrics, segment_results, generative_analysis)
+            bodies.append(body)
+            baseline = baseline or elapsed
+            print(
+                f"{count:>9}  {label:<28}{elapsed * 1000:>10.1f}{count / elapsed:>14,.0f}"
+                f"{len(body) / elapsed / 1e6:>9.1f}{baseline / elapsed:>8.1f}x"
+            )
+
+        if json.loads(bodies[0]) != json.loads(bodies[1]):
+            raise SystemExit("Serialization paths produced different documents")
+
+
+if __name__ == "__main__":
+    main()
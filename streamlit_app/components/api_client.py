@@ -2,6 +2,7 @@ import requests
 import streamlit as st
 from typing import Dict, Any, Optional
 import os
+import time
 
 
 class APIClient:
@@ -70,6 +71,70 @@ class APIClient:
             if isinstance(e, APIError):
                 raise e
             raise APIError(f"Failed to analyze results: {str(e)}")
+    
+    def submit_analysis_job(self, results_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Call the /analyze/results/jobs endpoint to start a background analysis."""
+        try:
+            response = self.session.post(
+                f"{self.base_url}/analyze/results/jobs",
+                json=results_data,
+                timeout=30
+            )
+            return self._handle_response(response)
+        except Exception as e:
+            if isinstance(e, APIError):
+                raise e
+            raise APIError(f"Failed to submit analysis job: {str(e)}")
+    
+    def get_analysis_job(self, job_id: str) -> Dict[str, Any]:
+        """Poll the status of a background analysis job."""
+        try:
+            response = self.session.get(
+                f"{self.base_url}/analyze/results/jobs/{job_id}",
+                timeout=10
+            )
+            if response.status_code == 404:
+                raise JobNotFoundError("Analysis job not found or expired")
+            return self._handle_response(response)
+        except Exception as e:
+            if isinstance(e, APIError):
+                raise e
+            raise APIError(f"Failed to get analysis job: {str(e)}")
+    
+    def analyze_results_in_background(
+        self,
+        results_data: Dict[str, Any],
+        poll_interval: float = 1.0,
+        max_wait: float = 180.0,
+        not_found_grace: float = 30.0
+    ) -> Dict[str, Any]:
+        """
+        Submit a background analysis job and poll until its result is ready.
+        
+        With the default per-worker job store, a poll answered by a different API
+        worker than the one that accepted the job returns 404, so 404s are retried
+        until not_found_grace seconds pass without the job being seen.
+        """
+        job = self.submit_analysis_job(results_data)
+        job_id = job["job_id"]
+        deadline = time.monotonic() + max_wait
+        last_seen = time.monotonic()
+        
+        while job["status"] not in ("completed", "failed"):
+            if time.monotonic() > deadline:
+                raise APIError("Analysis is taking longer than expected. Please try again later.")
+            time.sleep(poll_interval)
+            try:
+                job = self.get_analysis_job(job_id)
+                last_seen = time.monotonic()
+            except JobNotFoundError:
+                if time.monotonic() - last_seen > not_found_grace:
+                    raise APIError("Analysis job was lost. Please try again.")
+        
+        if job["status"] == "failed":
+            raise APIError(f"Analysis failed: {job.get('error') or 'unknown error'}")
+        
+        return job["result"]
 
 
 class APIError(Exception):
@@ -77,6 +142,11 @@ class APIError(Exception):
     pass
 
 
+class JobNotFoundError(APIError):
+    """Raised when a background job is unknown to the API worker that answered the poll."""
+    pass
+
+
 # Singleton instance
 @st.cache_resource
 def get_api_client() -> APIClient:
@@ -176,7 +176,7 @@ def main():
         try:
             with st.spinner("Analyzing your experiment results..."):
                 client = get_api_client()
-                response = client.analyze_results(results_data)
+                response = client.analyze_results_in_background(results_data)
             
             display_success("Results analysis completed!")
             
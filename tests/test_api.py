@@ -99,6 +99,157 @@ class TestValidateSetupEndpoint:
         assert inputs["mde_type"] == "absolute"
         assert inputs["minimum_detectable_effect"] == 0.005
     
+    def test_valid_setup_request_simulated_power(self):
+        """Test validate setup with sample size from power simulation."""
+        request_data = {
+            "hypothesis": "We believe that adding a prominent CTA button will increase conversions by improving user engagement",
+            "metric": {
+                "baseline_conversion_rate": 0.05
+            },
+            "parameters": {
+                "variants": 3,
+                "minimum_detectable_effect_relative": 0.20,
+                "power_method": "simulation"
+            },
+            "traffic": {
+                "estimated_daily_users": 1000
+            }
+        }
+        
+        response = client.post("/validate/setup", json=request_data)
+        assert response.status_code == 200
+        
+        plan = response.json()["feasibility_analysis"]["recommended_plan"]
+        assert plan["power_method"] == "simulation"
+        assert plan["simulated_power"] >= 0.8
+        assert plan["total_sample_size"] == sum(plan["sample_sizes_per_variant"])
+        assert "power_simulation" in response.headers["server-timing"]
+    
+    def test_valid_setup_request_unequal_allocation(self):
+        """Test validate setup with an unequal allocation across three variants."""
+        request_data = {
+            "hypothesis": "We believe that adding a prominent CTA button will increase conversions by improving user engagement",
+            "metric": {
+                "baseline_conversion_rate": 0.05
+            },
+            "parameters": {
+                "variants": 3,
+                "minimum_detectable_effect_relative": 0.20,
+                "allocation": [2, 1, 1]
+            },
+            "traffic": {
+                "estimated_daily_users": 1000
+            }
+        }
+        
+        response = client.post("/validate/setup", json=request_data)
+        assert response.status_code == 200
+        
+        feasibility = response.json()["feasibility_analysis"]
+        plan = feasibility["recommended_plan"]
+        assert plan["allocation"] == [0.5, 0.25, 0.25]
+        assert plan["adjusted_significance_level"] == pytest.approx(0.025)
+        assert plan["total_sample_size"] == sum(plan["sample_sizes_per_variant"])
+        assert plan["sample_size_per_variant"] == plan["sample_sizes_per_variant"][0]
+        assert feasibility["optimal_allocation"]["estimated_duration_days"] <= plan["estimated_duration_days"]
+        assert all(row["optimal_allocation"] for row in feasibility["tradeoff_matrix"])
+    
+    def test_optimal_allocation_searched_once(self, monkeypatch):
+        """Test that the requested MDE's optimal allocation comes from the trade-off matrix search."""
+        from app.api import validate
+        
+        calls = []
+        original = validate.find_optimal_allocations
+        
+        def counting_find_optimal_allocations(*args, **kwargs):
+            calls.append(kwargs.get("minimum_detectable_effects"))
+            return original(*args, **kwargs)
+        
+        monkeypatch.setattr(validate, "find_optimal_allocations", counting_find_optimal_allocations)
+        request_data = {
+            "hypothesis": "We believe that adding a prominent CTA button will increase conversions by improving user engagement",
+            "metric": {"baseline_conversion_rate": 0.05},
+            "parameters": {"variants": 3, "minimum_detectable_effect_relative": 0.20},
+            "traffic": {"estimated_daily_users": 1000}
+        }
+        
+        feasibility = client.post("/validate/setup", json=request_data).json()["feasibility_analysis"]
+        assert len(calls) == 1 and len(calls[0]) == 5
+        assert feasibility["optimal_allocation"]["allocation"] == feasibility["tradeoff_matrix"][2]["optimal_allocation"]
+    
+    def test_valid_setup_request_traffic_forecast(self):
+        """Test validate setup with weekly seasonality and a staged ramp."""
+        request_data = {
+            "hypothesis": "We believe that adding a prominent CTA button will increase conversions by improving user engagement",
+            "metric": {
+                "baseline_conversion_rate": 0.05
+            },
+            "parameters": {
+                "minimum_detectable_effect_relative": 0.20
+            },
+            "traffic": {
+                "estimated_daily_users": 1000,
+                "weekday_profile": [1.2, 1.2, 1.1, 1.1, 1.0, 0.7, 0.7],
+                "ramp_schedule": [
+                    {"start_day": 0, "exposure": 0.01},
+                    {"start_day": 3, "exposure": 0.1},
+                    {"start_day": 7, "exposure": 0.5},
+                    {"start_day": 10, "exposure": 1.0}
+                ]
+            }
+        }
+        
+        response = client.post("/validate/setup", json=request_data)
+        assert response.status_code == 200
+        
+        feasibility = response.json()["feasibility_analysis"]
+        plan = feasibility["recommended_plan"]
+        assert plan["forecast_duration_days"] > plan["estimated_duration_days"]
+        
+        forecast = feasibility["traffic_forecast"]
+        assert len(forecast["cumulative_users"]) >= plan["forecast_duration_days"]
+        assert forecast["cumulative_users"][plan["forecast_duration_days"] - 1] >= plan["total_sample_size"]
+        assert all(row["forecast_duration_days"] for row in feasibility["tradeoff_matrix"])
+    
+    def test_invalid_setup_ramp_schedule(self):
+        """Test validation with a ramp schedule that does not start on day 0."""
+        request_data = {
+            "hypothesis": "Test hypothesis text",
+            "metric": {
+                "baseline_conversion_rate": 0.05
+            },
+            "parameters": {
+                "minimum_detectable_effect_relative": 0.20
+            },
+            "traffic": {
+                "estimated_daily_users": 1000,
+                "ramp_schedule": [{"start_day": 2, "exposure": 0.5}]
+            }
+        }
+        
+        response = client.post("/validate/setup", json=request_data)
+        assert response.status_code == 422
+    
+    def test_invalid_setup_allocation_length(self):
+        """Test validation with an allocation that does not match the variants."""
+        request_data = {
+            "hypothesis": "Test hypothesis text",
+            "metric": {
+                "baseline_conversion_rate": 0.05
+            },
+            "parameters": {
+                "variants": 3,
+                "minimum_detectable_effect_relative": 0.20,
+                "allocation": [1, 1]
+            },
+            "traffic": {
+                "estimated_daily_users": 1000
+            }
+        }
+        
+        response = client.post("/validate/setup", json=request_data)
+        assert response.status_code == 422
+    
     def test_invalid_setup_both_mdes(self):
         """Test validation with both relative and absolute MDE provided."""
         request_data = {
@@ -290,4 +441,1008 @@ class TestAnalyzeResultsEndpoint:
         }
         
         response = client.post("/analyze/results", json=request_data)
-        assert response.status_code == 422  # Validation error
\ No newline at end of file
+        assert response.status_code == 422  # Validation error
+    
+    def test_ratio_metrics_analysis(self):
+        """Test analyze results with a ratio metric given as aggregate moments."""
+        def moments(name, users, clicks, sessions):
+            # Every user has the same clicks and sessions, so the moments are exact
+            return {
+                "name": name,
+                "users": users,
+                "numerator_sum": clicks * users,
+                "denominator_sum": sessions * users,
+                "numerator_sum_squares": clicks ** 2 * users,
+                "denominator_sum_squares": sessions ** 2 * users,
+                "cross_product_sum": clicks * sessions * users
+            }
+        
+        request_data = {
+            "context": {
+                "hypothesis": "We believe that the new feed layout will increase clicks per session",
+                "primary_metric_name": "conversion_rate"
+            },
+            "results_data": {
+                "variants": [
+                    {"name": "control", "users": 1000, "conversions": 50},
+                    {"name": "treatment", "users": 1000, "conversions": 65}
+                ],
+                "ratio_metrics": [{
+                    "metric_name": "clicks_per_session",
+                    "variants": [moments("control", 1000, 2, 4), moments("treatment", 1000, 3, 4)],
+                    "segments": [{
+                        "segment_name": "Mobile",
+                        "variants": [moments("control", 400, 2, 4), moments("treatment", 400, 3, 4)]
+                    }]
+                }]
+            }
+        }
+        
+        response = client.post("/analyze/results", json=request_data)
+        assert response.status_code == 200
+        
+        ratio = response.json()["ratio_metrics"][0]
+        assert ratio["metric_name"] == "clicks_per_session"
+        assert ratio["statistical_summary"]["control_value"] == 0.5
+        assert ratio["statistical_summary"]["treatment_value"] == 0.75
+        assert ratio["statistical_summary"]["relative_lift"] == 0.5
+        assert ratio["segment_analysis"][0]["segment_name"] == "Mobile"
+    
+    def test_invalid_ratio_moments(self):
+        """Test validation when a sum of squares implies a negative variance."""
+        variant = {
+            "name": "control", "users": 100, "numerator_sum": 200, "denominator_sum": 400,
+            "numerator_sum_squares": 100, "denominator_sum_squares": 1600, "cross_product_sum": 800
+        }
+        request_data = {
+            "context": {
+                "hypothesis": "Test hypothesis for ratio metrics",
+                "primary_metric_name": "conversion_rate"
+            },
+            "results_data": {
+                "variants": [
+                    {"name": "control", "users": 100, "conversions": 5},
+                    {"name": "treatment", "users": 100, "conversions": 6}
+                ],
+                "ratio_metrics": [{"metric_name": "clicks_per_session", "variants": [variant, variant]}]
+            }
+        }
+        
+        response = client.post("/analyze/results", json=request_data)
+        assert response.status_code == 422
+
+SINGLE_SHOT_RESPONSE = """=== INTERPRETATION ===
+The treatment outperformed control by a meaningful margin.
+
+=== RECOMMENDATIONS ===
+1. ACTION: SHIP TO ALL USERS - CONFIDENCE: High
+   Rationale: The lift is significant and practically meaningful.
+
+2. ACTION: MONITOR RETENTION - CONFIDENCE: Medium
+   Rationale: Confirm the effect persists after launch.
+
+=== QUESTIONS ===
+1. Does the lift hold for returning users as well as new users?
+2. Which acquisition channels drove most of the additional conversions?
+"""
+
+
+class TestSingleShotGeneration:
+    def _request_data(self, generation_mode=None):
+        request_data = {
+            "context": {
+                "hypothesis": "We believe that the new checkout flow will increase conversions",
+                "primary_metric_name": "conversion_rate"
+            },
+            "results_data": {
+                "variants": [
+                    {"name": "control", "users": 1000, "conversions": 50},
+                    {"name": "treatment", "users": 1000, "conversions": 65}
+                ]
+            }
+        }
+        if generation_mode:
+            request_data["generation_mode"] = generation_mode
+        return request_data
+    
+    def test_split_combined_response(self):
+        """Test splitting a combined response into its three sections."""
+        from app.api.analyze import split_combined_response
+        
+        sections = split_combined_response(SINGLE_SHOT_RESPONSE)
+        assert sections["interpretation"].startswith("The treatment outperformed")
+        assert "SHIP TO ALL USERS" in sections["recommendations"]
+        assert "returning users" in sections["questions"]
+    
+    def test_split_combined_response_without_markers(self):
+        """Test that an unstructured response becomes the narrative."""
+        from app.api.analyze import split_combined_response
+        
+        sections = split_combined_response("Just a narrative.")
+        assert sections["interpretation"] == "Just a narrative."
+        assert sections["recommendations"] == ""
+        assert sections["questions"] == ""
+    
+    def test_single_shot_uses_one_llm_call(self, monkeypatch):
+        """Test that single-shot mode issues one prompt and splits the answer."""
+        from app.api import analyze
+        
+        prompts = []
+        
+        async def fake_generate_text(prompt, **kwargs):
+            prompts.append(prompt)
+            return SINGLE_SHOT_RESPONSE
+        
+        monkeypatch.setattr(analyze.llm_manager, "generate_text", fake_generate_text)
+        
+        response = client.post("/analyze/results", json=self._request_data("single_shot"))
+        assert response.status_code == 200
+        assert len(prompts) == 1
+        
+        analysis = response.json()["generative_analysis"]
+        assert analysis["interpretation_narrative"].startswith("The treatment outperformed")
+        assert [step["action"] for step in analysis["recommended_next_steps"]] == [
+            "SHIP TO ALL USERS", "MONITOR RETENTION"
+        ]
+        assert len(analysis["generated_questions"]) == 2
+    
+    def test_separate_mode_uses_three_llm_calls(self, monkeypatch):
+        """Test that separate mode keeps one prompt per section."""
+        from app.api import analyze
+        
+        prompts = []
+        
+        async def fake_generate_text(prompt, **kwargs):
+            prompts.append(prompt)
+            return "Narrative"
+        
+        monkeypatch.setattr(analyze.llm_manager, "generate_text", fake_generate_text)
+        
+        response = client.post("/analyze/results", json=self._request_data("separate"))
+        assert response.status_code == 200
+        assert len(prompts) == 3
+    
+    def test_multiple_metrics_share_one_narrative(self, monkeypatch):
+        """Test that secondary and guardrail metrics are adjusted together and summarized in one prompt."""
+        from app.api import analyze
+        
+        prompts = []
+        
+        async def fake_generate_text(prompt, **kwargs):
+            prompts.append(prompt)
+            return SINGLE_SHOT_RESPONSE
+        
+        monkeypatch.setattr(analyze.llm_manager, "generate_text", fake_generate_text)
+        
+        request_data = self._request_data("single_shot")
+        request_data["results_data"]["metrics"] = [
+            {
+                "metric_name": "add_to_cart_rate",
+                "variants": [
+                    {"name": "control", "users": 1000, "conversions": 200},
+                    {"name": "treatment", "users": 1000, "conversions": 210}
+                ]
+            },
+            {
+                "metric_name": "refund_rate",
+                "role": "guardrail",
+                "higher_is_better": False,
+                "variants": [
+                    {"name": "control", "users": 1000, "conversions": 20},
+                    {"name": "treatment", "users": 1000, "conversions": 60}
+                ]
+            }
+        ]
+        
+        response = client.post("/analyze/results", json=request_data)
+        assert response.status_code == 200
+        assert len(prompts) == 1
+        assert "add_to_cart_rate (secondary)" in prompts[0]
+        assert "GUARDRAIL VIOLATED" in prompts[0]
+        
+        family = response.json()["metric_analysis"]
+        assert [(m["metric_name"], m["role"]) for m in family] == [
+            ("conversion_rate", "primary"), ("add_to_cart_rate", "secondary"), ("refund_rate", "guardrail")
+        ]
+        assert all(m["adjusted_p_value"] >= m["p_value"] for m in family)
+        assert family[2]["guardrail_violated"] is True
+        assert family[0]["guardrail_violated"] is None
+    
+    def test_settings_default_selects_single_shot(self, monkeypatch):
+        """Test that the server setting applies when the request does not choose a mode."""
+        from app.api import analyze
+        
+        prompts = []
+        
+        async def fake_generate_text(prompt, **kwargs):
+            prompts.append(prompt)
+            return SINGLE_SHOT_RESPONSE
+        
+        monkeypatch.setattr(analyze.llm_manager, "generate_text", fake_generate_text)
+        monkeypatch.setattr(analyze.settings, "llm_single_shot", True)
+        
+        response = client.post("/analyze/results", json=self._request_data())
+        assert response.status_code == 200
+        assert len(prompts) == 1
+
+
+class TestMetricsEndpoint:
+    def test_metrics_exposes_route_and_stage_latency(self):
+        """Test that request and stage histograms are exported per route template."""
+        request_data = {
+            "context": {
+                "hypothesis": "We believe that the new checkout flow will increase conversions",
+                "primary_metric_name": "conversion_rate"
+            },
+            "results_data": {
+                "variants": [
+                    {"name": "control", "users": 1000, "conversions": 50},
+                    {"name": "treatment", "users": 1000, "conversions": 65}
+                ]
+            }
+        }
+        client.post("/analyze/results", json=request_data)
+        
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        
+        body = response.text
+        assert 'pmtools_http_request_duration_seconds_count{method="POST",route="/analyze/results",status="200"}' in body
+        assert 'pmtools_stage_duration_seconds_count{route="/analyze/results",stage="statistics"}' in body
+        assert 'pmtools_stage_duration_seconds_count{route="/analyze/results",stage="validation"}' in body
+        assert "pmtools_llm_fallback_responses_total" in body
+    
+    def test_unmatched_routes_share_one_label(self):
+        """Test that unknown paths do not create new label values."""
+        client.get("/does-not-exist/12345")
+        
+        body = client.get("/metrics").text
+        assert 'route="unmatched"' in body
+        assert "12345" not in body
+
+
+class TestServerTiming:
+    request_data = {
+        "context": {
+            "hypothesis": "We believe that the new checkout flow will increase conversions",
+            "primary_metric_name": "conversion_rate"
+        },
+        "results_data": {
+            "variants": [
+                {"name": "control", "users": 1000, "conversions": 50},
+                {"name": "treatment", "users": 1000, "conversions": 65}
+            ]
+        }
+    }
+    
+    def test_server_timing_header(self):
+        """Test that responses break down time per stage in Server-Timing."""
+        response = client.post("/analyze/results", json=self.request_data)
+        assert response.status_code == 200
+        
+        header = response.headers["server-timing"]
+        stage_names = [entry.split(";")[0].strip() for entry in header.split(",")]
+        assert stage_names[:2] == ["validation", "statistics"]
+        assert "serialization" in stage_names
+        assert stage_names[-1] == "total"
+        assert "debug" not in response.json()
+    
+    def test_debug_flag_embeds_timings(self):
+        """Test that ?debug=true embeds the same breakdown in the JSON body."""
+        response = client.post("/validate/setup?debug=true", json={
+            "hypothesis": "We believe that adding a prominent CTA button will increase conversions",
+            "metric": {"baseline_conversion_rate": 0.05},
+            "parameters": {"minimum_detectable_effect_relative": 0.20},
+            "traffic": {"estimated_daily_users": 1000}
+        }, headers={"Accept-Encoding": "identity"})
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert "inputs_summary" in data
+        stages = [stage["name"] for stage in data["debug"]["timings"]["stages"]]
+        assert stages[:3] == ["validation", "statistics", "tradeoff_matrix"]
+        assert "llm_hypothesis" in stages
+        assert int(response.headers["content-length"]) == len(response.content)
+    
+    def test_llm_stages_record_provider_and_attempts(self, monkeypatch):
+        """Test that LLM stages carry the provider used and fallback attempts."""
+        from app.api import analyze
+        from app.llm.base import LLMProvider, LLMError
+        
+        class FailingProvider(LLMProvider):
+            async def generate_text(self, prompt, **kwargs):
+                raise LLMError("quota exceeded")
+            
+            def is_available(self):
+                return True
+        
+        class WorkingProvider(LLMProvider):
+            async def generate_text(self, prompt, **kwargs):
+                return "Narrative"
+            
+            def is_available(self):
+                return True
+        
+        monkeypatch.setattr(analyze.llm_manager, "providers", {
+            "primary": FailingProvider(), "secondary": WorkingProvider()
+        })
+        monkeypatch.setattr(analyze.llm_manager, "limiters", {})
+        monkeypatch.setattr(analyze.settings, "default_llm_provider", "primary")
+        
+        response = client.post("/analyze/results?debug=true", json=self.request_data)
+        stages = {stage["name"]: stage for stage in response.json()["debug"]["timings"]["stages"]}
+        
+        interpretation = stages["llm_interpretation"]
+        assert interpretation["provider"] == "secondary"
+        assert [attempt["outcome"] for attempt in interpretation["attempts"]] == ["error", "success"]
+        assert 'llm_interpretation;dur=' in response.headers["server-timing"]
+        assert 'desc="secondary, 2 attempts"' in response.headers["server-timing"]
+
+
+class TestCompactResponses:
+    request_data = {
+        "context": {
+            "hypothesis": "New feature will improve mobile conversions",
+            "primary_metric_name": "conversion_rate"
+        },
+        "results_data": {
+            "variants": [
+                {"name": "control", "users": 2000, "conversions": 100},
+                {"name": "treatment", "users": 2000, "conversions": 130}
+            ],
+            "segments": [
+                {
+                    "segment_name": "Mobile",
+                    "variants": [
+                        {"name": "control", "users": 1200, "conversions": 48},
+                        {"name": "treatment", "users": 1200, "conversions": 72}
+                    ]
+                },
+                {
+                    "segment_name": "Desktop",
+                    "variants": [
+                        {"name": "control", "users": 800, "conversions": 52},
+                        {"name": "treatment", "users": 800, "conversions": 58}
+                    ]
+                }
+            ]
+        }
+    }
+    
+    def test_stratified_analysis_section(self):
+        """Test that segmented results include the pooled stratified analysis in both formats."""
+        full = client.post("/analyze/results", json=self.request_data).json()
+        compact = client.post("/analyze/results?response_format=compact", json=self.request_data).json()
+        
+        stratified = full["stratified_analysis"]
+        assert stratified["strata"] == 2
+        assert stratified["pooled_odds_ratio"] > 1
+        assert stratified["absolute_lift_ci"]["lower"] < stratified["pooled_absolute_lift"]
+        assert "breslow_day_p_value" in stratified
+        assert compact["stratified_analysis"] == stratified
+    
+    def test_bootstrap_intervals_on_request(self):
+        """Test that bootstrap lift intervals are added to every summary only when requested."""
+        plain = client.post("/analyze/results", json=self.request_data).json()
+        assert plain["statistical_summary"]["bootstrap"] is None
+        
+        request_data = dict(self.request_data, bootstrap_interval="bca")
+        full = client.post("/analyze/results", json=request_data).json()
+        compact = client.post("/analyze/results?response_format=compact", json=request_data).json()
+        
+        bootstrap = full["statistical_summary"]["bootstrap"]
+        assert bootstrap["method"] == "bca"
+        assert bootstrap["relative_lift_ci"]["lower"] < full["statistical_summary"]["relative_lift"]
+        assert bootstrap["relative_lift_ci"]["upper"] > full["statistical_summary"]["relative_lift"]
+        assert all(seg["metrics"]["bootstrap"] is not None for seg in full["segment_analysis"])
+        # Seeded, so both requests resample identically
+        assert compact["segment_analysis"][0]["bootstrap"] == full["segment_analysis"][0]["metrics"]["bootstrap"]
+    
+    def test_segment_tree_scan(self):
+        """Test that segments with hierarchy paths get a segment tree scan."""
+        request_data = {
+            "context": dict(self.request_data["context"]),
+            "results_data": {
+                "variants": self.request_data["results_data"]["variants"],
+                "segments": [
+                    {
+                        "segment_name": f"{region}/{platform}",
+                        "path": [region, platform],
+                        "variants": [
+                            {"name": "control", "users": 5000, "conversions": 500},
+                            {"name": "treatment", "users": 5000, "conversions": 300 if region == "APAC" else 560}
+                        ]
+                    }
+                    for region in ("EU", "US", "APAC")
+                    for platform in ("iOS", "Android")
+                ]
+            }
+        }
+        
+        data = client.post("/analyze/results", json=request_data).json()
+        
+        scan = data["segment_tree"]
+        assert scan["leaves"] == 6
+        assert scan["divergent_segments"][0]["path"] == ["APAC"]
+        assert client.post("/analyze/results", json=self.request_data).json()["segment_tree"] is None
+    
+    def test_compact_lists_explanations_once(self):
+        """Test that compact responses carry explanations only at the top level."""
+        full = client.post("/analyze/results", json=self.request_data).json()
+        response = client.post("/analyze/results?response_format=compact", json=self.request_data)
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["explanations"] == full["statistical_summary"]["explanations"]
+        assert "explanations" not in data["statistical_summary"]
+        assert data["statistical_summary"]["p_value"] == full["statistical_summary"]["p_value"]
+        
+        mobile = data["segment_analysis"][0]
+        assert mobile["segment_name"] == "Mobile"
+        assert "explanations" not in mobile
+        assert mobile["ci_lower"] == full["segment_analysis"][0]["metrics"]["confidence_interval"]["lower"]
+        assert len(response.content) < len(client.post("/analyze/results", json=self.request_data).content)
+    
+    def test_explanations_can_be_omitted(self):
+        """Test that explanations are dropped when not requested."""
+        compact = client.post(
+            "/analyze/results?response_format=compact&include_explanations=false", json=self.request_data
+        ).json()
+        assert compact["explanations"] is None
+        
+        full = client.post("/analyze/results?include_explanations=false", json=self.request_data).json()
+        assert full["statistical_summary"]["explanations"] is None
+        assert all(seg["metrics"]["explanations"] is None for seg in full["segment_analysis"])
+    
+    def test_default_response_is_unchanged(self):
+        """Test that the full format still repeats explanations per summary."""
+        data = client.post("/analyze/results", json=self.request_data).json()
+        assert data["statistical_summary"]["explanations"]["p_value"]
+        assert all(seg["metrics"]["explanations"] for seg in data["segment_analysis"])
+
+
+class TestFastSerialization:
+    def test_payload_matches_response_models(self):
+        """Test that payload dicts validate against the documented response models."""
+        from app.api.analyze import build_results_response
+        from app.models.requests import ResponseFormat
+        from app.models.responses import (
+            AnalyzeResultsResponse,
+            CompactAnalyzeResultsResponse,
+            GenerativeAnalysisModel
+        )
+        from app.statistics.calculations import calculate_conversion_metrics, analyze_segments
+        
+        from app.statistics.stratified import stratified_analysis
+        
+        metrics = calculate_conversion_metrics(2000, 100, 2000, 130)
+        segments = TestCompactResponses.request_data["results_data"]["segments"]
+        segment_results = analyze_segments(segments)
+        stratified_results = stratified_analysis(segments)
+        generative_analysis = GenerativeAnalysisModel(
+            interpretation_narrative="Narrative",
+            recommended_next_steps=[],
+            generated_questions=[]
+        )
+        
+        full = build_results_response(
+            metrics, segment_results, generative_analysis, stratified_results=stratified_results
+        )
+        assert AnalyzeResultsResponse(**full).model_dump() == full
+        
+        compact = build_results_response(
+            metrics, segment_results, generative_analysis, response_format=ResponseFormat.COMPACT,
+            stratified_results=stratified_results
+        )
+        assert CompactAnalyzeResultsResponse(**compact).model_dump() == compact
+    
+    def test_statistics_use_native_types(self):
+        """Test that calculated metrics contain plain Python values rather than numpy scalars."""
+        from app.statistics.calculations import calculate_conversion_metrics
+        
+        metrics = calculate_conversion_metrics(2000, 100, 2000, 130)
+        assert type(metrics["is_significant"]) is bool
+        assert type(metrics["p_value"]) is float
+    
+    def test_response_is_json(self):
+        """Test that the orjson response is served as JSON."""
+        response = client.post("/analyze/results", json=TestCompactResponses.request_data)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert response.json()["segment_analysis"][1]["segment_name"] == "Desktop"
+
+
+class TestResponseEncoding:
+    def test_large_responses_are_compressed(self):
+        """Test that large responses use the negotiated content encoding."""
+        import json
+        pytest.importorskip("brotli")
+        zstandard = pytest.importorskip("zstandard")
+        
+        for encoding in ["gzip", "br", "zstd"]:
+            response = client.post(
+                "/analyze/results",
+                json=TestCompactResponses.request_data,
+                headers={"Accept-Encoding": encoding}
+            )
+            assert response.status_code == 200
+            assert response.headers["content-encoding"] == encoding
+            assert "Accept-Encoding" in response.headers["vary"]
+            
+            # The test client decodes gzip and br itself, but not zstd
+            body = response.content
+            if encoding == "zstd":
+                body = zstandard.ZstdDecompressor().decompress(body)
+            assert json.loads(body)["segment_analysis"][0]["segment_name"] == "Mobile"
+    
+    def test_small_responses_are_not_compressed(self):
+        """Test that responses below the size threshold are sent as-is."""
+        response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+    
+    def test_negotiate_encoding(self):
+        """Test Accept-Encoding negotiation against the server preference order."""
+        from app.core.compression import negotiate_encoding
+        
+        preferences = ["zstd", "br", "gzip"]
+        assert negotiate_encoding("gzip, br", preferences) == "br"
+        assert negotiate_encoding("gzip;q=1.0, br;q=0.5", preferences) == "gzip"
+        assert negotiate_encoding("*", preferences) == "zstd"
+        assert negotiate_encoding("identity", preferences) is None
+        assert negotiate_encoding("*, zstd;q=0", preferences) == "br"
+    
+    def test_msgpack_response(self):
+        """Test that MessagePack responses carry the same document as JSON."""
+        msgpack = pytest.importorskip("msgpack")
+        
+        response = client.post(
+            "/analyze/results",
+            json=TestCompactResponses.request_data,
+            headers={"Accept": "application/msgpack"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/msgpack"
+        
+        data = msgpack.unpackb(response.content)
+        full = client.post("/analyze/results", json=TestCompactResponses.request_data).json()
+        assert data["statistical_summary"] == full["statistical_summary"]
+        assert data["segment_analysis"] == full["segment_analysis"]
+    
+    def test_arrow_response(self):
+        """Test that Arrow responses carry one row per segment."""
+        import json
+        pyarrow = pytest.importorskip("pyarrow")
+        import pyarrow.ipc
+        
+        response = client.post(
+            "/analyze/results?response_format=compact",
+            json=TestCompactResponses.request_data,
+            headers={"Accept": "application/vnd.apache.arrow.stream"}
+        )
+        assert response.status_code == 200
+        
+        table = pyarrow.ipc.open_stream(response.content).read_all()
+        assert table.column("segment_name").to_pylist() == ["Mobile", "Desktop"]
+        assert "ci_lower" in table.column_names
+        summary = json.loads(table.schema.metadata[b"statistical_summary"])
+        assert "p_value" in summary
+    
+    def test_unsupported_accept_falls_back_to_json(self):
+        """Test that clients which do not negotiate still receive JSON."""
+        response = client.post(
+            "/analyze/results",
+            json=TestCompactResponses.request_data,
+            headers={"Accept": "text/html, */*;q=0.1"}
+        )
+        assert response.headers["content-type"] == "application/json"
+
+
+class TestProfiling:
+    def make_client(self, tmp_path, sample_rate=0.0):
+        from app.core.profiling import ProfileStore, ProfilingMiddleware, StackSampler
+        
+        store = ProfileStore(str(tmp_path), max_profiles=2)
+        profiled_app = ProfilingMiddleware(
+            app, store=store, sampler=StackSampler(interval=0.001), sample_rate=sample_rate,
+            admin_token="secret"
+        )
+        return TestClient(profiled_app), store
+    
+    def test_header_triggers_profile(self, tmp_path):
+        """Test that requests with the profiling header are profiled and saved as folded stacks."""
+        profiled_client, store = self.make_client(tmp_path)
+        
+        response = profiled_client.post(
+            "/analyze/results",
+            json=TestCompactResponses.request_data,
+            headers={"X-Profile": "true", "X-Admin-Token": "secret"}
+        )
+        assert response.status_code == 200
+        
+        profile_id = response.headers["x-profile-id"]
+        [metadata] = store.list()
+        assert metadata["profile_id"] == profile_id
+        assert metadata["path"] == "/analyze/results"
+        assert metadata["status_code"] == 200
+        
+        for line in store.get_folded(profile_id).splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert int(count) > 0
+            assert ";" in stack
+    
+    def test_header_requires_admin_token(self, tmp_path):
+        """Test that the profiling header is ignored without a valid admin token."""
+        profiled_client, store = self.make_client(tmp_path)
+        
+        for headers in ({"X-Profile": "true"}, {"X-Profile": "true", "X-Admin-Token": "wrong"}):
+            assert "x-profile-id" not in profiled_client.get("/health", headers=headers).headers
+        assert store.list() == []
+    
+    def test_unsampled_requests_are_not_profiled(self, tmp_path):
+        """Test that requests are not profiled without the header when the sample rate is zero."""
+        profiled_client, store = self.make_client(tmp_path)
+        
+        response = profiled_client.get("/health")
+        assert "x-profile-id" not in response.headers
+        assert store.list() == []
+    
+    def test_old_profiles_are_pruned(self, tmp_path):
+        """Test that only the newest profiles are kept."""
+        profiled_client, store = self.make_client(tmp_path, sample_rate=1.0)
+        
+        for _ in range(3):
+            profiled_client.get("/health")
+        assert len(store.list()) == 2
+    
+    def test_admin_endpoints(self, tmp_path, monkeypatch):
+        """Test listing and downloading profiles, and the admin token check."""
+        from fastapi import FastAPI
+        import app.api.admin as admin
+        
+        profiled_client, store = self.make_client(tmp_path, sample_rate=1.0)
+        monkeypatch.setattr(admin, "profile_store", store)
+        profile_id = profiled_client.get("/health").headers["x-profile-id"]
+        
+        admin_app = FastAPI()
+        admin_app.include_router(admin.router)
+        admin_client = TestClient(admin_app)
+        
+        # Fails closed while no admin token is configured
+        monkeypatch.setattr(admin.settings, "admin_token", None)
+        assert admin_client.get("/admin/profiles").status_code == 404
+        assert admin_client.get(f"/admin/profiles/{profile_id}").status_code == 404
+        
+        monkeypatch.setattr(admin.settings, "admin_token", "secret")
+        assert admin_client.get("/admin/profiles").status_code == 403
+        assert admin_client.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+        
+        headers = {"X-Admin-Token": "secret"}
+        listing = admin_client.get("/admin/profiles", headers=headers).json()
+        assert listing["profiles"][0]["profile_id"] == profile_id
+        folded = admin_client.get(f"/admin/profiles/{profile_id}", headers=headers)
+        assert folded.headers["content-type"].startswith("text/plain")
+        assert admin_client.get("/admin/profiles/../../etc/passwd", headers=headers).status_code == 404
+    
+    def test_admin_routes_not_mounted_without_token(self):
+        """Test that the application does not serve /admin when no admin token is configured."""
+        assert client.get("/admin/profiles").status_code == 404
+
+
+class TestAccessLog:
+    def test_one_record_per_request(self, caplog):
+        """Test that each request emits a single access record with timings and attribution."""
+        import logging
+        
+        with caplog.at_level(logging.INFO, logger="pmtools.access"):
+            response = client.post(
+                "/analyze/results",
+                json=TestCompactResponses.request_data,
+                headers={"Accept-Encoding": "gzip"}
+            )
+        assert response.status_code == 200
+        
+        [record] = [r for r in caplog.records if r.name == "pmtools.access"]
+        assert record.route == "/analyze/results"
+        assert record.status == 200
+        assert record.duration_ms > 0
+        assert record.request_bytes > 0
+        assert record.response_bytes == int(response.headers["content-length"])
+        assert record.response_encoding == "gzip"
+        assert {"validation", "statistics", "segments", "total"} <= set(record.stages)
+        assert isinstance(record.provider_fallbacks, int)
+        assert isinstance(record.cache_hits, int)
+    
+    def test_fallback_responses_are_attributed(self, caplog, monkeypatch):
+        """Test that sections served with fallback content appear in the access record."""
+        import logging
+        from app.llm.manager import llm_manager
+        
+        async def failing_generate_text(*args, **kwargs):
+            raise RuntimeError("provider down")
+        
+        monkeypatch.setattr(llm_manager, "generate_text", failing_generate_text)
+        with caplog.at_level(logging.INFO, logger="pmtools.access"):
+            client.post("/analyze/results", json=TestCompactResponses.request_data)
+        
+        [record] = [r for r in caplog.records if r.name == "pmtools.access"]
+        assert record.fallback_responses == ["generative_analysis"]
+    
+    def test_json_formatter_includes_extra_fields(self):
+        """Test that the JSON formatter emits extra fields and exceptions."""
+        import json
+        import logging
+        import sys
+        from app.core.structured_logging import JSONFormatter
+        
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = logging.LogRecord("test", logging.ERROR, __file__, 1, "failed %s", ("job",), sys.exc_info())
+        record.route = "/analyze/results"
+        
+        entry = json.loads(JSONFormatter().format(record))
+        assert entry["message"] == "failed job"
+        assert entry["level"] == "error"
+        assert entry["route"] == "/analyze/results"
+        assert "ValueError: boom" in entry["exception"]
+
+
+class TestTracing:
+    @pytest.fixture(autouse=True)
+    def require_sdk(self):
+        pytest.importorskip("opentelemetry.sdk")
+    
+    @pytest.fixture
+    def exporter(self):
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+        from app.core import tracing
+        
+        exporter = InMemorySpanExporter()
+        tracing.configure_tracing(tracing_settings(), exporter=exporter)
+        yield exporter
+        tracing.shutdown_tracing()
+    
+    def test_request_stage_and_llm_spans(self, exporter, monkeypatch):
+        """Test the span tree for a request with an LLM fallback."""
+        from app.api import analyze
+        from app.llm.base import LLMProvider, LLMError
+        
+        class FailingProvider(LLMProvider):
+            model_name = "primary-model"
+            
+            async def generate_text(self, prompt, **kwargs):
+                raise LLMError("quota exceeded")
+            
+            def is_available(self):
+                return True
+        
+        class WorkingProvider(LLMProvider):
+            model_name = "secondary-model"
+            
+            async def generate_text(self, prompt, **kwargs):
+                return "Narrative"
+            
+            def is_available(self):
+                return True
+        
+        monkeypatch.setattr(analyze.llm_manager, "providers", {
+            "primary": FailingProvider(), "secondary": WorkingProvider()
+        })
+        monkeypatch.setattr(analyze.llm_manager, "limiters", {})
+        monkeypatch.setattr(analyze.settings, "default_llm_provider", "primary")
+        monkeypatch.setattr(analyze.settings, "llm_coalesce_enabled", False)
+        
+        traceparent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+        response = client.post(
+            "/analyze/results", json=TestCompactResponses.request_data, headers={"traceparent": traceparent}
+        )
+        assert response.status_code == 200
+        
+        spans = exporter.get_finished_spans()
+        by_name = {}
+        for span in spans:
+            by_name.setdefault(span.name, []).append(span)
+        
+        [server] = by_name["POST /analyze/results"]
+        assert server.attributes["http.route"] == "/analyze/results"
+        assert server.attributes["http.response.status_code"] == 200
+        assert format(server.context.trace_id, "032x") == "0af7651916cd43dd8448eb211c80319c"
+        assert all(span.context.trace_id == server.context.trace_id for span in spans)
+        
+        assert "stage.statistics" in by_name
+        [segments] = by_name["statistics.analyze_segments"]
+        assert segments.parent.span_id == by_name["stage.segments"][0].context.span_id
+        
+        attempts = [span for span in by_name["llm.generate_text"] if span.attributes["pmtools.llm.attempt"] == 2]
+        assert attempts
+        assert attempts[0].attributes["gen_ai.system"] == "secondary"
+        assert attempts[0].attributes["gen_ai.request.model"] == "secondary-model"
+        assert attempts[0].attributes["pmtools.llm.fallback_reason"] == "LLMError"
+        failed = [span for span in by_name["llm.generate_text"] if span.attributes["pmtools.llm.outcome"] == "error"]
+        assert failed[0].status.status_code.name == "ERROR"
+    
+    def test_file_exporter_writes_json_lines(self, tmp_path):
+        """Test that the file exporter writes spans offline, one JSON object per line."""
+        import json
+        from app.core import tracing
+        
+        path = tmp_path / "traces.jsonl"
+        settings = tracing_settings(tracing_exporter="file", tracing_file_path=str(path))
+        exporter = tracing.create_exporter(settings)
+        tracing.configure_tracing(settings, exporter=exporter)
+        try:
+            client.get("/health")
+        finally:
+            tracing.shutdown_tracing()
+        
+        # Shutting down tracing closes the trace file
+        assert exporter._file.closed
+        [span] = [json.loads(line) for line in path.read_text().splitlines()]
+        assert span["name"] == "GET /health"
+        assert span["resource"]["attributes"]["service.name"] == "pmtools-api"
+
+
+def tracing_settings(**overrides):
+    from app.core.config import Settings
+    
+    return Settings(tracing_enabled=True, **overrides)
+
+
+class TestReadiness:
+    def test_ready_after_warmup(self):
+        """Test that /ready turns 200 once the startup warm-up has finished."""
+        import time
+        
+        with TestClient(app) as started_client:
+            assert started_client.get("/health").status_code == 200
+            
+            deadline = time.monotonic() + 30
+            response = started_client.get("/ready")
+            while response.status_code == 503 and time.monotonic() < deadline:
+                time.sleep(0.05)
+                response = started_client.get("/ready")
+            
+            assert response.status_code == 200
+            data = response.json()
+            assert data["status"] == "ready"
+            assert [step["name"] for step in data["warmup"]["steps"]] == ["statistics", "encoding"]
+            assert all(step["ok"] for step in data["warmup"]["steps"])
+    
+    def test_not_ready_before_startup(self):
+        """Test that /ready reports 503 while the warm-up has not completed."""
+        from app.core.warmup import Warmup
+        import app.main as main
+        
+        original = main.warmup
+        main.warmup = Warmup()
+        try:
+            response = client.get("/ready")
+        finally:
+            main.warmup = original
+        assert response.status_code == 503
+        assert response.json()["warmup"]["status"] == "pending"
+    
+    async def test_llm_warmup_failure_does_not_block_readiness(self):
+        """Test that failing provider warm-up is recorded but still reports ready."""
+        from app.core.config import Settings
+        from app.core.warmup import Warmup
+        
+        class FailingManager:
+            async def warm_up(self):
+                raise RuntimeError("connection refused")
+        
+        warmup = Warmup()
+        await warmup.run(Settings(warmup_llm_connections=True), FailingManager())
+        
+        assert warmup.is_ready
+        assert warmup.steps[-1]["name"] == "llm_connections"
+        assert warmup.steps[-1]["ok"] is False
+    
+    async def test_failed_or_timed_out_warmup_still_reports_ready(self, monkeypatch):
+        """Test that a failing or slow warm-up step is recorded but does not keep the worker unready."""
+        import asyncio
+        from app.core import warmup as warmup_module
+        from app.core.config import Settings
+        
+        def failing_statistics():
+            raise RuntimeError("scipy import failed")
+        
+        class SlowManager:
+            async def warm_up(self):
+                await asyncio.sleep(10)
+        
+        monkeypatch.setattr(warmup_module, "warm_statistics", failing_statistics)
+        warmup = warmup_module.Warmup()
+        await warmup.run(Settings(warmup_llm_connections=True, warmup_timeout_seconds=0.05), SlowManager())
+        
+        assert warmup.is_ready
+        state = warmup.get_state()
+        assert state["degraded"]
+        steps = {step["name"]: step for step in state["steps"]}
+        assert steps["statistics"]["error"] == "scipy import failed"
+        assert steps["encoding"]["ok"]
+        assert steps["llm_connections"]["error"].startswith("Timed out")
+    
+    async def test_cancelled_warmup_reports_ready(self):
+        """Test that cancelling the warm-up still leaves the worker ready, with the step recorded."""
+        import asyncio
+        from app.core.config import Settings
+        from app.core.warmup import Warmup
+        
+        class SlowManager:
+            async def warm_up(self):
+                await asyncio.sleep(10)
+        
+        warmup = Warmup()
+        task = asyncio.create_task(warmup.run(Settings(warmup_llm_connections=True), SlowManager()))
+        while not warmup.steps or warmup.steps[-1]["name"] != "encoding":
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        
+        assert warmup.is_ready
+        assert warmup.get_state()["steps"][-1] == {**warmup.steps[-1], "ok": False, "error": "Cancelled"}
+
+
+class TestMetaAnalysisEndpoint:
+    def test_pools_experiments_per_group(self):
+        """Test pooling experiment summaries per group, with standard errors from intervals or given."""
+        from app.statistics.calculations import calculate_conversion_metrics
+        
+        summary = calculate_conversion_metrics(2000, 100, 2000, 130)
+        request_data = {
+            "experiments": [
+                {"experiment_name": "checkout DE", "group": "checkout", **summary},
+                {"experiment_name": "checkout FR", "group": "checkout", "absolute_lift": 0.01, "standard_error": 0.006},
+                {"experiment_name": "checkout UK", "group": "checkout", "absolute_lift": -0.002, "standard_error": 0.005},
+                {"experiment_name": "search DE", "group": "search", "absolute_lift": 0.004, "standard_error": 0.003}
+            ]
+        }
+        
+        response = client.post("/analyze/meta", json=request_data)
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert [group["group"] for group in data["pooled"]] == ["checkout", "search"]
+        checkout = data["pooled"][0]
+        assert checkout["experiments"] == 3
+        assert checkout["random_effects"]["standard_error"] >= checkout["fixed_effect"]["standard_error"]
+        assert checkout["prediction_interval"]["lower"] is not None
+        assert data["pooled"][1]["cochran_q_p_value"] is None
+        
+        # The Wald interval's half-width recovers the standard error
+        expected_se = (summary["confidence_interval"]["upper"] - summary["confidence_interval"]["lower"]) / (2 * 1.959964)
+        assert data["experiments"][0]["standard_error"] == pytest.approx(expected_se, abs=1e-6)
+        assert sum(e["fixed_weight"] for e in data["experiments"][:3]) == pytest.approx(1.0)
+    
+    def test_rejects_asymmetric_interval_without_standard_error(self):
+        """Test that small-count summaries with Newcombe intervals need an explicit standard error."""
+        from app.statistics.calculations import calculate_conversion_metrics
+        
+        summary = calculate_conversion_metrics(40, 1, 40, 4)
+        assert summary["ci_method"] == "newcombe"
+        other = {"experiment_name": "b", "absolute_lift": 0.02, "standard_error": 0.01}
+        
+        response = client.post("/analyze/meta", json={"experiments": [{"experiment_name": "a", **summary}, other]})
+        assert response.status_code == 422
+        assert "standard_error" in str(response.json()["detail"])
+        
+        with_se = {"experiment_name": "a", **summary, "standard_error": 0.05}
+        response = client.post("/analyze/meta", json={"experiments": [with_se, other]})
+        assert response.status_code == 200
+        assert response.json()["experiments"][0]["standard_error"] == 0.05
+    
+    def test_requires_interval_or_standard_error(self):
+        """Test validation when an experiment has neither an interval nor a standard error."""
+        request_data = {
+            "experiments": [
+                {"experiment_name": "a", "absolute_lift": 0.01},
+                {"experiment_name": "b", "absolute_lift": 0.02, "standard_error": 0.01}
+            ]
+        }
+        
+        response = client.post("/analyze/meta", json=request_data)
+        assert response.status_code == 422
@@ -0,0 +1,240 @@
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.jobs.store import InMemoryJobStore, SQLiteJobStore, JobStatus
+
+
+REQUEST_DATA = {
+    "context": {
+        "hypothesis": "We believe that the new checkout flow will increase conversions",
+        "primary_metric_name": "conversion_rate"
+    },
+    "results_data": {
+        "variants": [
+            {"name": "control", "users": 1000, "conversions": 50},
+            {"name": "treatment", "users": 1000, "conversions": 65}
+        ],
+        "segments": [
+            {
+                "segment_name": "Mobile",
+                "variants": [
+                    {"name": "control", "users": 600, "conversions": 30},
+                    {"name": "treatment", "users": 600, "conversions": 42}
+                ]
+            }
+        ]
+    }
+}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteJobStore(str(tmp_path / "jobs.sqlite3"), ttl_seconds=60)
+    return InMemoryJobStore(ttl_seconds=60)
+
+
+class TestJobStore:
+    def test_create_and_update(self, store):
+        """Test the job lifecycle in each store backend."""
+        record = store.create("job-1", partial_result={"statistical_summary": {"p_value": 0.1}})
+        assert record["status"] == JobStatus.PENDING
+        
+        store.update("job-1", JobStatus.COMPLETED, result={"answer": 42})
+        record = store.get("job-1")
+        assert record["status"] == JobStatus.COMPLETED
+        assert record["result"] == {"answer": 42}
+        assert record["partial_result"] == {"statistical_summary": {"p_value": 0.1}}
+    
+    def test_missing_job(self, store):
+        """Test that unknown jobs return None."""
+        assert store.get("unknown") is None
+    
+    def test_ttl_eviction(self, store):
+        """Test that jobs expire after the TTL."""
+        store.create("job-1")
+        store.ttl_seconds = 0
+        time.sleep(0.01)
+        
+        assert store.get("job-1") is None
+        
+        store.ttl_seconds = 60
+        store.create("job-2")
+        store.ttl_seconds = 0
+        time.sleep(0.01)
+        assert store.evict_expired() >= 1
+        assert store.evict_expired() == 0
+
+
+class TestAnalysisJobEndpoints:
+    def test_submit_returns_statistics_immediately(self):
+        """Test that submission returns a job ID and the statistical summary."""
+        with TestClient(app) as job_client:
+            response = job_client.post("/analyze/results/jobs", json=REQUEST_DATA)
+            assert response.status_code == 202
+            
+            data = response.json()
+            assert data["job_id"]
+            assert data["status"] in (JobStatus.PENDING, JobStatus.RUNNING, JobStatus.COMPLETED)
+            assert data["statistical_summary"]["control_conversion_rate"] == 0.05
+            assert data["segment_analysis"][0]["segment_name"] == "Mobile"
+    
+    def test_poll_until_completed(self, monkeypatch):
+        """Test polling a job through to its completed result."""
+        from app.api import analyze
+        
+        async def fake_generate_text(prompt, **kwargs):
+            return "Narrative"
+        
+        monkeypatch.setattr(analyze.llm_manager, "generate_text", fake_generate_text)
+        
+        with TestClient(app) as job_client:
+            job_id = job_client.post("/analyze/results/jobs", json=REQUEST_DATA).json()["job_id"]
+            
+            for _ in range(100):
+                data = job_client.get(f"/analyze/results/jobs/{job_id}").json()
+                if data["status"] == JobStatus.COMPLETED:
+                    break
+                time.sleep(0.01)
+            
+            assert data["status"] == JobStatus.COMPLETED
+            assert data["result"]["generative_analysis"]["interpretation_narrative"] == "Narrative"
+            assert data["result"]["statistical_summary"] == data["statistical_summary"]
+    
+    def test_unknown_job_returns_404(self):
+        """Test polling a job that does not exist."""
+        with TestClient(app) as job_client:
+            response = job_client.get("/analyze/results/jobs/does-not-exist")
+            assert response.status_code == 404
+    
+    def test_full_queue_returns_503(self, monkeypatch):
+        """Test that submissions beyond the pending limit are rejected."""
+        from app.jobs.runner import job_runner
+        
+        with TestClient(app) as job_client:
+            monkeypatch.setattr(job_runner._queue, "full", lambda: True)
+            response = job_client.post("/analyze/results/jobs", json=REQUEST_DATA)
+            assert response.status_code == 503
+
+
+class TestJobRunner:
+    def test_store_calls_run_off_the_event_loop(self, tmp_path):
+        """Test that the runner never calls the (possibly blocking) store on the event loop thread."""
+        import asyncio
+        import threading
+        from app.jobs.runner import JobRunner
+        
+        class RecordingStore(SQLiteJobStore):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.threads = set()
+            
+            def create(self, *args, **kwargs):
+                self.threads.add(threading.get_ident())
+                return super().create(*args, **kwargs)
+            
+            def update(self, *args, **kwargs):
+                self.threads.add(threading.get_ident())
+                return super().update(*args, **kwargs)
+            
+            def get(self, *args, **kwargs):
+                self.threads.add(threading.get_ident())
+                return super().get(*args, **kwargs)
+        
+        store = RecordingStore(str(tmp_path / "jobs.sqlite3"), ttl_seconds=60)
+        runner = JobRunner(store, workers=1, max_pending=10)
+        
+        async def job():
+            return {"answer": 42}
+        
+        async def run():
+            await runner.start()
+            record = await runner.submit(job)
+            for _ in range(100):
+                result = await runner.get(record["job_id"])
+                if result["status"] == JobStatus.COMPLETED:
+                    break
+                await asyncio.sleep(0.01)
+            await runner.stop()
+            return result
+        
+        loop_thread = threading.get_ident()
+        result = asyncio.run(run())
+        assert result["result"] == {"answer": 42}
+        assert store.threads and loop_thread not in store.threads
+
+
+class TestClientPolling:
+    """The GUI client polling a job through two API worker processes behind a round-robin balancer."""
+    
+    def poll_through_two_workers(self, monkeypatch, stores):
+        import requests
+        from fastapi import FastAPI
+        from app.api import analyze
+        from app.jobs.runner import JobRunner
+        
+        api_client = pytest.importorskip("streamlit_app.components.api_client")
+        
+        async def fake_generate_text(prompt, **kwargs):
+            return "Narrative"
+        
+        monkeypatch.setattr(analyze.llm_manager, "generate_text", fake_generate_text)
+        runners = [JobRunner(store, workers=1, max_pending=10) for store in stores]
+        
+        class RoundRobinAdapter(requests.adapters.BaseAdapter):
+            """Sends each request to the next worker, each with its own job runner and store."""
+            
+            def __init__(self, workers):
+                super().__init__()
+                self.workers = workers
+                self.calls = 0
+            
+            def send(self, request, **kwargs):
+                index = self.calls % len(self.workers)
+                self.calls += 1
+                monkeypatch.setattr(analyze, "job_runner", runners[index])
+                reply = self.workers[index].request(
+                    request.method, request.path_url, content=request.body, headers=dict(request.headers)
+                )
+                response = requests.Response()
+                response.status_code = reply.status_code
+                response.headers.update(reply.headers)
+                response._content = reply.content
+                response.request = request
+                response.url = request.url
+                return response
+            
+            def close(self):
+                pass
+        
+        # One app per worker, without the main app's lifespan managing the global runner
+        worker_apps = [FastAPI(), FastAPI()]
+        for worker_app in worker_apps:
+            worker_app.include_router(analyze.router)
+        
+        with TestClient(worker_apps[0]) as first, TestClient(worker_apps[1]) as second:
+            first.portal.call(runners[0].start)
+            second.portal.call(runners[1].start)
+            try:
+                client = api_client.APIClient(base_url="http://api")
+                client.session.mount("http://api", RoundRobinAdapter([first, second]))
+                return client.analyze_results_in_background(REQUEST_DATA, poll_interval=0.01, max_wait=10)
+            finally:
+                first.portal.call(runners[0].stop)
+                second.portal.call(runners[1].stop)
+    
+    def test_shared_store(self, monkeypatch, tmp_path):
+        """Test that with the SQLite store either worker answers the poll."""
+        path = str(tmp_path / "jobs.sqlite3")
+        stores = [SQLiteJobStore(path, ttl_seconds=60), SQLiteJobStore(path, ttl_seconds=60)]
+        
+        result = self.poll_through_two_workers(monkeypatch, stores)
+        assert result["generative_analysis"]["interpretation_narrative"] == "Narrative"
+    
+    def test_per_worker_store(self, monkeypatch):
+        """Test that the client retries polls answered by a worker that does not know the job."""
+        stores = [InMemoryJobStore(ttl_seconds=60), InMemoryJobStore(ttl_seconds=60)]
+        
+        result = self.poll_through_two_workers(monkeypatch, stores)
+        assert result["generative_analysis"]["interpretation_narrative"] == "Narrative"
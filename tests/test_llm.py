@@ -0,0 +1,305 @@
+import asyncio
+import pytest
+from app.llm.base import LLMProvider, LLMError, LLMRateLimitError
+from app.llm.manager import LLMManager
+from app.llm.ratelimit import TokenBucket, FileTokenBucket, ProviderLimiter
+from app.llm.budget import (
+    estimate_tokens,
+    rank_segments,
+    build_segment_context,
+    fit_prompt
+)
+
+
+def make_segment(name, relative_lift, z_score, is_significant):
+    return {
+        "segment_name": name,
+        "metrics": {
+            "control_conversion_rate": 0.05,
+            "treatment_conversion_rate": 0.05 * (1 + relative_lift),
+            "relative_lift": relative_lift,
+            "z_score": z_score,
+            "p_value": 0.01 if is_significant else 0.5,
+            "is_significant": is_significant
+        }
+    }
+
+
+class TestPromptBudget:
+    def test_estimate_tokens(self):
+        """Test the character-based token estimate."""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("abcd") == 1
+        assert estimate_tokens("abcde") == 2
+    
+    def test_rank_segments_prefers_significant_and_large_effects(self):
+        """Test that segments are ranked by significance, then effect size."""
+        segments = [
+            make_segment("Small", 0.01, 0.3, False),
+            make_segment("Significant", 0.10, 2.5, True),
+            make_segment("Large but noisy", 0.40, 1.5, False),
+            make_segment("Very significant", 0.20, 4.0, True)
+        ]
+        
+        ranked = [seg["segment_name"] for seg in rank_segments(segments)]
+        assert ranked == ["Very significant", "Significant", "Large but noisy", "Small"]
+    
+    def test_segment_context_respects_max_segments(self):
+        """Test that only the top-K segments are included."""
+        segments = [make_segment(f"Segment {i}", 0.01 * i, 0.1 * i, False) for i in range(20)]
+        
+        context = build_segment_context(segments, token_budget=10000, max_segments=3)
+        assert "Segment 19" in context
+        assert "Segment 16" not in context
+        assert "(17 lower-ranked segments omitted)" in context
+    
+    def test_segment_context_respects_token_budget(self):
+        """Test that segment context stays within the token budget."""
+        segments = [make_segment(f"Segment {i}", 0.01 * i, 0.1 * i, False) for i in range(1000)]
+        
+        context = build_segment_context(segments, token_budget=200, max_segments=1000)
+        assert 0 < estimate_tokens(context) <= 200 + estimate_tokens("(999 lower-ranked segments omitted)")
+    
+    def test_segment_context_empty_when_nothing_fits(self):
+        """Test that no section is emitted without budget."""
+        segments = [make_segment("Mobile", 0.1, 2.0, True)]
+        assert build_segment_context(segments, token_budget=0, max_segments=5) == ""
+        assert build_segment_context(None, token_budget=500, max_segments=5) == ""
+    
+    def test_fit_prompt_bounds_prompt_size(self):
+        """Test that prompt size is bounded regardless of segment count."""
+        def build(segment_context):
+            return f"Base prompt\n{segment_context}"
+        
+        small = [make_segment(f"Segment {i}", 0.01, 0.5, False) for i in range(10)]
+        large = [make_segment(f"Segment {i}", 0.01, 0.5, False) for i in range(10000)]
+        
+        small_prompt = fit_prompt(build, small, max_input_tokens=300, max_segments=50)
+        large_prompt = fit_prompt(build, large, max_input_tokens=300, max_segments=50)
+        
+        assert "Segment 0" in small_prompt
+        assert estimate_tokens(large_prompt) <= 320
+        assert fit_prompt(build, None, max_input_tokens=300) == "Base prompt\n"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class StaticProvider(LLMProvider):
+    """Test provider returning a fixed response after an optional delay."""
+    
+    def __init__(self, response="ok", delay=0.0, error=None):
+        self.response = response
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+    
+    async def generate_text(self, prompt, **kwargs):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.error:
+                raise self.error
+            return self.response
+        finally:
+            self.active -= 1
+    
+    def is_available(self):
+        return True
+
+
+def make_manager(**providers):
+    manager = LLMManager()
+    manager.providers = dict(providers)
+    manager.limiters = {}
+    return manager
+
+
+class TestRateLimiting:
+    def test_token_bucket_burst_and_refill(self):
+        """Test that the bucket allows a burst, then refills at the configured rate."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate_per_second=2, capacity=3, clock=clock)
+        
+        assert [bucket.try_acquire() for _ in range(3)] == [0, 0, 0]
+        assert bucket.try_acquire() == pytest.approx(0.5)
+        
+        clock.now = 0.5
+        assert bucket.try_acquire() == 0
+    
+    def test_file_token_bucket_shares_state(self, tmp_path):
+        """Test that file-backed buckets share tokens across instances."""
+        path = str(tmp_path / "gemini.json")
+        first = FileTokenBucket(path, rate_per_second=0.001, capacity=2)
+        second = FileTokenBucket(path, rate_per_second=0.001, capacity=2)
+        
+        assert first.try_acquire() == 0
+        assert second.try_acquire() == 0
+        assert first.try_acquire() > 0
+    
+    async def test_concurrency_is_bounded(self):
+        """Test that no more than max_concurrency calls run at once."""
+        provider = StaticProvider(delay=0.01)
+        manager = make_manager(fake=provider)
+        manager.limiters["fake"] = ProviderLimiter("fake", None, max_concurrency=2, max_queue_wait=5)
+        
+        results = await asyncio.gather(*[
+            manager.generate_text(f"prompt {i}", preferred_provider="fake") for i in range(6)
+        ])
+        
+        assert results == ["ok"] * 6
+        assert provider.max_active == 2
+        assert manager.get_limiter_stats()["fake"]["acquired_total"] == 6
+        assert manager.get_limiter_stats()["fake"]["queue_depth"] == 0
+    
+    async def test_queue_wait_limit_rejects(self):
+        """Test that requests exceeding the queue wait fail with a rate limit error."""
+        clock = FakeClock()
+        limiter = ProviderLimiter(
+            "fake", TokenBucket(rate_per_second=0.01, capacity=1, clock=clock),
+            max_concurrency=4, max_queue_wait=0.05
+        )
+        
+        async with limiter.acquire():
+            pass
+        
+        with pytest.raises(LLMRateLimitError):
+            async with limiter.acquire():
+                pass
+        
+        assert limiter.get_stats()["rejected_total"] == 1
+    
+    async def test_rate_limited_provider_falls_back(self):
+        """Test that a saturated provider falls back to the next one."""
+        primary = StaticProvider(response="primary")
+        secondary = StaticProvider(response="secondary")
+        manager = make_manager(primary=primary, secondary=secondary)
+        manager.limiters["primary"] = ProviderLimiter(
+            "primary", TokenBucket(rate_per_second=0.01, capacity=1), max_concurrency=1, max_queue_wait=1.0
+        )
+        
+        first = await manager.generate_text("a", preferred_provider="primary")
+        second = await manager.generate_text("b", preferred_provider="primary")
+        
+        assert first == "primary"
+        assert second == "secondary"
+
+
+class TestRequestCoalescing:
+    async def test_identical_prompts_share_one_call(self):
+        """Test that concurrent identical prompts trigger a single provider call."""
+        provider = StaticProvider(response="shared", delay=0.01)
+        manager = make_manager(fake=provider)
+        
+        results = await asyncio.gather(*[
+            manager.generate_text("same prompt", preferred_provider="fake") for _ in range(10)
+        ])
+        
+        assert results == ["shared"] * 10
+        assert provider.calls == 1
+        
+        stats = manager.single_flight.get_stats()
+        assert stats["calls_total"] == 10
+        assert stats["coalesced_total"] == 9
+        assert stats["deduplication_ratio"] == 0.9
+        assert stats["in_flight"] == 0
+    
+    async def test_different_prompts_are_not_coalesced(self):
+        """Test that distinct prompts and parameters each reach the provider."""
+        provider = StaticProvider(delay=0.01)
+        manager = make_manager(fake=provider)
+        
+        await asyncio.gather(
+            manager.generate_text("prompt a", preferred_provider="fake"),
+            manager.generate_text("prompt b", preferred_provider="fake"),
+            manager.generate_text("prompt a", preferred_provider="fake", max_tokens=100)
+        )
+        
+        assert provider.calls == 3
+    
+    async def test_errors_propagate_to_all_waiters(self):
+        """Test that a failed shared call raises for every coalesced caller."""
+        provider = StaticProvider(delay=0.01, error=LLMError("boom"))
+        manager = make_manager(fake=provider)
+        
+        results = await asyncio.gather(*[
+            manager.generate_text("same prompt", preferred_provider="fake") for _ in range(3)
+        ], return_exceptions=True)
+        
+        assert provider.calls == 1
+        assert all(isinstance(result, LLMError) for result in results)
+    
+    async def test_sequential_calls_are_not_cached(self):
+        """Test that coalescing only applies while a call is in flight."""
+        provider = StaticProvider()
+        manager = make_manager(fake=provider)
+        
+        await manager.generate_text("same prompt", preferred_provider="fake")
+        await manager.generate_text("same prompt", preferred_provider="fake")
+        
+        assert provider.calls == 2
+
+
+class TestFakeProvider:
+    async def test_canned_responses_parse(self):
+        """Test that fake responses follow the format each prompt asks for."""
+        from app.api.analyze import parse_questions, parse_recommendations, split_combined_response
+        from app.llm.fake import FakeProvider
+        from app.llm.prompts import get_combined_analysis_prompt, get_hypothesis_assessment_prompt
+        
+        provider = FakeProvider(latency_median_ms=0.01, latency_p95_ms=0.01, seed=1)
+        
+        assessment = await provider.generate_text(get_hypothesis_assessment_prompt("Adding reviews increases sales"))
+        assert "Score: 7/10" in assessment
+        
+        combined = await provider.generate_text(get_combined_analysis_prompt(
+            "Adding reviews increases sales", "conversion_rate", {"control_conversion_rate": 0.05}
+        ))
+        sections = split_combined_response(combined)
+        assert sections["interpretation"]
+        assert len(parse_recommendations(sections["recommendations"])) == 3
+        assert len(parse_questions(sections["questions"])) == 5
+    
+    def test_latency_distribution(self):
+        """Test that sampled latencies match the configured median and p95."""
+        from app.llm.fake import FakeProvider
+        
+        provider = FakeProvider(latency_median_ms=800, latency_p95_ms=2500, seed=7)
+        samples = sorted(provider.sample_latency() for _ in range(20000))
+        
+        assert samples[10000] == pytest.approx(0.8, rel=0.05)
+        assert samples[19000] == pytest.approx(2.5, rel=0.1)
+    
+    async def test_error_injection(self):
+        """Test that the configured error rate raises LLM errors."""
+        from app.llm.fake import FakeProvider
+        
+        provider = FakeProvider(latency_median_ms=0.01, latency_p95_ms=0.01, error_rate=1.0)
+        
+        with pytest.raises(LLMError):
+            await provider.generate_text("prompt")
+    
+    async def test_injected_errors_do_not_fall_back_to_real_providers(self):
+        """Test that the fake provider's errors never reach billed providers, and real failures never reach it."""
+        from app.llm.fake import FakeProvider
+        
+        fake = FakeProvider(latency_median_ms=0.01, latency_p95_ms=0.01, error_rate=1.0)
+        gemini = StaticProvider(response="real")
+        manager = make_manager(fake=fake, gemini=gemini)
+        
+        with pytest.raises(LLMError):
+            await manager.generate_text("prompt", preferred_provider="fake")
+        assert gemini.calls == 0
+        
+        manager = make_manager(gemini=StaticProvider(error=LLMError("down")), fake=FakeProvider(seed=1))
+        with pytest.raises(LLMError):
+            await manager.generate_text("prompt", preferred_provider="gemini")
@@ -1,12 +1,35 @@
 import pytest
 import math
+import numpy as np
 from app.statistics.calculations import (
     calculate_sample_size,
     calculate_test_duration,
     generate_tradeoff_matrix,
     calculate_conversion_metrics,
+    calculate_conversion_metrics_batch,
     analyze_segments
 )
+from app.statistics.exact import (
+    barnard_exact_pvalues,
+    fisher_exact_pvalues,
+    log_factorial,
+    newcombe_interval,
+    wilson_interval
+)
+from app.statistics.forecasting import build_daily_traffic, build_exposure, forecast_completion_days
+from app.statistics.planning import (
+    adjust_significance_level,
+    find_optimal_allocations,
+    plan_sample_sizes,
+    plan_tradeoff_matrix
+)
+from app.statistics.stratified import stratified_analysis
+from app.statistics.bootstrap import bootstrap_lift_intervals
+from app.statistics.meta_analysis import meta_analysis
+from app.statistics.multiple_metrics import analyze_metric_family, benjamini_hochberg
+from app.statistics.segment_tree import build_segment_tree, scan_segment_tree
+from app.statistics.ratio import analyze_ratio_metrics, calculate_ratio_metrics
+from app.statistics.simulation import allocate_sample, find_sample_size_by_simulation, simulate_power
 
 
 class TestSampleSizeCalculation:
@@ -208,4 +231,569 @@ class TestSegmentAnalysis:
         ]
         
         results = analyze_segments(segment_data)
-        assert len(results) == 0  # Should skip segments with < 2 variants
\ No newline at end of file
+        assert len(results) == 0  # Should skip segments with < 2 variants
+
+
+class TestPowerSimulation:
+    def test_allocate_sample(self):
+        """Test that arm sizes follow the weights and sum to the total."""
+        assert list(allocate_sample(1000, [1, 1])) == [500, 500]
+        assert list(allocate_sample(1001, [1, 1, 1])) == [334, 334, 333]
+        assert list(allocate_sample(1000, [3, 1])) == [750, 250]
+    
+    def test_power_increases_with_sample_size(self):
+        """Test that simulated power grows with the sample size."""
+        power = simulate_power(
+            [0.05, 0.06], [2000, 20000, 80000], simulations=2000, chunk_size=300,
+            rng=np.random.default_rng(1)
+        )
+        
+        assert power.shape == (3, 1)
+        assert power[0, 0] < power[1, 0] < power[2, 0]
+        assert power[2, 0] > 0.9
+    
+    def test_null_effect_rejects_at_alpha(self):
+        """Test that with no true effect the rejection rate is close to alpha."""
+        power = simulate_power([0.1, 0.1], [20000], simulations=5000, rng=np.random.default_rng(2))
+        
+        assert power[0, 0] == pytest.approx(0.05, abs=0.015)
+    
+    def test_matches_normal_approximation(self):
+        """Test that the simulated sample size agrees with the formula where it is accurate."""
+        analytic = calculate_sample_size(0.1, 0.1)
+        
+        result = find_sample_size_by_simulation([0.1, 0.11], initial_total=2 * analytic, seed=3)
+        
+        assert result["converged"]
+        assert result["power"] >= 0.8
+        assert result["sample_sizes"][0] == pytest.approx(analytic, rel=0.05)
+    
+    def test_reproducible_with_seed(self):
+        """Test that a fixed seed gives the same answer."""
+        first = find_sample_size_by_simulation([0.02, 0.025, 0.025], seed=5)
+        second = find_sample_size_by_simulation([0.02, 0.025, 0.025], seed=5)
+        
+        assert first["sample_sizes"] == second["sample_sizes"]
+        assert len(first["sample_sizes"]) == 3
+    
+    def test_time_budget_stops_refinement(self):
+        """Test that an exhausted budget returns the bracket's upper end unrefined."""
+        result = find_sample_size_by_simulation([0.05, 0.06], time_budget_ms=0, seed=4)
+        
+        assert not result["converged"]
+        assert result["power"] >= 0.8
+    
+    def test_unreachable_power(self):
+        """Test that a design with no effect cannot reach the target power."""
+        with pytest.raises(ValueError):
+            find_sample_size_by_simulation([0.05, 0.05], max_total=100000, seed=6)
+
+
+class TestSamplePlanning:
+    def test_equal_split_matches_formula(self):
+        """Test that a 50/50 plan matches calculate_sample_size."""
+        plan = plan_sample_sizes(0.05, 0.20)
+        
+        assert plan["sample_sizes"] == [calculate_sample_size(0.05, 0.20)] * 2
+        assert plan["total_sample_size"] == sum(plan["sample_sizes"])
+    
+    def test_corrections(self):
+        """Test per-comparison alpha for each correction method."""
+        assert adjust_significance_level(0.05, 3, "none") == 0.05
+        assert adjust_significance_level(0.05, 3, "bonferroni") == pytest.approx(0.05 / 3)
+        assert adjust_significance_level(0.05, 3, "sidak") == pytest.approx(1 - 0.95 ** (1 / 3))
+        assert adjust_significance_level(0.05, 1, "bonferroni") == 0.05
+        
+        with pytest.raises(ValueError):
+            adjust_significance_level(0.05, 3, "holm-ish")
+    
+    def test_multi_arm_correction_increases_sample_size(self):
+        """Test that correcting for more arms requires more users per arm."""
+        uncorrected = plan_sample_sizes(0.05, 0.20, num_variants=4, correction="none")
+        corrected = plan_sample_sizes(0.05, 0.20, num_variants=4, correction="bonferroni")
+        
+        assert corrected["adjusted_significance_level"] == pytest.approx(0.05 / 3)
+        assert corrected["sample_sizes"][0] > uncorrected["sample_sizes"][0]
+    
+    def test_unequal_allocation(self):
+        """Test that arm sizes follow the allocation and cost more in total than 50/50."""
+        equal = plan_sample_sizes(0.05, 0.20)
+        skewed = plan_sample_sizes(0.05, 0.20, allocation=[9, 1])
+        
+        assert skewed["allocation"] == [0.9, 0.1]
+        assert skewed["sample_sizes"][0] == pytest.approx(9 * skewed["sample_sizes"][1], rel=0.001)
+        assert skewed["total_sample_size"] > equal["total_sample_size"]
+    
+    def test_optimal_allocation_square_root_rule(self):
+        """Test that the optimal control share for many-to-one comparisons follows the square-root rule."""
+        mdes = [0.1, 0.2]
+        plans = find_optimal_allocations(0.05, mdes, num_variants=4)
+        
+        for mde, plan in zip(mdes, plans):
+            # sqrt(3) / (sqrt(3) + 3) of traffic to control, within the grid and rate asymmetry
+            assert plan["allocation"][0] == pytest.approx(math.sqrt(3) / (math.sqrt(3) + 3), abs=0.03)
+            assert plan["total_sample_size"] < plan_sample_sizes(0.05, mde, num_variants=4)["total_sample_size"]
+    
+    def test_tradeoff_matrix_includes_optimal_allocation(self):
+        """Test that each trade-off row reports the duration under the optimal allocation."""
+        matrix = plan_tradeoff_matrix(0.05, 1000, [0.1, 0.2, 0.3], num_variants=3)
+        
+        assert [row["mde"] for row in matrix] == [0.1, 0.2, 0.3]
+        for row in matrix:
+            assert len(row["sample_sizes_per_variant"]) == 3
+            assert row["optimal_duration_days"] <= row["estimated_duration_days"]
+            assert sum(row["optimal_allocation"]) == pytest.approx(1, abs=0.001)
+
+
+class TestDurationForecast:
+    def test_flat_traffic_matches_duration(self):
+        """Test that flat traffic completes on the rounded-up flat duration."""
+        forecast = forecast_completion_days([3000, 3500], estimated_daily_users=1000)
+        
+        assert forecast["completion_days"] == [3, 4]
+        assert forecast["cumulative_users"] == [1000, 2000, 3000, 4000]
+    
+    def test_weekday_profile(self):
+        """Test that a weekday profile keeps the average and starts on the given weekday."""
+        daily = build_daily_traffic(1000, 14, weekday_profile=[1, 1, 1, 1, 1, 0.5, 0.5], start_weekday=5)
+        
+        assert daily.mean() == pytest.approx(1000)
+        assert daily[0] == daily[1] < daily[2]  # Saturday and Sunday first
+    
+    def test_daily_traffic_repeats(self):
+        """Test that a daily series repeats past its end."""
+        daily = build_daily_traffic(1000, 5, daily_traffic=[100, 200])
+        
+        assert list(daily) == [100, 200, 100, 200, 100]
+    
+    def test_ramp_schedule_delays_completion(self):
+        """Test that a staged ramp scales traffic per step and delays completion."""
+        ramp = [{"start_day": 0, "exposure": 0.01}, {"start_day": 3, "exposure": 0.1}, {"start_day": 7, "exposure": 0.5}]
+        
+        assert list(build_exposure(9, ramp)) == [0.01] * 3 + [0.1] * 4 + [0.5] * 2
+        
+        flat = forecast_completion_days([5000], 1000)
+        ramped = forecast_completion_days([5000], 1000, ramp_schedule=ramp)
+        assert ramped["completion_days"][0] > flat["completion_days"][0]
+        assert ramped["daily_users"][:4] == [10, 10, 10, 100]
+    
+    def test_beyond_horizon(self):
+        """Test that sample sizes not reached within the horizon have no completion day."""
+        forecast = forecast_completion_days([500, 10**9], 100, max_days=30)
+        
+        assert forecast["completion_days"] == [5, None]
+        assert len(forecast["cumulative_users"]) == 30
+
+
+class TestExactTests:
+    tables = [(0, 10, 3, 10), (1, 25, 6, 24), (2, 40, 2, 45), (5, 12, 0, 9), (0, 300, 4, 310), (7, 7, 0, 7)]
+    
+    def test_fisher_matches_scipy(self):
+        """Test that vectorized Fisher p-values match scipy.stats.fisher_exact."""
+        from scipy.stats import fisher_exact
+        
+        x1, n1, x2, n2 = (np.array(column) for column in zip(*self.tables))
+        expected = [fisher_exact([[a, n - a], [b, m - b]])[1] for a, n, b, m in self.tables]
+        
+        assert fisher_exact_pvalues(x1, n1, x2, n2) == pytest.approx(expected, abs=1e-10)
+    
+    def test_barnard_close_to_scipy(self):
+        """Test that grid-based Barnard p-values are close to scipy.stats.barnard_exact."""
+        from scipy.stats import barnard_exact
+        
+        tables = [table for table in self.tables if max(table[1], table[3]) <= 50]
+        x1, n1, x2, n2 = (np.array(column) for column in zip(*tables))
+        expected = [barnard_exact([[a, b], [n - a, m - b]]).pvalue for a, n, b, m in tables]
+        
+        assert barnard_exact_pvalues(x1, n1, x2, n2) == pytest.approx(expected, abs=0.02)
+    
+    def test_log_factorials(self):
+        """Test log(k!) from the shared table and beyond its cap."""
+        from scipy.special import gammaln
+        
+        values = np.array([0, 10, 5000, 10 ** 9])
+        assert log_factorial(values) == pytest.approx(gammaln(values + 1.0), rel=1e-12)
+        assert log_factorial(10) == pytest.approx(math.log(math.factorial(10)))
+    
+    def test_huge_arm_does_not_grow_the_table(self):
+        """Test that a small-count table with a billion-user arm is evaluated without a huge log-factorial table."""
+        import time
+        from scipy.stats import fisher_exact
+        from app.statistics import exact
+        
+        started = time.perf_counter()
+        metrics = calculate_conversion_metrics(2, 0, 1_000_000_000, 3)
+        assert time.perf_counter() - started < 1.0
+        assert len(exact._log_factorials) <= exact.LOG_FACTORIAL_CACHE_SIZE
+        
+        expected = fisher_exact([[0, 3], [2, 1_000_000_000 - 3]]).pvalue
+        assert fisher_exact_pvalues(
+            np.array([0]), np.array([2]), np.array([3]), np.array([1_000_000_000])
+        )[0] == pytest.approx(expected, rel=1e-6)
+        assert 0 <= metrics["p_value"] <= 1
+    
+    def test_wilson_and_newcombe_intervals(self):
+        """Test score intervals against Newcombe's published example (56/70 vs 48/80)."""
+        lower, upper = wilson_interval(np.array([0]), np.array([10]), 1.959964)
+        assert lower[0] == 0 and upper[0] == pytest.approx(0.2775, abs=1e-4)
+        
+        lower, upper = newcombe_interval(np.array([48]), np.array([80]), np.array([56]), np.array([70]), 1.959964)
+        assert lower[0] == pytest.approx(0.0524, abs=1e-4)
+        assert upper[0] == pytest.approx(0.3339, abs=1e-4)
+    
+    def test_small_counts_use_exact_test(self):
+        """Test that low-count pairs get an exact test and score interval, others the z-test."""
+        small, large = calculate_conversion_metrics_batch([200, 5000], [1, 250], [200, 5000], [6, 300])
+        
+        assert small["test_method"] == "fisher_exact"
+        assert small["ci_method"] == "newcombe"
+        assert small["p_value"] == pytest.approx(0.1217, abs=1e-4)  # scipy.stats.fisher_exact
+        assert small["confidence_interval"]["lower"] > -1
+        assert large["test_method"] == "z_test"
+        assert large["ci_method"] == "wald"
+    
+    def test_batch_matches_single(self):
+        """Test that segment analysis returns the same metrics as one pair at a time."""
+        segments = [
+            {"segment_name": f"s{i}", "variants": [{"users": 50 + i, "conversions": i % 4}, {"users": 60, "conversions": i % 7}]}
+            for i in range(20)
+        ]
+        
+        results = analyze_segments(segments, exact_test="barnard")
+        
+        for segment, result in zip(segments, results):
+            control, treatment = segment["variants"]
+            assert result["metrics"] == calculate_conversion_metrics(
+                control["users"], control["conversions"], treatment["users"], treatment["conversions"],
+                exact_test="barnard"
+            )
+
+
+def make_strata(counts):
+    return [
+        {
+            "segment_name": f"s{index}",
+            "variants": [{"users": n0, "conversions": c}, {"users": n1, "conversions": a}]
+        }
+        for index, (n0, c, n1, a) in enumerate(counts)
+    ]
+
+
+class TestStratifiedAnalysis:
+    def test_matches_reference_values(self):
+        """Test pooled estimates and tests against values computed with statsmodels' StratifiedTable."""
+        result = stratified_analysis(make_strata([(500, 40, 520, 55), (800, 20, 780, 31), (300, 60, 310, 70)]))
+        
+        assert result["strata"] == 3
+        assert result["pooled_odds_ratio"] == pytest.approx(1.3181, abs=1e-4)
+        assert result["odds_ratio_ci"]["lower"] == pytest.approx(1.0201, abs=1e-4)
+        assert result["odds_ratio_ci"]["upper"] == pytest.approx(1.7031, abs=1e-4)
+        assert result["pooled_relative_lift"] == pytest.approx(0.2687, abs=1e-4)
+        assert result["cmh_p_value"] == pytest.approx(0.0343, abs=1e-4)
+        assert result["breslow_day_p_value"] == pytest.approx(0.6423, abs=1e-4)
+        assert not result["is_heterogeneous"]
+    
+    def test_simpsons_paradox(self):
+        """Test that stratifying reverses a pooled difference driven by unequal segment mix."""
+        # Treatment is better within each segment but got most of the low-converting segment
+        strata = make_strata([(800, 80, 200, 24), (200, 2, 800, 12)])
+        pooled = calculate_conversion_metrics(1000, 82, 1000, 36)
+        
+        result = stratified_analysis(strata)
+        
+        assert pooled["absolute_lift"] < 0
+        assert result["pooled_absolute_lift"] > 0
+    
+    def test_detects_heterogeneity(self):
+        """Test that opposite effects across segments are flagged as heterogeneous."""
+        result = stratified_analysis(make_strata([(2000, 100, 2000, 160), (2000, 160, 2000, 100)]))
+        
+        assert result["cochran_q_p_value"] < 0.01
+        assert result["breslow_day_p_value"] < 0.01
+        assert result["i_squared"] > 0.9
+        assert result["is_heterogeneous"]
+    
+    def test_null_heterogeneity_error_rate(self):
+        """Test that many small strata with one common effect are rarely flagged as heterogeneous."""
+        rejections = {"cochran_q_p_value": 0, "breslow_day_p_value": 0, "is_heterogeneous": 0}
+        trials = 200
+        for seed in range(trials):
+            rng = np.random.default_rng(seed)
+            control_users = rng.integers(20, 101, 200)
+            treatment_users = rng.integers(20, 101, 200)
+            result = stratified_analysis(make_strata(zip(
+                control_users, rng.binomial(control_users, 0.05),
+                treatment_users, rng.binomial(treatment_users, 0.05)
+            )))
+            rejections["cochran_q_p_value"] += result["cochran_q_p_value"] < 0.10
+            rejections["breslow_day_p_value"] += result["breslow_day_p_value"] < 0.10
+            rejections["is_heterogeneous"] += result["is_heterogeneous"]
+        
+        # Nominal level 0.10; allow for simulation error
+        for name, count in rejections.items():
+            assert count / trials <= 0.15, name
+    
+    def test_needs_two_usable_strata(self):
+        """Test that segments without users in both arms are excluded."""
+        assert stratified_analysis(make_strata([(100, 5, 100, 8), (0, 0, 50, 2)])) is None
+
+
+class TestBootstrapIntervals:
+    def test_percentile_matches_normal_approximation(self):
+        """Test that with large counts the percentile interval is close to the Wald interval."""
+        metrics = calculate_conversion_metrics(10000, 1000, 10000, 1100)
+        
+        result = bootstrap_lift_intervals([10000], [1000], [10000], [1100], method="percentile", replicates=4000, seed=1)[0]
+        
+        assert result["absolute_lift_ci"]["lower"] == pytest.approx(metrics["confidence_interval"]["lower"], abs=0.002)
+        assert result["absolute_lift_ci"]["upper"] == pytest.approx(metrics["confidence_interval"]["upper"], abs=0.002)
+        assert result["relative_lift_ci"]["lower"] < metrics["relative_lift"] < result["relative_lift_ci"]["upper"]
+    
+    def test_bca_matches_scipy(self):
+        """Test that BCa intervals agree with scipy.stats.bootstrap on the equivalent per-user data."""
+        # scipy.stats.bootstrap(method="BCa", n_resamples=20000) gives (-0.0625, 1.8333) and
+        # the percentile method (-0.0435, 1.8571): BCa pulls the skewed upper tail in
+        percentile = bootstrap_lift_intervals([300], [20], [300], [32], method="percentile", replicates=20000, seed=2)[0]
+        bca = bootstrap_lift_intervals([300], [20], [300], [32], method="bca", replicates=20000, seed=2)[0]
+        
+        assert bca["relative_lift_ci"]["lower"] == pytest.approx(-0.0625, abs=0.03)
+        assert bca["relative_lift_ci"]["upper"] == pytest.approx(1.8333, abs=0.1)
+        assert bca["relative_lift_ci"]["upper"] < percentile["relative_lift_ci"]["upper"]
+    
+    def test_reproducible_across_workers(self):
+        """Test that a seed gives the same intervals whether blocks run on one thread or several."""
+        counts = ([500] * 6, [40, 45, 50, 55, 60, 65], [500] * 6, [50] * 6)
+        
+        # chunk_size=1000 puts two pairs in each block
+        threaded = bootstrap_lift_intervals(*counts, replicates=500, chunk_size=1000, workers=3, seed=7)
+        sequential = bootstrap_lift_intervals(*counts, replicates=500, chunk_size=1000, workers=1, seed=7)
+        
+        assert threaded == sequential
+        assert len(threaded) == 6
+    
+    def test_undefined_bounds(self):
+        """Test that empty arms and zero-conversion controls give None bounds."""
+        results = bootstrap_lift_intervals([0, 100], [0, 0], [100, 100], [5, 5], seed=0)
+        
+        assert results[0]["absolute_lift_ci"] == {"lower": None, "upper": None}
+        assert results[1]["absolute_lift_ci"]["lower"] is not None
+        assert results[1]["relative_lift_ci"]["upper"] is None
+
+
+def unit_moments(numerators, denominators):
+    x = np.asarray(numerators, dtype=float)
+    y = np.asarray(denominators, dtype=float)
+    return {
+        "users": len(x),
+        "numerator_sum": x.sum(),
+        "denominator_sum": y.sum(),
+        "numerator_sum_squares": (x * x).sum(),
+        "denominator_sum_squares": (y * y).sum(),
+        "cross_product_sum": (x * y).sum()
+    }
+
+
+class TestRatioMetrics:
+    def test_conversion_rate_as_ratio(self):
+        """Test that a conversion rate expressed as a ratio reproduces the z-test results."""
+        control = unit_moments([1] * 100 + [0] * 1900, [1] * 2000)
+        treatment = unit_moments([1] * 130 + [0] * 1870, [1] * 2000)
+        
+        ratio = calculate_ratio_metrics(control, treatment)
+        conversion = calculate_conversion_metrics(2000, 100, 2000, 130)
+        
+        assert ratio["control_value"] == conversion["control_conversion_rate"]
+        assert ratio["absolute_lift"] == conversion["absolute_lift"]
+        assert ratio["p_value"] == pytest.approx(conversion["p_value"], abs=1e-3)
+        assert ratio["confidence_interval"]["lower"] == pytest.approx(conversion["confidence_interval"]["lower"], abs=1e-4)
+    
+    def test_delta_method_standard_error(self):
+        """Test the delta-method standard error against its value computed from per-unit data."""
+        rng = np.random.default_rng(0)
+        sessions = rng.poisson(3, 500) + 1
+        clicks = rng.binomial(sessions, 0.2)
+        
+        result = calculate_ratio_metrics(unit_moments(clicks, sessions), unit_moments(clicks, sessions))
+        
+        # Linearization: residuals x - R y scaled by mean(y)
+        ratio = clicks.sum() / sessions.sum()
+        residuals = (clicks - ratio * sessions) / sessions.mean()
+        expected = residuals.std(ddof=1) / np.sqrt(len(clicks))
+        assert result["control_standard_error"] == pytest.approx(expected, rel=1e-4)
+        assert result["p_value"] == 1.0
+    
+    def test_relative_lift_interval_on_log_scale(self):
+        """Test that the relative lift interval is asymmetric around the lift and above -100%."""
+        result = calculate_ratio_metrics(
+            unit_moments([0, 1, 2, 0, 3] * 20, [1, 2, 2, 1, 4] * 20),
+            unit_moments([1, 2, 2, 0, 4] * 20, [1, 2, 2, 1, 4] * 20)
+        )
+        
+        lower, upper = result["relative_lift_ci"]["lower"], result["relative_lift_ci"]["upper"]
+        assert -1 < lower < result["relative_lift"] < upper
+        assert upper - result["relative_lift"] > result["relative_lift"] - lower
+    
+    def test_metrics_and_segments_in_one_batch(self):
+        """Test that every metric and segment gets its own result, with undefined ratios degrading safely."""
+        moments = unit_moments([1, 2, 3], [2, 2, 2])
+        empty = unit_moments([], [])
+        
+        results = analyze_ratio_metrics([
+            {
+                "metric_name": "clicks_per_session",
+                "variants": [moments, moments],
+                "segments": [
+                    {"segment_name": "Mobile", "variants": [moments, moments]},
+                    {"segment_name": "Empty", "variants": [empty, moments]}
+                ]
+            },
+            {"metric_name": "revenue_per_order", "variants": [moments, moments]}
+        ])
+        
+        assert [r["metric_name"] for r in results] == ["clicks_per_session", "revenue_per_order"]
+        assert [s["segment_name"] for s in results[0]["segment_analysis"]] == ["Mobile", "Empty"]
+        assert results[0]["segment_analysis"][1]["metrics"]["p_value"] == 1.0
+        assert results[0]["segment_analysis"][1]["metrics"]["relative_lift_ci"]["lower"] is None
+        assert results[1]["segment_analysis"] is None
+
+
+class TestMetricFamily:
+    def test_benjamini_hochberg(self):
+        """Test adjusted p-values against statsmodels' multipletests(method="fdr_bh")."""
+        adjusted = benjamini_hochberg([0.01, 0.04, 0.03, 0.005, 0.2])
+        
+        assert adjusted == pytest.approx([0.025, 0.05, 0.05, 0.025, 0.2])
+    
+    def test_guardrail_direction(self):
+        """Test that guardrails are violated only by significant moves in the harmful direction."""
+        def entry(name, role, lift, p_value, higher_is_better=True):
+            return {
+                "metric_name": name, "role": role, "metric_type": "conversion",
+                "higher_is_better": higher_is_better, "control_value": 0.1, "treatment_value": 0.1 + lift,
+                "absolute_lift": lift, "relative_lift": lift * 10, "confidence_interval": {"lower": 0, "upper": 0},
+                "p_value": p_value
+            }
+        
+        results = analyze_metric_family([
+            entry("conversion_rate", "primary", 0.01, 0.001),
+            entry("latency_ok_rate", "guardrail", -0.02, 0.001),
+            entry("error_rate", "guardrail", -0.02, 0.001, higher_is_better=False),
+            entry("bounce_rate", "guardrail", 0.02, 0.2, higher_is_better=False)
+        ])
+        
+        assert [r["guardrail_violated"] for r in results] == [None, True, False, False]
+        assert results[3]["adjusted_p_value"] == 0.2
+
+
+class TestMetaAnalysis:
+    def test_matches_reference_values(self):
+        """Test pooled estimates against statsmodels' combine_effects(method_re="dl")."""
+        effects = [0.012, 0.004, 0.02, -0.003, 0.015]
+        standard_errors = [0.005, 0.006, 0.007, 0.004, 0.008]
+        
+        result = meta_analysis(effects, standard_errors)["groups"][0]
+        
+        assert result["fixed_effect"]["estimate"] == pytest.approx(0.00629, abs=1e-5)
+        assert result["random_effects"]["estimate"] == pytest.approx(0.008553, abs=1e-6)
+        assert result["tau_squared"] == pytest.approx(6.3128e-05, rel=1e-4)
+        assert result["cochran_q"] == pytest.approx(11.865, abs=1e-3)
+        assert result["i_squared"] == pytest.approx(0.6629, abs=1e-4)
+    
+    def test_groups_pooled_independently(self):
+        """Test that pooling many groups at once matches pooling each group alone."""
+        rng = np.random.default_rng(0)
+        effects = rng.normal(0.01, 0.01, 300)
+        standard_errors = rng.uniform(0.003, 0.01, 300)
+        groups = [f"change-{i % 30}" for i in range(300)]
+        
+        batch = meta_analysis(effects, standard_errors, groups)
+        alone = meta_analysis(effects[7::30], standard_errors[7::30])["groups"][0]
+        
+        assert len(batch["groups"]) == 30
+        assert batch["groups"][7]["group"] == "change-7"
+        assert batch["groups"][7]["random_effects"] == alone["random_effects"]
+        assert batch["groups"][7]["tau_squared"] == alone["tau_squared"]
+    
+    def test_homogeneous_experiments(self):
+        """Test that identical effects give no between-experiment variance."""
+        result = meta_analysis([0.01, 0.01, 0.01], [0.004, 0.005, 0.006])["groups"][0]
+        
+        assert result["tau_squared"] == 0.0
+        assert result["i_squared"] == 0.0
+        assert result["random_effects"]["estimate"] == result["fixed_effect"]["estimate"]
+
+
+def make_hierarchy(divergent_country=None, seed=0):
+    rng = np.random.default_rng(seed)
+    paths = [(f"R{r}", f"R{r}-C{c}", f"P{p}") for r in range(4) for c in range(10) for p in range(5)]
+    users = rng.integers(2000, 4000, len(paths))
+    lift = np.array([-0.04 if path[1] == divergent_country else 0.01 for path in paths])
+    return paths, users, rng.binomial(users, 0.1), users, rng.binomial(users, 0.1 + lift)
+
+
+class TestSegmentTree:
+    def test_builds_every_prefix_once(self):
+        """Test that each path prefix becomes one node with parents indexed first."""
+        parents, depths, node_paths, ancestors = build_segment_tree([["EU", "DE"], ["EU", "FR"], ["US"]])
+        
+        assert node_paths == [(), ("EU",), ("EU", "DE"), ("EU", "FR"), ("US",)]
+        assert parents.tolist() == [-1, 0, 1, 1, 0]
+        assert depths.tolist() == [0, 1, 2, 2, 1]
+        assert ancestors.tolist() == [[0, 1, 2], [0, 1, 3], [0, 4, -1]]
+    
+    def test_finds_divergent_segment(self):
+        """Test that a country with the opposite effect is reported, ahead of its region."""
+        result = scan_segment_tree(*make_hierarchy(divergent_country="R2-C3"))
+        
+        assert result["nodes"] == 4 + 40 + 200
+        assert result["divergent_segments"][0]["path"] == ["R2", "R2-C3"]
+        assert result["divergent_segments"][0]["interaction_difference"] < -0.03
+        # Subtrees whose leaves agree are pruned, so most nodes are never tested
+        assert result["tested_nodes"] < result["nodes"] / 4
+        assert result["pruned_nodes"] + result["untestable_nodes"] == result["nodes"] - result["tested_nodes"]
+    
+    def test_untestable_nodes_are_not_counted_as_pruned(self):
+        """Test that an examined leaf without conversions is reported as untestable, not pruned."""
+        paths = [["A", "A1"], ["A", "A2"], ["A", "A3"], ["B", "B1"]]
+        result = scan_segment_tree(
+            paths,
+            control_users=[10000, 10000, 500, 10000],
+            control_conversions=[500, 500, 0, 500],
+            treatment_users=[10000, 10000, 500, 10000],
+            treatment_conversions=[500, 900, 0, 500]
+        )
+        
+        # A and B and A's testable leaves are tested; A3 has no variance; B's only leaf is pruned
+        assert result["nodes"] == 6
+        assert result["tested_nodes"] == 4
+        assert result["untestable_nodes"] == 1
+        assert result["pruned_nodes"] == 1
+        assert ["A", "A3"] not in [segment["path"] for segment in result["divergent_segments"]]
+    
+    def test_null_false_discovery_rate(self):
+        """Test that sparse leaves with no divergence do not produce false discoveries beyond the target rate."""
+        trials_with_discoveries = 0
+        trials = 100
+        for seed in range(trials):
+            rng = np.random.default_rng(seed)
+            # Small arms, so many leaves have an arm without conversions
+            paths = [(f"R{i % 5}", f"C{i % 50}", f"L{i}") for i in range(2000)]
+            control_users = rng.integers(20, 201, len(paths))
+            treatment_users = rng.integers(20, 201, len(paths))
+            result = scan_segment_tree(
+                paths,
+                control_users, rng.binomial(control_users, 0.1),
+                treatment_users, rng.binomial(treatment_users, 0.1)
+            )
+            trials_with_discoveries += bool(result["divergent_segments"])
+        
+        # With no true divergence, any discovery is false, so this is the false discovery rate
+        assert trials_with_discoveries / trials <= 0.1
+    
+    def test_homogeneous_tree_is_pruned(self):
+        """Test that a tree with one common effect is pruned at the root with no discoveries."""
+        result = scan_segment_tree(*make_hierarchy())
+        
+        assert result["root_heterogeneity_p_value"] >= 0.05
+        assert result["tested_nodes"] == 0
+        assert result["divergent_segments"] == []